@@ -0,0 +1,69 @@
+# Raw page archive: put throughput, size on disk and parallel replay over fixture game pages.
+# Run with: uv run python -m benchmarks.bench_archive [pages]
+import logging, os, shutil, sys, tempfile, time
+
+import funday_bundle.constants as const
+from funday_bundle.data_structures import CachedCollection
+from funday_bundle.page_archive import PageArchive, replay
+
+from benchmarks.common import print_results, write_results
+from benchmarks.corpus import Corpus
+
+
+def _directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def run(quick: bool = False, pages: int | None = None) -> list[dict]:
+    pages = pages if pages else (500 if quick else 5000)
+    corpus = Corpus(n_games=pages, n_bundles=1)
+    html = [(f"{corpus.base_url}/app/{app_id}/", corpus.game_page(app_id)) for app_id in corpus.game_ids]
+    raw_bytes = sum(len(page.encode("utf-8")) for _, page in html)
+
+    # CachedCollection opens the db at its default relative path, so it runs inside a temp cwd
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    results = []
+    try:
+        os.chdir(tmp)
+        os.makedirs("scraped_data")
+        archive = PageArchive()
+
+        start = time.perf_counter()
+        for url, page in html:
+            archive.put(url, page)
+        archive.flush()
+        elapsed = time.perf_counter() - start
+        stored = _directory_bytes(os.path.join(archive.path, "objects"))
+        results.append({"name": f"archive_put_{archive.compression}", "pages": pages, "seconds": elapsed,
+                        "pages_per_second": pages / elapsed, "compression_ratio": raw_bytes / stored})
+
+        logging.disable(logging.INFO) # One line per replayed chunk otherwise
+        for workers in sorted({1, os.cpu_count() or 1}):
+            collection = CachedCollection(use_tag_index=False, use_bundle_graph=False)
+            start = time.perf_counter()
+            counts = replay(archive, collection, workers=workers)
+            collection.db_manager.flush()
+            elapsed = time.perf_counter() - start
+            collection.close_connections()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(f"{const.DB_PATH}{suffix}"):
+                    os.remove(f"{const.DB_PATH}{suffix}")
+            results.append({"name": f"archive_replay_x{workers}", "pages": counts["pages"], "games": counts["games"],
+                            "seconds": elapsed, "pages_per_second": counts["pages"] / elapsed})
+        archive.close()
+    finally:
+        logging.disable(logging.NOTSET)
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def main() -> None:
+    results = run(pages=int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    print_results(results)
+    write_results("archive", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Page loads through Chrome with the default and the lean driver profile, fixture game pages
+# with their images, video, font and script served by the stand-in. Skipped without a local Chrome.
+# Run with: uv run python -m benchmarks.bench_browser [pages] [latency]
+import logging, shutil, sys, tempfile, time
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+import funday_bundle.constants as const
+from funday_bundle.browser import create_driver
+
+from benchmarks.common import print_results, write_results
+from benchmarks.server import StandInServer
+
+
+def load_pages(name: str, server: StandInServer, game_ids: list[int], lean: bool) -> dict | None:
+    profile = tempfile.mkdtemp()
+    try:
+        driver = create_driver(lean=lean, profile_dir=profile, base_url=server.base_url)
+    except WebDriverException as e:
+        logging.warning(f"Chrome could not start, skipping {name}: {e.msg}")
+        shutil.rmtree(profile, ignore_errors=True)
+        return None
+
+    try:
+        requests_before, bytes_before = server.requests, server.bytes_sent
+        start = time.perf_counter()
+        for app_id in game_ids:
+            driver.get(f"{server.base_url}/app/{app_id}/")
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, const.TITLE_SELECTOR)))
+        elapsed = time.perf_counter() - start
+    finally:
+        driver.quit()
+        shutil.rmtree(profile, ignore_errors=True)
+
+    return {"name": name, "pages": len(game_ids), "seconds": elapsed, "pages_per_second": len(game_ids) / elapsed,
+            "requests": server.requests - requests_before, "mb_served": (server.bytes_sent - bytes_before) / 1e6}
+
+
+def run(quick: bool = False, pages: int | None = None, latency: float = 0.02) -> list[dict]:
+    pages = pages if pages else (10 if quick else 50)
+    with StandInServer(latency=latency) as server:
+        game_ids = server.corpus.game_ids[:pages]
+        results = [
+            load_pages("chrome_default_profile", server, game_ids, lean=False),
+            load_pages("chrome_lean_profile", server, game_ids, lean=True),
+        ]
+
+    results = [result for result in results if result]
+    for result in results:
+        result.update(latency=latency)
+    return results
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    results = run(pages=int(args[0]) if len(args) > 0 else None, latency=float(args[1]) if len(args) > 1 else 0.02)
+    print_results(results)
+    write_results("browser", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# DatabaseManager inserts (one commit per game vs batched vs write-behind) and lookups.
+# Run with: uv run python -m benchmarks.bench_db [rows]
+import os, random, sys, tempfile, time
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+import funday_bundle.data_io as data_io
+from funday_bundle.data_structures import GameCache
+from funday_bundle.db_manager import DatabaseManager
+from funday_bundle.utils import HistoryMetric
+
+from benchmarks.common import measure, print_results, write_results
+from benchmarks.corpus import synthetic_database, synthetic_games
+
+
+def _time_insert(label: str, games: list[GameCache], insert) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        insert(db, games)
+        db.close_connection()
+        elapsed = time.perf_counter() - start
+
+    return {"name": label, "rows": len(games), "seconds": elapsed, "rows_per_second": len(games) / elapsed}
+
+
+def per_row(db: DatabaseManager, games: list[GameCache]) -> None:
+    for game in games:
+        db.add_game(game)
+
+
+def batched(db: DatabaseManager, games: list[GameCache], chunk: int = 1000) -> None:
+    for i in range(0, len(games), chunk):
+        db.add_games(games[i:i + chunk])
+
+
+def write_behind(db: DatabaseManager, games: list[GameCache]) -> None:
+    db.batch_size = 1000
+    for game in games:
+        db.add_game(game)
+
+
+def lookups(rows: int) -> list[dict]:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        synthetic_database(path, rows)
+        db = DatabaseManager(path)
+
+        rng = random.Random(1)
+        hashes = [f"{rng.randrange(rows):016x}" for _ in range(1000)]
+
+        results = [
+            measure("get_game", lambda: [db.get_game(h) for h in hashes], repeat=3, items=len(hashes)),
+            measure("get_games_bulk", lambda: db.get_games(hashes), repeat=3, items=len(hashes)),
+            measure("get_all_game_ids", lambda: sum(1 for _ in db.get_all_game_ids()), repeat=3, rows=rows),
+            measure("get_games_by_tag", lambda: db.get_games_by_tag("tag7"), repeat=3, rows=rows),
+            measure("get_tag_stats", lambda: db.get_tag_stats(), repeat=3, rows=rows),
+            measure("get_price_bands", lambda: db.get_price_bands(), repeat=3, rows=rows),
+            measure("rebuild_aggregates", lambda: db.rebuild_aggregates(), repeat=1, rows=rows),
+            measure("export_csv_games", lambda: data_io.export_csv(db, "games", os.path.join(tmp, "games.csv")), repeat=1, rows=rows),
+            measure("export_jsonl_games", lambda: data_io.export_jsonl(db, "games", os.path.join(tmp, "games.jsonl")), repeat=1, rows=rows),
+        ]
+        db.close_connection()
+    return results
+
+
+def history(rows: int, refreshes: int = 10, changed: float = 0.05) -> list[dict]:
+    # Daily refreshes of the whole catalog where a few percent of the prices move
+    games = synthetic_games(rows)
+    rng = random.Random(1)
+    start = datetime.now() - timedelta(days=refreshes)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "bench.db"))
+        begin = time.perf_counter()
+        for day in range(refreshes + 1):
+            games = [
+                replace(game, price=round(game.price * 0.8, 2) if day and rng.random() < changed else game.price,
+                        last_time_scraped=start + timedelta(days=day))
+                for game in games
+            ]
+            for i in range(0, len(games), 1000):
+                db.add_games(games[i:i + 1000])
+        elapsed = time.perf_counter() - begin
+        points = db.conn.execute("SELECT COUNT(*) FROM game_history").fetchone()[0]
+
+        hashes = [game.hash for game in rng.sample(games, min(1000, rows))]
+        middle = start + timedelta(days=refreshes // 2)
+        results = [
+            {"name": "history_refreshes", "rows": rows, "refreshes": refreshes, "scraped_values": rows * 3 * (refreshes + 1),
+             "history_points": points, "seconds": elapsed},
+            measure("history_price_at_bulk", lambda: db.get_values_at(hashes, HistoryMetric.PRICE, middle), repeat=3, items=len(hashes)),
+            measure("history_trajectories_bulk", lambda: db.get_histories(hashes, HistoryMetric.PRICE, start, middle), repeat=3, items=len(hashes)),
+        ]
+        db.close_connection()
+    return results
+
+
+def run(quick: bool = False, rows: int | None = None) -> list[dict]:
+    rows = rows if rows else (10_000 if quick else 100_000)
+    games = synthetic_games(rows)
+
+    return [
+        _time_insert("per_row_commit", games, per_row),
+        _time_insert("add_games_batched", games, batched),
+        _time_insert("write_behind_buffer", games, write_behind),
+        *lookups(rows),
+        *history(rows // 10),
+    ]
+
+
+def main() -> None:
+    results = run(rows=int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    print_results(results)
+    write_results("db", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Parser hot paths: the utils helpers and the static page parsers on the fixture corpus.
+# Run with: uv run python -m benchmarks.bench_parsers
+import funday_bundle.static_scraping as static
+import funday_bundle.utils as util
+
+from benchmarks.common import measure, print_results, write_results
+from benchmarks.corpus import Corpus
+
+PRICES = ["5,99€", "19.99€", "1 299,00 kr", "$4.99", "Free To Play", ""]
+RATINGS = [
+    "96% of the 123,456 user reviews for this game are positive.",
+    "72% af de 1.234 brugeranmeldelser for dette spil er positive.",
+    "no reviews yet",
+]
+DATES = ["4 Apr, 2024", "Apr 4, 2024", "4 April, 2024", "April 2024", "Coming soon"]
+
+
+def run(quick: bool = False) -> list[dict]:
+    number = 2_000 if quick else 20_000
+    corpus = Corpus(n_games=50, n_bundles=20)
+    game_pages = [(corpus.game_page(app_id), app_id) for app_id in corpus.game_ids[:20]]
+    bundle_pages = [(corpus.bundle_page(bundle_id), bundle_id) for bundle_id in corpus.bundle_ids[:20]]
+
+    def parse_games():
+        for html, app_id in game_pages:
+            static.parse_game_page(html, app_id, "0" * 16)
+
+    def parse_bundles():
+        for html, bundle_id in bundle_pages:
+            static.parse_bundle_page(html, str(bundle_id), "0" * 16)
+
+    # get_time_from_str logs every miss, so only the misses cost logging time here
+    return [
+        measure("utils.parse_price", lambda: [util.parse_price(p) for p in PRICES], number=number // len(PRICES), items=len(PRICES)),
+        measure("utils.parse_ratings", lambda: [util.parse_ratings(r) for r in RATINGS], number=number // len(RATINGS), items=len(RATINGS)),
+        measure("utils.get_time_from_str", lambda: [util.get_time_from_str(d) for d in DATES[:-1]], number=number // len(DATES), items=len(DATES) - 1),
+        measure("utils.get_hash_by_id", lambda: util.get_hash_by_id(2835570, util.UrlType.GAME_PAGE), number=number),
+        measure("static.parse_game_page", parse_games, repeat=3, items=len(game_pages)),
+        measure("static.parse_bundle_page", parse_bundles, repeat=3, items=len(bundle_pages)),
+    ]
+
+
+def main() -> None:
+    results = run()
+    print_results(results)
+    write_results("parsers", results)
+
+
+if __name__ == "__main__":
+    main()
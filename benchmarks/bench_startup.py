@@ -0,0 +1,62 @@
+# CachedCollection startup time and memory on large synthetic databases.
+# Run with: uv run python -m benchmarks.bench_startup [rows ...]
+import os, shutil, sys, tempfile, time, tracemalloc
+
+import funday_bundle.constants as const
+from funday_bundle.data_structures import CachedCollection
+
+from benchmarks.common import print_results, write_results
+from benchmarks.corpus import synthetic_database
+
+
+def startup(name: str, rows: int, load_indexes: bool = False, **options) -> dict:
+    # CachedCollection opens the db at its default relative path, so it runs inside a temp cwd
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    try:
+        os.chdir(tmp)
+        os.makedirs("scraped_data")
+        synthetic_database(const.DB_PATH, rows)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        collection = CachedCollection(**options)
+        if load_indexes: # Both are lazy, this is the cost of the first query
+            collection.get_tag_index()
+            collection.get_bundle_graph()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        result = {
+            "name": name,
+            "rows": rows,
+            "seconds": elapsed,
+            "peak_mb": peak / 1e6,
+            "id_index_kb": collection.known_game_ids.nbytes / 1e3,
+        }
+        collection.close_connections()
+        return result
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def run(quick: bool = False, sizes: list[int] | None = None) -> list[dict]:
+    sizes = sizes if sizes else ([10_000] if quick else [10_000, 100_000])
+    results = []
+    for rows in sizes:
+        results.append(startup("startup_id_index_only", rows, use_tag_index=False, use_bundle_graph=False))
+        results.append(startup("startup_default", rows))
+        results.append(startup("startup_with_tag_index_and_graph", rows, load_indexes=True, use_tag_index=True, use_bundle_graph=True))
+    return results
+
+
+def main() -> None:
+    results = run(sizes=[int(arg) for arg in sys.argv[1:]] or None)
+    print_results(results)
+    write_results("startup", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Recall and speed of the MinHash/LSH tag index against exact jaccard.
+# Run with: uv run python -m benchmarks.bench_tag_lsh [games]
+import os, random, sys, tempfile, time
+
+from funday_bundle.tag_lsh import TagLSHIndex
+
+from benchmarks.common import print_results, write_results
+
+
+def synthetic_catalog(n: int, n_tags: int = 400, n_genres: int = 50, seed: int = 1) -> dict[str, set[str]]:
+    # Games are drawn around genre "centres" so there are real near neighbours
+    rng = random.Random(seed)
+    genres = [rng.sample(range(n_tags), 12) for _ in range(n_genres)]
+    catalog = {}
+    for i in range(n):
+        base = rng.choice(genres)
+        tags = set(rng.sample(base, rng.randint(7, 12))) | set(rng.sample(range(n_tags), rng.randint(0, 5)))
+        catalog[f"{i:016x}"] = {f"tag{t}" for t in tags}
+    return catalog
+
+
+def jaccard(a: set[str], b: set[str]) -> float:
+    return len(a & b) / len(a | b)
+
+
+def run(quick: bool = False, n: int | None = None) -> list[dict]:
+    n = n if n else (10_000 if quick else 100_000)
+    threshold = 0.5
+    catalog = synthetic_catalog(n)
+    hashes = list(catalog)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tag_lsh_index.npz")
+
+        start = time.perf_counter()
+        index = TagLSHIndex(path)
+        for game_hash, tags in catalog.items():
+            index.update(game_hash, tags)
+        index.save()
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = TagLSHIndex.load(path)
+        load_seconds = time.perf_counter() - start
+
+        queries = random.Random(2).sample(hashes, 50)
+
+        start = time.perf_counter()
+        approx = {q: {h for h, _ in index.similar_games(q)} for q in queries}
+        lsh_seconds = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        exact = {q: {h for h in hashes if h != q and jaccard(catalog[q], catalog[h]) >= threshold} for q in queries}
+        exact_seconds = (time.perf_counter() - start) / len(queries)
+
+    true_pairs = sum(len(v) for v in exact.values())
+    found_pairs = sum(len(exact[q] & approx[q]) for q in queries)
+    candidates = sum(len(v) for v in approx.values())
+
+    return [{
+        "name": "tag_lsh_similar_games",
+        "games": n,
+        "threshold": threshold,
+        "build_seconds": build_seconds,
+        "load_seconds": load_seconds,
+        "lsh_query_ms": lsh_seconds * 1000,
+        "exact_query_ms": exact_seconds * 1000,
+        "recall": found_pairs / true_pairs if true_pairs else 1.0,
+        "candidates_per_query": candidates / len(queries),
+    }]
+
+
+def main() -> None:
+    results = run(n=int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    print_results(results)
+    write_results("tag_lsh", results)
+
+
+if __name__ == "__main__":
+    main()
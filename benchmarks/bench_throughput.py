@@ -0,0 +1,105 @@
+# End to end scrape throughput against the local stand-in server, no live Steam traffic.
+# Run with: uv run python -m benchmarks.bench_throughput [games] [latency] [error_rate]
+import logging, os, shutil, sys, tempfile, time
+
+from funday_bundle.async_scraping import AsyncSteamScraper
+from funday_bundle.data_structures import CachedCollection
+from funday_bundle.pipeline import Pipeline
+from funday_bundle.steam_scraping import SteamScraper
+
+from benchmarks.common import print_results, write_results
+from benchmarks.server import StandInServer
+
+
+def _in_temp_dir(fn):
+    # Every run starts from an empty db at the default relative path
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp()
+    try:
+        os.chdir(tmp)
+        os.makedirs("scraped_data")
+        return fn()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _count_games(collection: CachedCollection) -> int:
+    collection.db_manager.flush()
+    return collection.db_manager.conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+
+def sequential(server: StandInServer, game_ids: list[int]) -> dict:
+    def body():
+        collection = CachedCollection(use_tag_index=False, use_bundle_graph=False)
+        # No driver, pages the static parser can't read count as failed instead of opening chrome
+        scraper = SteamScraper(None, collection, base_url=server.base_url, page_delay=(0, 0))
+        start = time.perf_counter()
+        scraper.scrape_game_pages(game_ids)
+        elapsed = time.perf_counter() - start
+        stored = _count_games(collection)
+        collection.close_connections()
+        return {"name": "scrape_game_pages_sequential", "pages": len(game_ids), "stored": stored,
+                "seconds": elapsed, "pages_per_second": len(game_ids) / elapsed}
+    return _in_temp_dir(body)
+
+
+def concurrent(server: StandInServer, game_ids: list[int], concurrency: int = 8) -> dict:
+    def body():
+        collection = CachedCollection(use_tag_index=False, use_bundle_graph=False)
+        scraper = AsyncSteamScraper(collection, concurrency=concurrency, base_url=server.base_url)
+        start = time.perf_counter()
+        scraper.run_game_pages(game_ids)
+        elapsed = time.perf_counter() - start
+        stored = _count_games(collection)
+        collection.close_connections()
+        return {"name": f"async_scrape_game_pages_x{concurrency}", "pages": len(game_ids), "stored": stored,
+                "seconds": elapsed, "pages_per_second": len(game_ids) / elapsed}
+    return _in_temp_dir(body)
+
+
+def staged(server: StandInServer, game_ids: list[int], fetchers: int = 8) -> dict:
+    def body():
+        collection = CachedCollection(use_tag_index=False, use_bundle_graph=False)
+        pipeline = Pipeline(collection, fetchers=fetchers, page_delay=(0, 0), base_url=server.base_url).start()
+        start = time.perf_counter()
+        pipeline.submit(game_ids)
+        pipeline.join()
+        elapsed = time.perf_counter() - start
+        pipeline.close()
+        stored = _count_games(collection)
+        collection.close_connections()
+        return {"name": f"pipeline_x{fetchers}_fetchers", "pages": len(game_ids), "stored": stored,
+                "seconds": elapsed, "pages_per_second": len(game_ids) / elapsed}
+    return _in_temp_dir(body)
+
+
+def run(quick: bool = False, games: int | None = None, latency: float = 0.02, error_rate: float = 0.02) -> list[dict]:
+    games = games if games else (50 if quick else 300)
+    logging.disable(logging.ERROR) # Injected errors would flood the output
+
+    try:
+        with StandInServer(latency=latency, jitter=latency / 2, error_rate=error_rate) as server:
+            game_ids = server.corpus.game_ids[:games]
+            results = [sequential(server, game_ids), concurrent(server, game_ids), staged(server, game_ids)]
+    finally:
+        logging.disable(logging.NOTSET)
+
+    for result in results:
+        result.update(latency=latency, error_rate=error_rate)
+    return results
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    results = run(
+        games=int(args[0]) if len(args) > 0 else None,
+        latency=float(args[1]) if len(args) > 1 else 0.02,
+        error_rate=float(args[2]) if len(args) > 2 else 0.02,
+    )
+    print_results(results)
+    write_results("throughput", results)
+
+
+if __name__ == "__main__":
+    main()
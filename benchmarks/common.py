@@ -0,0 +1,49 @@
+# Timing and result helpers shared by the benchmarks
+import json, os, platform, subprocess, sys, time
+from datetime import datetime
+from typing import Callable
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def measure(name: str, fn: Callable[[], object], repeat: int = 5, number: int = 1, **extra) -> dict:
+    # Best of repeat runs of number calls, per call seconds
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+
+    timings.sort()
+    return {"name": name, "seconds": timings[0], "median_seconds": timings[len(timings) // 2], "calls": number, **extra}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def write_results(suite: str, results: list[dict], path: str | None = None) -> str:
+    # One json per suite, compare two of them with: python -m benchmarks.run_all --compare old.json new.json
+    path = path if path else os.path.join(RESULTS_DIR, f"{suite}.json")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, "w") as f:
+        json.dump({"suite": suite, "environment": environment(), "results": results}, f, indent=2)
+    return path
+
+
+def print_results(results: list[dict]) -> None:
+    print(json.dumps(results, indent=2))
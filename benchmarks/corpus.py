@@ -0,0 +1,180 @@
+# Fixture corpus: game, bundle and bundlelist pages plus the appdetails and
+# appreviews json, rendered from the saved templates in fixtures/, one
+# deterministic game per synthetic steam id.
+import json, os, random, re
+from datetime import datetime, timedelta
+from string import Template
+from urllib.parse import parse_qs
+
+from funday_bundle.data_structures import GameCache
+from funday_bundle.db_manager import DatabaseManager
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+TAG_NAMES = [f"tag {i}" for i in range(400)]
+STORE_URL = "https://store.steampowered.com"
+
+
+def _template(name: str) -> Template:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return Template(f.read())
+
+
+class Corpus:
+    def __init__(self, n_games: int = 1000, n_bundles: int = 200, seed: int = 1, base_url: str = STORE_URL):
+        self.base_url = base_url
+        self.game_ids = [10 * (i + 1) for i in range(n_games)]
+        self.bundle_ids = [7 * (i + 1) for i in range(n_bundles)]
+
+        rng = random.Random(seed)
+        self.bundle_games = {b: rng.sample(self.game_ids, min(len(self.game_ids), rng.randint(2, 6))) for b in self.bundle_ids}
+        self.game_bundles: dict[int, list[int]] = {g: [] for g in self.game_ids}
+        for bundle_id, games in self.bundle_games.items():
+            for game_id in games:
+                self.game_bundles[game_id].append(bundle_id)
+
+        self._templates = {name: _template(f"{name}.html") for name in ("game", "bundle", "bundle_item", "bundlelist", "bundlelist_item")}
+        self._templates.update({name: _template(f"{name}.json") for name in ("appdetails", "appreviews")})
+
+    @staticmethod
+    def _game_fields(app_id: int) -> dict:
+        # Shared by the html page and the json endpoints, so both describe the same game
+        rng = random.Random(app_id)
+        tags = rng.sample(TAG_NAMES, rng.randint(5, 20))
+        price = rng.randint(99, 5999) / 100
+        release = datetime(2010, 1, 1) + timedelta(days=rng.randint(0, 5000))
+        rating = rng.randint(40, 99)
+        review_count = rng.randint(10, 500_000)
+        return {
+            "tags": tags,
+            "price": price,
+            "release_date": release.strftime("%d %b, %Y").lstrip("0"),
+            "rating": rating,
+            "review_count": review_count,
+            "paragraphs": rng.randint(20, 80),
+        }
+
+    def game_page(self, app_id: int) -> str:
+        fields = self._game_fields(app_id)
+        tags = fields["tags"]
+        return self._templates["game"].substitute(
+            title=f"Game {app_id}",
+            app_id=app_id,
+            rating=fields["rating"],
+            review_count=f"{fields['review_count']:,}",
+            release_date=fields["release_date"],
+            glance_tags="".join(f'<a class="app_tag">{tag}</a>' for tag in tags[:5]),
+            price=f"{fields['price']:.2f}".replace(".", ","),
+            price_cents=int(fields["price"] * 100),
+            description="<p>Lorem ipsum dolor sit amet.</p>" * fields["paragraphs"], # Real pages are mostly text
+            tag_json=json.dumps([{"tagid": TAG_NAMES.index(tag), "name": tag, "count": 100 - i, "browseable": True} for i, tag in enumerate(tags)]),
+        )
+
+    def app_details(self, app_id: int) -> dict:
+        fields = self._game_fields(app_id)
+        price = f"{fields['price']:.2f}".replace(".", ",")
+        return json.loads(self._templates["appdetails"].substitute(
+            title=f"Game {app_id}",
+            app_id=app_id,
+            price_cents=int(fields["price"] * 100),
+            final_cents=int(fields["price"] * 100),
+            discount=0,
+            price=price,
+            final_price=price,
+            release_date=fields["release_date"],
+        ))
+
+    def app_reviews(self, app_id: int) -> dict:
+        fields = self._game_fields(app_id)
+        positive = round(fields["review_count"] * fields["rating"] / 100)
+        return json.loads(self._templates["appreviews"].substitute(
+            total_positive=positive,
+            total_negative=fields["review_count"] - positive,
+            total_reviews=fields["review_count"],
+        ))
+
+    def _bundle_item(self, app_id: int) -> str:
+        return self._templates["bundle_item"].substitute(base_url=self.base_url, app_id=app_id, slug=f"Game_{app_id}", name=f"Game {app_id}")
+
+    def bundle_page(self, bundle_id: int) -> str:
+        rng = random.Random(bundle_id)
+        return self._templates["bundle"].substitute(
+            title=f"Bundle {bundle_id}",
+            discount=rng.choice((10, 15, 20, 25, 30)),
+            price=f"{rng.randint(499, 9999) / 100:.2f}".replace(".", ","),
+            items="".join(self._bundle_item(app_id) for app_id in self.bundle_games[bundle_id]),
+        )
+
+    def bundlelist_page(self, app_id: int) -> str:
+        bundles = "".join(
+            self._templates["bundlelist_item"].substitute(
+                base_url=self.base_url,
+                bundle_id=bundle_id,
+                games="".join(f'<a class="Focusable" href="{self.base_url}/app/{g}/"></a>' for g in self.bundle_games[bundle_id]),
+            )
+            for bundle_id in self.game_bundles[app_id]
+        )
+        return self._templates["bundlelist"].substitute(title=f"Game {app_id}", bundles=bundles)
+
+    def render(self, path: str) -> str | None:
+        # Store url path -> html, None for unknown pages (served as 404)
+        match = re.match(r"^/(app|bundle|bundlelist)/(\d+)", path)
+        if not match:
+            return None
+
+        kind, steam_id = match.group(1), int(match.group(2))
+        if kind == "app" and steam_id in self.game_bundles:
+            return self.game_page(steam_id)
+        if kind == "bundle" and steam_id in self.bundle_games:
+            return self.bundle_page(steam_id)
+        if kind == "bundlelist" and steam_id in self.game_bundles:
+            return self.bundlelist_page(steam_id)
+        return None
+
+    def render_json(self, path: str, query: str) -> str | None:
+        # Store api path -> json, shaped like the recorded responses in fixtures/
+        params = parse_qs(query)
+        if path == "/api/appdetails":
+            app_ids = [int(app_id) for app_id in params.get("appids", [""])[0].split(",") if app_id.isdigit()]
+            price_only = params.get("filters", [""])[0] == "price_overview"
+            payload = {}
+            for app_id in app_ids:
+                if app_id not in self.game_bundles:
+                    payload[str(app_id)] = {"success": False}
+                    continue
+                data = self.app_details(app_id)
+                payload[str(app_id)] = {"success": True, "data": {"price_overview": data["price_overview"]} if price_only else data}
+            return json.dumps(payload)
+
+        match = re.match(r"^/appreviews/(\d+)$", path)
+        if match and int(match.group(1)) in self.game_bundles:
+            return json.dumps(self.app_reviews(int(match.group(1))))
+        return None
+
+
+# ***
+# Synthetic Database Rows
+# ***
+
+def synthetic_games(n: int, start: int = 0) -> list[GameCache]:
+    now = datetime.now()
+    return [
+        GameCache(
+            hash=f"{i:016x}",
+            steam_id=i,
+            title=f"game {i}",
+            price=round(1 + (i % 60) * 0.5, 2),
+            overall_rating=(i % 100) / 100,
+            overall_count=i % 50_000,
+            tags=["indie", "action", f"tag{i % 400}"],
+            release_date=now - timedelta(days=i % 5000),
+            last_time_scraped=now
+        )
+        for i in range(start, start + n)
+    ]
+
+
+def synthetic_database(path: str, n_games: int, chunk: int = 10_000) -> None:
+    db = DatabaseManager(path)
+    for start in range(0, n_games, chunk):
+        db.add_games(synthetic_games(min(chunk, n_games - start), start))
+    db.close_connection()
@@ -0,0 +1,63 @@
+# Runs every benchmark and writes benchmarks/results/all.json, or compares two result files.
+# Run with: uv run python -m benchmarks.run_all [--quick] [--out path]
+#           uv run python -m benchmarks.run_all --compare old.json new.json
+import argparse, json
+
+from benchmarks import bench_archive, bench_browser, bench_db, bench_parsers, bench_startup, bench_tag_lsh, bench_throughput
+from benchmarks.common import write_results
+
+SUITES = {
+    "parsers": bench_parsers.run,
+    "db": bench_db.run,
+    "startup": bench_startup.run,
+    "throughput": bench_throughput.run,
+    "tag_lsh": bench_tag_lsh.run,
+    "browser": bench_browser.run,
+    "archive": bench_archive.run,
+}
+
+
+def compare(old_path: str, new_path: str, tolerance: float = 0.10) -> bool:
+    # Flags results whose seconds grew by more than tolerance, returns False on any regression
+    with open(old_path) as f:
+        old = {r["name"]: r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {r["name"]: r for r in json.load(f)["results"]}
+
+    ok = True
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name].get("seconds"), new[name].get("seconds")
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        regressed = change > tolerance
+        ok = ok and not regressed
+        print(f"{'REGRESSED' if regressed else 'ok':>9}  {name:<40} {before:.6f}s -> {after:.6f}s ({change:+.1%})")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="Small sizes, for a smoke run")
+    parser.add_argument("--only", choices=list(SUITES), nargs="+", help="Suites to run")
+    parser.add_argument("--out", help="Result file, defaults to benchmarks/results/all.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.compare:
+        raise SystemExit(0 if compare(*args.compare, tolerance=args.tolerance) else 1)
+
+    results = []
+    for suite, run in SUITES.items():
+        if args.only and suite not in args.only:
+            continue
+        print(f"Running {suite}...")
+        for result in run(quick=args.quick):
+            results.append({"suite": suite, **result})
+
+    print(f"Results written to {write_results('all', results, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
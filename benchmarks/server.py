@@ -0,0 +1,129 @@
+# Local Steam stand-in serving the fixture corpus with configurable latency
+# and error rate. Point a scraper at it with base_url=server.base_url.
+# Run alone with: uv run python -m benchmarks.server [--port 8765] [--latency 0.05] [--error-rate 0.01]
+import argparse, os, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from benchmarks.corpus import Corpus
+
+# Page assets the fixtures link to, sized like the real store's, content is filler
+ASSET_TYPES: dict[str, tuple[str, int]] = {
+    ".jpg": ("image/jpeg", 150_000),
+    ".webm": ("video/webm", 2_000_000),
+    ".woff2": ("font/woff2", 60_000),
+    ".js": ("text/javascript", 80_000),
+}
+STORE_CSS = b"@font-face { font-family: Motiva; src: url(/assets/motiva.woff2); } body { font-family: Motiva; }"
+
+
+def render_asset(path: str) -> tuple[bytes, str] | None:
+    if path == "/assets/store.css":
+        return STORE_CSS, "text/css"
+    asset = ASSET_TYPES.get(os.path.splitext(path)[1])
+    if not path.startswith("/assets/") or asset is None:
+        return None
+    content_type, size = asset
+    return b" " * size, content_type
+
+
+class StandInServer:
+    def __init__(self, corpus: Corpus | None = None, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, port: int = 0, seed: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        self.corpus = corpus if corpus else Corpus(base_url=self.base_url)
+        self._thread: threading.Thread | None = None
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._rng_lock:
+                    server.requests += 1
+                    delay = server.latency + server._rng.uniform(0, server.jitter)
+                    failed = server._rng.random() < server.error_rate
+                time.sleep(delay)
+
+                if failed:
+                    server.errors += 1
+                    self.send_error(503, "Injected error")
+                    return
+
+                url = urlsplit(self.path)
+                html = server.corpus.render(url.path)
+                data = server.corpus.render_json(url.path, url.query) if html is None else None
+                asset = render_asset(url.path) if html is None and data is None else None
+                if html is None and data is None and asset is None:
+                    self.send_error(404)
+                    return
+
+                if html is not None:
+                    body, content_type = html.encode("utf-8"), "text/html; charset=utf-8"
+                elif data is not None:
+                    body, content_type = data.encode("utf-8"), "application/json"
+                else:
+                    body, content_type = asset
+                with server._rng_lock:
+                    server.bytes_sent += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # Keeps benchmark output clean
+
+        return Handler
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stand-in-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'StandInServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the fixture corpus as a fake Steam store")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random seconds, uniform in [0, jitter]")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--bundles", type=int, default=200)
+    args = parser.parse_args()
+
+    server = StandInServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, port=args.port)
+    server.corpus = Corpus(args.games, args.bundles, base_url=server.base_url)
+    print(f"Serving {args.games} games and {args.bundles} bundles on {server.base_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
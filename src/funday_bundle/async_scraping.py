@@ -0,0 +1,131 @@
+import asyncio, logging
+
+import requests
+
+import funday_bundle.constants as const
+import funday_bundle.static_scraping as static
+import funday_bundle.utils as util
+from funday_bundle.data_structures import CachedCollection, GameCache, BundleCache
+from funday_bundle.metrics import metrics
+from funday_bundle.page_archive import PageArchive
+from funday_bundle.utils import ReturnInfo, UrlType
+
+
+# Async engine next to the blocking selenium flow. Requests has no asyncio api,
+# so the blocking fetch + parse runs in worker threads while a semaphore bounds
+# how many are in flight. All of them share the keep-alive pool of one session.
+class AsyncSteamScraper:
+    def __init__(self, cache_collection: CachedCollection, concurrency: int = const.ASYNC_CONCURRENCY,
+                 session: requests.Session | None = None, base_url: str = const.STORE_BASE_URL,
+                 archive: PageArchive | None = None):
+        self.cache_collection = cache_collection
+        self.concurrency = concurrency
+        self.session = session if session else static.create_session(pool_size=concurrency)
+        self.base_url = base_url # Swap for a local stand-in server
+        self.archive = archive
+
+        self._semaphore: asyncio.Semaphore | None = None
+
+    # ***
+    # Common Functions
+    # ***
+
+    async def _fetch_and_parse(self, url: str, parse_fn, *args):
+        assert self._semaphore is not None
+
+        async with self._semaphore:
+            return await asyncio.to_thread(self._fetch_and_parse_blocking, url, parse_fn, *args)
+
+    def _fetch_and_parse_blocking(self, url: str, parse_fn, *args):
+        with metrics.stage("static_fetch"):
+            html = static.fetch_html(self.session, url)
+        if not html:
+            return None
+        if self.archive:
+            self.archive.put(url, html)
+        with metrics.stage("static_parse"):
+            return parse_fn(html, *args)
+
+    async def _gather_counts(self, coroutines) -> dict[ReturnInfo, int]:
+        # Semaphore is created here so it binds to the running loop
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        results = await asyncio.gather(*coroutines, return_exceptions=True)
+
+        counts = {info: 0 for info in ReturnInfo}
+        for result in results:
+            if isinstance(result, BaseException):
+                logging.error(f"Async scrape failed: {result}")
+                result = ReturnInfo.FAILED
+            counts[result] += 1
+            metrics.count_outcome(result)
+        return counts
+
+
+    # ***
+    # Game and Bundle Scraping
+    # ***
+
+    async def _scrape_single_game_page(self, steam_id: (str | int)) -> ReturnInfo:
+        canonical_url = util.get_url_by_id(steam_id, UrlType.GAME_PAGE)
+        temp_id = util.extract_steam_id(canonical_url)
+        if not canonical_url or not temp_id:
+            return util.print_scraping_error(steam_id)
+
+        if not self.cache_collection.claim_game(int(temp_id)):
+            return ReturnInfo.FOUND_IN_CACHE
+        hash = util.get_hash_from_url(canonical_url)
+
+        url = util.get_url_by_id(temp_id, UrlType.GAME_PAGE, self.base_url)
+        try:
+            game_obj: GameCache | None = await self._fetch_and_parse(url, static.parse_game_page, int(temp_id), hash)
+        except Exception:
+            self.cache_collection.release_game(int(temp_id))
+            raise
+
+        # Writes happen on the loop thread, which owns the db connection
+        if not game_obj or not self.cache_collection.add_game(game_obj):
+            self.cache_collection.release_game(int(temp_id))
+            return util.print_scraping_error(steam_id)
+
+        logging.info(f"Success Fully Scraping Game: {steam_id}")
+        return ReturnInfo.SCRAPED_SCUCCESFULLY
+
+    async def _scrape_single_bundle_page(self, bundle_id: (str | int)) -> ReturnInfo:
+        canonical_url = util.get_url_by_id(bundle_id, UrlType.BUNDLE_PAGE)
+        temp_id = util.extract_steam_id(canonical_url)
+        if not canonical_url or not temp_id:
+            return util.print_scraping_error(bundle_id)
+
+        if self.cache_collection.is_known_bundle(temp_id):
+            return ReturnInfo.FOUND_IN_CACHE
+        hash = util.get_hash_from_url(canonical_url)
+
+        url = util.get_url_by_id(temp_id, UrlType.BUNDLE_PAGE, self.base_url)
+        bundle_obj: BundleCache | None = await self._fetch_and_parse(url, static.parse_bundle_page, temp_id, hash)
+
+        if not bundle_obj or not self.cache_collection.add_bundle(bundle_obj):
+            return util.print_scraping_error(bundle_id)
+
+        logging.info(f"Success Fully Scraping Bundle: {bundle_id}")
+        return ReturnInfo.SCRAPED_SCUCCESFULLY
+
+
+    # ***
+    # Callable Scraper functions
+    # ***
+
+    async def scrape_game_pages(self, steam_ids: list[str] | list[int]) -> dict[ReturnInfo, int]:
+        logging.info(f"Beginning async scraping of {len(steam_ids)} games")
+        return await self._gather_counts(self._scrape_single_game_page(steam_id) for steam_id in steam_ids)
+
+    async def scrape_bundle_pages(self, bundle_ids: list[str] | list[int]) -> dict[ReturnInfo, int]:
+        logging.info(f"Beginning async scraping of {len(bundle_ids)} bundles")
+        unique_ids = dict.fromkeys(str(bundle_id) for bundle_id in bundle_ids) # Bundles have no claim, so dedup up front
+        return await self._gather_counts(self._scrape_single_bundle_page(bundle_id) for bundle_id in unique_ids)
+
+    def run_game_pages(self, steam_ids: list[str] | list[int]) -> dict[ReturnInfo, int]:
+        return asyncio.run(self.scrape_game_pages(steam_ids))
+
+    def run_bundle_pages(self, bundle_ids: list[str] | list[int]) -> dict[ReturnInfo, int]:
+        return asyncio.run(self.scrape_bundle_pages(bundle_ids))
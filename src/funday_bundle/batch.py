@@ -0,0 +1,115 @@
+import logging, os, sys, time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+import funday_bundle.constants as const
+from funday_bundle.data_io import iter_ids, iter_pieces, open_text
+from funday_bundle.data_structures import CachedCollection
+from funday_bundle.id_index import SteamIdBitmap
+from funday_bundle.utils import UrlType
+
+if TYPE_CHECKING:
+    from funday_bundle.funday_bundle import FundayBundle
+
+
+# Batch jobs over id lists of any length. Lines are read lazily as the scraper
+# asks for more, every id is normalized by iter_ids and deduplicated against the
+# known-id index and a bitmap of ids already seen in the stream. Memory depends
+# on the largest id, not on the number of lines.
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+@dataclass(slots=True)
+class BatchProgress:
+    total_bytes: int | None # None when the size is unknown (stdin, gzip), then there is no ETA
+    read_bytes: int = 0
+    ids_read: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    known: int = 0
+    dispatched: int = 0
+    started: float = field(default_factory=time.monotonic)
+    _last_report: float = field(default_factory=time.monotonic, repr=False)
+    
+    def report(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_report < const.BATCH_REPORT_INTERVAL:
+            return
+        self._last_report = now
+        
+        elapsed = now - self.started
+        line = (f"read {self.ids_read:,} ids | new {self.dispatched:,} | known {self.known:,} | "
+                f"duplicate {self.duplicates:,} | invalid {self.invalid:,} | {self.ids_read / elapsed if elapsed else 0:,.0f} ids/s")
+        
+        # Reading is pulled by the scraper, so the share of bytes read tracks the share scraped
+        if self.total_bytes:
+            done = min(1.0, self.read_bytes / self.total_bytes)
+            eta = elapsed * (1 - done) / done if done else None
+            line += f" | {done:.1%}" + (f" | ETA {_format_duration(eta)}" if eta is not None else "")
+        
+        print(line, file=sys.stderr, flush=True)
+        logging.info(f"Batch progress: {line}")
+
+
+def _total_bytes(paths: list[str]) -> int | None:
+    if any(path == "-" or path.endswith(".gz") for path in paths):
+        return None
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def iter_lines(paths: list[str], progress: BatchProgress) -> Iterator[str]:
+    for path in paths:
+        with open_text(path) as f:
+            for piece in iter_pieces(f):
+                progress.read_bytes += len(piece) # Characters, the same as bytes for id lists
+                yield piece
+
+
+def iter_new_ids(steam_ids: Iterable[str], cache_collection: CachedCollection, url_type: UrlType,
+                 progress: BatchProgress) -> Iterator[int]:
+    seen = SteamIdBitmap()
+    is_known = cache_collection.is_known_game if url_type == UrlType.GAME_PAGE else cache_collection.is_known_bundle
+    
+    for steam_id in steam_ids:
+        progress.ids_read += 1
+        steam_id = int(steam_id)
+        
+        if steam_id > const.BATCH_MAX_ID:
+            progress.invalid += 1
+        elif steam_id in seen:
+            progress.duplicates += 1
+        elif is_known(steam_id):
+            seen.add(steam_id)
+            progress.known += 1
+        else:
+            seen.add(steam_id)
+            yield steam_id
+
+
+def run_batch(app: 'FundayBundle', paths: list[str], url_type: UrlType = UrlType.GAME_PAGE,
+              chunk_size: int = const.BATCH_CHUNK_SIZE) -> BatchProgress:
+    progress = BatchProgress(_total_bytes(paths))
+    logging.info(f"Batch job over {paths} for {url_type.name}")
+    
+    chunk: list[int] = []
+    for steam_id in iter_new_ids(iter_ids(iter_lines(paths, progress)), app.cache_collection, url_type, progress):
+        chunk.append(steam_id)
+        if len(chunk) >= chunk_size:
+            app.scrape_ids(chunk, url_type)
+            app.cache_collection.checkpoint()
+            progress.dispatched += len(chunk)
+            chunk = []
+        progress.report()
+    
+    if chunk:
+        app.scrape_ids(chunk, url_type)
+        progress.dispatched += len(chunk)
+    if app.pipeline:
+        app.pipeline.join()
+    
+    progress.report(force=True)
+    return progress
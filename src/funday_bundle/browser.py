@@ -0,0 +1,54 @@
+import logging, os
+from urllib.parse import urlsplit
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+import funday_bundle.constants as const
+
+
+def _lean_options(options: Options, profile_dir: str | None) -> None:
+    # The scrapers wait for their own selectors, nothing after DOMContentLoaded is needed
+    options.page_load_strategy = const.BROWSER_PAGE_LOAD_STRATEGY
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_argument("--mute-audio")
+    options.add_argument("--autoplay-policy=user-gesture-required")
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    
+    # Chrome locks the profile dir, so only one driver at a time can use it
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+        options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+
+
+def block_resources(driver: webdriver.Chrome, blocked: dict[str, list[str]]) -> None:
+    patterns = [pattern for patterns in blocked.values() for pattern in patterns]
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+def set_steam_cookies(driver: webdriver.Chrome, base_url: str = const.STORE_BASE_URL) -> None:
+    # Set through CDP before the first page, so not even the first request hits the age gate
+    domain = urlsplit(base_url).hostname
+    for name, value in const.STEAM_COOKIES.items():
+        driver.execute_cdp_cmd("Network.setCookie", {"name": name, "value": value, "domain": domain, "path": "/"})
+
+
+def create_driver(headless: bool = True, lean: bool = True, profile_dir: str | None = const.BROWSER_PROFILE_DIR,
+                  blocked: dict[str, list[str]] | None = None, base_url: str = const.STORE_BASE_URL) -> webdriver.Chrome:
+    options = Options()
+    if headless:
+        options.add_argument("--headless")
+    if not lean:
+        return webdriver.Chrome(options=options)
+    
+    _lean_options(options, profile_dir)
+    driver = webdriver.Chrome(options=options)
+    
+    try:
+        block_resources(driver, const.BROWSER_BLOCKED_URLS if blocked is None else blocked)
+        set_steam_cookies(driver, base_url)
+    except Exception as e:
+        # Still a working driver, just a slower one
+        logging.error(f"Lean browser setup failed, continuing with a default profile: {e}")
+    return driver
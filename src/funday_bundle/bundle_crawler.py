@@ -0,0 +1,86 @@
+import logging, random, time
+
+from dataclasses import dataclass
+
+import funday_bundle.constants as const
+import funday_bundle.utils as util
+from funday_bundle.frontier import Frontier
+from funday_bundle.steam_scraping import SteamScraper
+from funday_bundle.utils import ReturnInfo, UrlType
+
+
+# Breadth first discovery over game -> bundlelist -> bundle -> game links.
+# Bundlelist pages are frontier items with their depth, so known pages are
+# never visited twice and an interrupted crawl resumes where it stopped.
+# Every new game found is queued in the frontier for the game scraper.
+@dataclass(slots=True)
+class BundleCrawler:
+    scraper: SteamScraper
+    frontier: Frontier
+    max_depth: int = const.CRAWL_MAX_DEPTH
+    budget: int | None = const.CRAWL_BUDGET # Bundlelist pages per crawl, None for no limit
+
+    def seed(self, steam_ids: list[str] | list[int]) -> int:
+        return self.frontier.add(steam_ids, UrlType.GAME_BUNDLE_PAGE, depth=0)
+
+    def _queue_games(self, game_ids: set[str], depth: int) -> None:
+        cache_collection = self.scraper.cache_collection
+        new_games = [game_id for game_id in game_ids if not cache_collection.is_known_game(game_id)]
+        if new_games:
+            self.frontier.add(new_games, UrlType.GAME_PAGE)
+
+        # Links past the depth limit are dropped, the games themselves are still queued above
+        if depth < self.max_depth:
+            self.frontier.add(game_ids, UrlType.GAME_BUNDLE_PAGE, depth=depth + 1)
+
+    def _known_bundle_games(self, bundle_id: str | int) -> list[str]:
+        # Steam ids of a stored bundle's games, so the crawl goes on through it. Games never scraped only have a hash
+        cache_collection = self.scraper.cache_collection
+        bundle = cache_collection.get_bundle(util.get_hash_by_id(bundle_id, UrlType.BUNDLE_PAGE))
+        if not bundle:
+            return []
+        return [str(game.steam_id) for game in cache_collection.get_games(bundle.games_in_bundle).values()]
+
+    def _visit(self, steam_id: str, depth: int, counts: dict[ReturnInfo, int]) -> ReturnInfo:
+        found = self.scraper.scrape_bundlelist_page(steam_id)
+        if found is None:
+            return ReturnInfo.FAILED
+
+        bundle_ids, game_ids = found
+        linked_games = set(game_ids)
+
+        for bundle_id in bundle_ids:
+            return_info, bundle_game_ids = self.scraper.scrape_bundle_page(bundle_id)
+            counts[return_info] += 1
+            if return_info == ReturnInfo.FOUND_IN_CACHE:
+                bundle_game_ids = self._known_bundle_games(bundle_id)
+            else:
+                time.sleep(random.uniform(*self.scraper.page_delay)) # Fetched, throttled like game pages
+            linked_games.update(bundle_game_ids)
+
+        linked_games.discard(steam_id)
+        self._queue_games(linked_games, depth)
+        return ReturnInfo.SCRAPED_SCUCCESFULLY
+
+    def crawl(self) -> dict[ReturnInfo, int]:
+        # Counts are per bundle page, bundlelist pages are tracked in the frontier
+        counts = {info: 0 for info in ReturnInfo}
+        visited = 0
+
+        while self.budget is None or visited < self.budget:
+            limit = const.FRONTIER_BATCH_SIZE if self.budget is None else min(const.FRONTIER_BATCH_SIZE, self.budget - visited)
+            items = self.frontier.claim(limit, UrlType.GAME_BUNDLE_PAGE)
+            if not items:
+                break
+
+            for item in items:
+                logging.info(f"Crawling bundlelist of {item.steam_id} at depth {item.depth}")
+                return_info = self._visit(item.steam_id, item.depth, counts)
+                self.frontier.record(item.steam_id, return_info, url_type=UrlType.GAME_BUNDLE_PAGE)
+                visited += 1
+                time.sleep(random.uniform(*const.PAGE_DELAY))
+
+            self.frontier.checkpoint()
+
+        logging.info(f"Bundle crawl visited {visited} bundlelists: { {info.name: n for info, n in counts.items()} }")
+        return counts
@@ -0,0 +1,174 @@
+import logging
+
+from typing import Iterable
+
+import numpy as np
+
+from funday_bundle.db_manager import DatabaseManager
+
+
+# Game <-> game co-bundling graph from bundle_contents, stored CSR style:
+# the partners of node i are indices[indptr[i]:indptr[i + 1]] with matching
+# weights (number of bundles the two games share). Added bundles go into a
+# small edge delta that is merged into the arrays before the next query.
+class BundleGraph:
+    def __init__(self, pairs: Iterable[tuple[str, str]] = ()):
+        self.game_hashes: list[str] = []
+        self.node_of: dict[str, int] = {}
+        self._bundle_members: dict[str, set[int]] = {}
+
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.weights = np.zeros(0, dtype=np.float64)
+        self._delta: dict[tuple[int, int], int] = {}
+
+        members_by_bundle: dict[str, list[str]] = {}
+        for game_hash, bundle_hash in pairs:
+            members_by_bundle.setdefault(bundle_hash, []).append(game_hash)
+        for bundle_hash, games in members_by_bundle.items():
+            self.add_bundle(bundle_hash, games)
+        self._compact()
+
+    @classmethod
+    def from_database(cls, db_manager: DatabaseManager) -> 'BundleGraph':
+        graph = cls(db_manager.iter_bundle_contents())
+        logging.info(f"Bundle graph built with {graph.node_count} games and {len(graph.indices) // 2} edges")
+        return graph
+
+    @property
+    def node_count(self) -> int:
+        return len(self.game_hashes)
+
+
+    # ***
+    # Building
+    # ***
+
+    def _node(self, game_hash: str) -> int:
+        if game_hash not in self.node_of:
+            self.node_of[game_hash] = len(self.game_hashes)
+            self.game_hashes.append(game_hash)
+        return self.node_of[game_hash]
+
+    def add_bundle(self, bundle_hash: str, games_in_bundle: Iterable[str]) -> None:
+        # Mirrors bundle_contents, which only ever gains (game, bundle) pairs
+        members = self._bundle_members.setdefault(bundle_hash, set())
+        new_nodes = {self._node(game_hash) for game_hash in games_in_bundle} - members
+
+        for new in new_nodes:
+            for other in members:
+                self._delta[(new, other)] = self._delta.get((new, other), 0) + 1
+                self._delta[(other, new)] = self._delta.get((other, new), 0) + 1
+            members.add(new)
+
+    def _compact(self) -> None:
+        n = self.node_count
+        if not self._delta and len(self.indptr) == n + 1:
+            return
+
+        # Existing edges as (src, dst, weight) plus the delta, summed per pair
+        src = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        delta = np.array([(s, d, w) for (s, d), w in self._delta.items()], dtype=np.int64).reshape(-1, 3)
+
+        all_src = np.concatenate([src, delta[:, 0]])
+        all_dst = np.concatenate([self.indices, delta[:, 1]])
+        all_weight = np.concatenate([self.weights, delta[:, 2].astype(np.float64)])
+
+        keys, inverse = np.unique(all_src * n + all_dst, return_inverse=True)
+        self.weights = np.bincount(inverse, weights=all_weight)
+        self.indices = keys % n
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(keys // n, minlength=n))))
+        self._delta.clear()
+
+    def _partners(self, node: int) -> tuple[np.ndarray, np.ndarray]:
+        start, end = self.indptr[node], self.indptr[node + 1]
+        return self.indices[start:end], self.weights[start:end]
+
+    def _gather(self, nodes: np.ndarray) -> np.ndarray:
+        # Every partner of every node in one vectorized slice
+        starts, ends = self.indptr[nodes], self.indptr[nodes + 1]
+        lengths = ends - starts
+        if not lengths.sum():
+            return np.zeros(0, dtype=np.int64)
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.indices[np.arange(lengths.sum()) + offsets]
+
+
+    # ***
+    # Queries
+    # ***
+
+    def neighbours(self, game_hash: str) -> list[tuple[str, float]]:
+        self._compact()
+        node = self.node_of.get(game_hash)
+        if node is None:
+            return []
+
+        partners, weights = self._partners(node)
+        order = np.argsort(-weights, kind='stable')
+        return [(self.game_hashes[partners[i]], float(weights[i])) for i in order]
+
+    def k_hop(self, game_hash: str, k: int = 2) -> dict[str, int]:
+        # Games reachable within k bundles, with their hop distance
+        self._compact()
+        node = self.node_of.get(game_hash)
+        if node is None:
+            return {}
+
+        distance = np.full(self.node_count, -1, dtype=np.int64)
+        distance[node] = 0
+        frontier = np.array([node])
+
+        for hop in range(1, k + 1):
+            reached = np.unique(self._gather(frontier))
+            frontier = reached[distance[reached] < 0]
+            if not len(frontier):
+                break
+            distance[frontier] = hop
+
+        found = np.flatnonzero(distance > 0)
+        return {self.game_hashes[i]: int(distance[i]) for i in found}
+
+    def shared_partners(self, first_hash: str, second_hash: str) -> list[str]:
+        self._compact()
+        if first_hash not in self.node_of or second_hash not in self.node_of:
+            return []
+
+        first, _ = self._partners(self.node_of[first_hash])
+        second, _ = self._partners(self.node_of[second_hash])
+        return [self.game_hashes[i] for i in np.intersect1d(first, second)]
+
+    def weighted_degree(self) -> np.ndarray:
+        self._compact()
+        return np.bincount(np.repeat(np.arange(self.node_count), np.diff(self.indptr)),
+                           weights=self.weights, minlength=self.node_count)
+
+    def pagerank(self, damping: float = 0.85, iterations: int = 50, tolerance: float = 1e-9) -> np.ndarray:
+        self._compact()
+        n = self.node_count
+        if not n:
+            return np.zeros(0)
+
+        src = np.repeat(np.arange(n), np.diff(self.indptr))
+        out_weight = self.weighted_degree()
+        edge_share = self.weights / out_weight[src]
+        dangling = out_weight == 0
+
+        rank = np.full(n, 1.0 / n)
+        for _ in range(iterations):
+            spread = np.bincount(self.indices, weights=rank[src] * edge_share, minlength=n)
+            new_rank = (1 - damping) / n + damping * (spread + rank[dangling].sum() / n)
+            if np.abs(new_rank - rank).sum() < tolerance:
+                return new_rank
+            rank = new_rank
+        return rank
+
+    def most_central(self, k: int = 10, use_pagerank: bool = False) -> list[tuple[str, float]]:
+        scores = self.pagerank() if use_pagerank else self.weighted_degree()
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.game_hashes[i], float(scores[i])) for i in top]
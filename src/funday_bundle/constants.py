@@ -1,3 +1,7 @@
+STORE_BASE_URL = "https://store.steampowered.com"
+
+
+
 # Game Bundle Page Selectors
 BUNDLE_SECTION_SELECTOR = "[class*='T_3MrEHN9bFK4I4FQqDC8']"
 BUNDLE_ELEMENTS_SELECTOR = "[class*='_1NM531LjOd5QmDktUetCOm']"
@@ -5,6 +9,14 @@ FOCUSABLE_SELECTOR = "[class*='Focusable']"
 
 
 
+# Bundle Page Selectors
+BUNDLE_TITLE_SELECTOR = "h2[class*='pageheader']"
+BUNDLE_GAME_LINK_SELECTOR = "[class*='tab_item'] a[class*='tab_item_overlay']"
+BUNDLE_DISCOUNT_SELECTOR = "[class*='bundle_base_discount']"
+BUNDLE_PRICE_SELECTOR = "[class*='game_purchase_action'] [class*='discount_final_price']"
+
+
+
 # Game Page Selectors
 TITLE_SELECTOR = "[class*='apphub_AppName']"
 PRICE_WRAPPER_SELECTOR = "[class*='game_area_purchase_game_wrapper']"
@@ -15,6 +27,123 @@ REVIEW_2_SELECTOR = "[class*='game_review_summary positive']"
 TAGS_SELECTOR = "[class*='app_tags popular_tags']" # User given tags
 BUTTON_TAGS = "[class*='app_tag add_button']" # Button to tags
 RELEASE_DATE_SELECTOR = "[class*='release_date']"
+GLANCE_TAGS_SELECTOR = "[class*='glance_tags popular_tags'] [class*='app_tag']" # Top tags in the static html
+TAG_MODAL_PATTERN = r'InitAppTagModal\(\s*\d+\s*,\s*(\[.*?\])' # Full tag list given to the tag button in a script
+
+
+
+# Static (browserless) Requests
+PAGE_DELAY: tuple[float, float] = (2, 5) # Random pause in seconds after each page that was fetched
+REQUEST_TIMEOUT: float = 10
+ASYNC_CONCURRENCY: int = 8 # Requests in flight at once for the async scraper
+
+
+
+# Store JSON Api
+API_COUNTRY_CODE = "ie" # Euro prices with english text
+API_LANGUAGE = "english"
+API_PRICE_BATCH_SIZE: int = 100 # appdetails only takes many appids with filters=price_overview
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+STEAM_COOKIES = { # Skips age gate and forces english
+    "birthtime": "631152001",
+    "lastagecheckage": "1-0-1990",
+    "wants_mature_content": "1",
+    "Steam_Language": "english",
+}
+
+
+
+# Browser
+BROWSER_PROFILE_DIR = "scraped_data/chrome_profile" # Keeps cookies and the http cache between runs
+BROWSER_PAGE_LOAD_STRATEGY = "eager" # driver.get returns at DOMContentLoaded, not after every image
+BROWSER_BLOCKED_URLS: dict[str, list[str]] = { # Never needed for scraping, blocked through CDP
+    "image": ["*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.ico"],
+    "media": ["*.webm", "*.mp4", "*.m3u8", "*.mpd", "*.m4s"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf"],
+    "tracking": ["*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*"],
+}
+
+
+
+# Scraper Pool
+DRIVER_MEMORY_MB: int = 400 # Rough RSS of one headless chrome
+POOL_MAX_ATTEMPTS: int = 3 # Tries per game before giving up after driver crashes
+
+
+
+# Database
+DB_PATH = "scraped_data/steam_games_n_bundles.db"
+
+
+
+# Aggregate Tables
+PRICE_BANDS: tuple[float, ...] = (0, 5, 10, 20, 30, 50) # Lower band edges in euro, rebuild_aggregates() after changing them
+
+
+
+# Bulk Export / Import
+IO_CHUNK_SIZE: int = 5000 # Rows per fetchmany on export and per transaction on import
+IO_READ_SIZE: int = 64 * 1024 # Longest piece of one line read at once, GetAppList dumps are a single line
+
+
+
+# Batch Jobs
+BATCH_CHUNK_SIZE: int = 100 # Ids handed to the scraper at once
+BATCH_REPORT_INTERVAL: float = 10 # Seconds between progress lines
+BATCH_MAX_ID: int = 100_000_000 # Larger numbers are not steam ids, and would blow up the dedup bitmap
+
+
+
+# Staged Pipeline
+PIPELINE_FETCHERS: int = 8 # Fetcher threads, parser processes default to the core count
+PIPELINE_QUEUE_SIZE: int = 64 # Items waiting between two stages before the earlier one blocks
+PIPELINE_WRITE_BATCH: int = 50 # Parsed rows per db transaction
+
+
+
+# Crawl Frontier
+FRONTIER_BATCH_SIZE: int = 20 # Items claimed, scraped and checkpointed together
+FRONTIER_MAX_ATTEMPTS: int = 5
+FRONTIER_BACKOFF_BASE: float = 60 # Seconds before the first retry, doubled per attempt
+FRONTIER_BACKOFF_MAX: float = 6 * 60 * 60
+FRONTIER_LEASE: float = 15 * 60 # Claimed items not checkpointed in time are handed out again
+
+
+
+# Bundle Crawler
+CRAWL_MAX_DEPTH: int = 2 # Bundlelist hops away from the seed games
+CRAWL_BUDGET: int = 200 # Bundlelist pages visited per run
+
+
+
+# Raw Page Archive
+ARCHIVE_PATH = "scraped_data/pages" # index.db and the compressed page bodies
+ARCHIVE_COMMIT_EVERY: int = 100 # Index rows per commit
+ARCHIVE_REPLAY_CHUNK: int = 200 # Pages per task handed to a replay process
+ARCHIVE_REPLAY_SLACK: float = 300 # Seconds a stored game may be newer than the page and still come from that fetch
+
+
+
+# Tag Similarity Index
+LSH_INDEX_SUFFIX = "_tag_lsh_index.npz" # Replaces the database extension, each db keeps its own index
+LSH_NUM_PERM: int = 64 # MinHash signature length
+LSH_BANDS: int = 16 # 16 bands of 4 rows, pairs around 0.5 jaccard start colliding
+LSH_SAVE_INTERVAL: float = 300 # Seconds between saves at checkpoints, a save rewrites the whole file
+
+
+
+# Metrics
+METRICS_PATH = "scraped_data/metrics" # metrics.json and metrics.prom
+METRIC_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30) # Seconds
+
+
+
+# Columnar Snapshot
+SNAPSHOT_PATH = "scraped_data/snapshot"
+SNAPSHOT_MAX_SEGMENTS: int = 8 # Appended segments before a full rewrite
 
 
 ###############################
@@ -0,0 +1,255 @@
+import csv, gzip, json, logging, re, sys
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import islice
+from typing import ContextManager, IO, Iterable, Iterator
+
+import pandas as pd
+
+import funday_bundle.constants as const
+import funday_bundle.utils as util
+from funday_bundle.data_structures import CachedCollection, GameCache, BundleCache
+from funday_bundle.db_manager import DatabaseManager
+from funday_bundle.frontier import Frontier
+from funday_bundle.utils import UrlType
+
+
+# Bulk data in and out of the db. Everything streams in chunks of chunk_size
+# rows, from fetchmany on the way out and batched transactions on the way in,
+# so memory stays flat whatever the table size. Paths ending in .gz are
+# compressed, "-" is stdin/stdout.
+
+EXPORT_TABLES: dict[str, tuple[str, ...]] = {
+    "games": ("hash", "steam_id", "title", "price", "overall_rating", "overall_count", "tags", "release_date", "last_time_scraped"),
+    "bundles": ("hash", "steam_id", "title", "discount", "total_price", "tags", "games_in_bundle"),
+    "bundle_contents": ("game_hash", "bundle_hash"),
+}
+_JSON_COLUMNS = ("tags", "games_in_bundle") # Stored as json text
+
+_APPID_PATTERN = re.compile(r'"appid"\s*:\s*(\d+)') # Steam's GetAppList dump
+_LEADING_ID_PATTERN = re.compile(r'^\s*(\d+)\b') # Bare ids and the first column of a csv
+
+
+def open_text(path: str, mode: str = "r") -> ContextManager[IO[str]]:
+    if path == "-": # Left open when done
+        return nullcontext(sys.stdin if "r" in mode else sys.stdout)
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# ***
+# Export
+# ***
+
+def iter_table(db_manager: DatabaseManager, table: str, chunk_size: int = const.IO_CHUNK_SIZE) -> Iterator[list[tuple]]:
+    # Chunks of rows in EXPORT_TABLES column order, a cursor of its own so other reads can run meanwhile
+    columns = EXPORT_TABLES[table]
+    db_manager.flush()
+    cursor = db_manager.conn.execute(f"SELECT {', '.join(columns)} FROM {table}")
+    while rows := cursor.fetchmany(chunk_size):
+        yield [tuple(row) for row in rows]
+
+
+def iter_frames(db_manager: DatabaseManager, table: str, chunk_size: int = const.IO_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    columns = list(EXPORT_TABLES[table])
+    for rows in iter_table(db_manager, table, chunk_size):
+        frame = pd.DataFrame.from_records(rows, columns=columns)
+        for column in _JSON_COLUMNS:
+            if column in frame:
+                frame[column] = frame[column].map(lambda value: json.loads(value) if value else [])
+        yield frame
+
+
+def export_csv(db_manager: DatabaseManager, table: str, path: str, chunk_size: int = const.IO_CHUNK_SIZE) -> int:
+    # List columns stay json text, so the file imports back unchanged
+    written = 0
+    with open_text(path, "w") as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_TABLES[table])
+        for rows in iter_table(db_manager, table, chunk_size):
+            writer.writerows(rows)
+            written += len(rows)
+
+    logging.info(f"Exported {written} {table} rows to {path}")
+    return written
+
+
+def export_jsonl(db_manager: DatabaseManager, table: str, path: str, chunk_size: int = const.IO_CHUNK_SIZE) -> int:
+    columns = EXPORT_TABLES[table]
+    written = 0
+    with open_text(path, "w") as f:
+        for rows in iter_table(db_manager, table, chunk_size):
+            lines = []
+            for row in rows:
+                record = dict(zip(columns, row))
+                for column in _JSON_COLUMNS:
+                    if column in record:
+                        record[column] = json.loads(record[column]) if record[column] else []
+                lines.append(json.dumps(record, ensure_ascii=False))
+            f.write("\n".join(lines) + "\n")
+            written += len(rows)
+
+    logging.info(f"Exported {written} {table} rows to {path}")
+    return written
+
+
+# ***
+# Import
+# ***
+
+def iter_records(path: str) -> Iterator[dict]:
+    # Rows of a csv or jsonl dump as dicts, by file extension
+    with open_text(path) as f:
+        if ".jsonl" in path or ".ndjson" in path:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _as_list(value) -> list:
+    if isinstance(value, list):
+        return value
+    return json.loads(value) if value else []
+
+
+def _as_datetime(value) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _game_from_record(record: dict) -> GameCache | None:
+    try:
+        return GameCache(
+            hash=record["hash"],
+            steam_id=int(record["steam_id"]),
+            title=record["title"],
+            price=float(record["price"]),
+            overall_rating=float(record["overall_rating"]),
+            overall_count=int(record["overall_count"]),
+            tags=_as_list(record["tags"]),
+            release_date=_as_datetime(record["release_date"]),
+            last_time_scraped=_as_datetime(record["last_time_scraped"])
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        logging.error(f"Skipping game record {record.get('hash')}: {e}")
+        return None
+
+
+def _bundle_from_record(record: dict) -> BundleCache | None:
+    try:
+        return BundleCache(
+            hash=record["hash"],
+            steam_id=str(record["steam_id"]),
+            title=record["title"],
+            discount=float(record["discount"]),
+            total_price=float(record["total_price"]),
+            tags=_as_list(record["tags"]),
+            games_in_bundle=_as_list(record["games_in_bundle"])
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        logging.error(f"Skipping bundle record {record.get('hash')}: {e}")
+        return None
+
+
+def import_table(cache_collection: CachedCollection, table: str, path: str, chunk_size: int = const.IO_CHUNK_SIZE) -> int:
+    # Loads a dump made by export_csv/export_jsonl, one transaction per chunk, existing hashes are replaced
+    imported = 0
+    for records in _chunks(iter_records(path), chunk_size):
+        match table:
+            case "games":
+                rows = [game for game in map(_game_from_record, records) if game]
+                ok = cache_collection.add_games(rows)
+            case "bundles":
+                rows = [bundle for bundle in map(_bundle_from_record, records) if bundle]
+                ok = cache_collection.add_bundles(rows)
+            case "bundle_contents":
+                rows = [(record["game_hash"], record["bundle_hash"]) for record in records]
+                ok = cache_collection.add_bundle_contents(rows)
+            case _:
+                raise ValueError(f"Unknown table {table}")
+
+        if not ok:
+            logging.error(f"Import of {path} stopped after {imported} {table} rows")
+            break
+        imported += len(rows)
+        logging.info(f"Imported {imported} {table} rows from {path}")
+    return imported
+
+
+def iter_pieces(f: IO[str], size: int = const.IO_READ_SIZE) -> Iterator[str]:
+    # Lines, those longer than size in pieces of size, a one line json dump is never read whole
+    while piece := f.readline(size):
+        yield piece
+
+
+_CARRY = 64 # Longer than any "appid": <id> match
+
+
+def _line_id(line: str) -> str | None:
+    if "/app/" in line or "/bundle/" in line or "/bundlelist/" in line:
+        return util.extract_steam_id(line)
+    match = _LEADING_ID_PATTERN.match(line)
+    return match.group(1) if match else None
+
+
+def iter_ids(pieces: Iterable[str]) -> Iterator[str]:
+    # Steam ids from store links, bare ids, csv rows led by an id or GetAppList json, anything else is skipped.
+    # Takes lines or iter_pieces, a json line cut into pieces is matched across the cuts
+    line_start = True
+    in_json = False
+    head = "" # Start of a plain line, read for an id once the line ends
+    carry = "" # Unmatched tail of the current line, may hold a match or keyword cut in two
+
+    for piece in pieces:
+        complete = piece.endswith("\n")
+        if line_start:
+            in_json, head, carry = False, "", ""
+
+        text = carry + piece
+        in_json = in_json or '"appid"' in text
+        if not in_json:
+            if len(head) < const.IO_READ_SIZE:
+                head += piece
+            carry = "" if complete else text[-_CARRY:]
+            if complete:
+                steam_id = _line_id(head)
+                if steam_id:
+                    yield steam_id
+                head = ""
+        else:
+            # Matches too close to the cut wait for the next piece, a number may go on there
+            cutoff = len(text) if complete else len(text) - _CARRY
+            last = 0
+            for match in _APPID_PATTERN.finditer(text):
+                if match.end() > cutoff:
+                    break
+                yield match.group(1)
+                last = match.end()
+            carry = "" if complete else text[max(last, cutoff - _CARRY):]
+
+        line_start = complete
+
+    # Input ending without a newline
+    if in_json:
+        yield from _APPID_PATTERN.findall(carry)
+    elif head and (steam_id := _line_id(head)):
+        yield steam_id
+
+
+def import_ids_to_frontier(frontier: Frontier, path: str, url_type: UrlType = UrlType.GAME_PAGE,
+                           chunk_size: int = const.IO_CHUNK_SIZE) -> int:
+    # Queues every id in a dump for scraping, ids the frontier already has keep their state
+    added = 0
+    with open_text(path) as f:
+        for steam_ids in _chunks(iter_ids(iter_pieces(f)), chunk_size):
+            added += frontier.add(steam_ids, url_type)
+    logging.info(f"Queued {added} new {url_type.name} urls from {path}")
+    return added
@@ -1,9 +1,17 @@
-import logging
+import logging, threading, time
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import datetime
+from typing import TYPE_CHECKING, Generic, Iterable, TypeVar
 
+import funday_bundle.constants as const
 import funday_bundle.utils as util
-from funday_bundle.db_manager import DatabaseManager
+from funday_bundle.id_index import SteamIdBitmap
+
+if TYPE_CHECKING: # These import the dataclasses below, so they are loaded lazily
+    from funday_bundle.db_manager import DatabaseManager
+    from funday_bundle.tag_lsh import TagLSHIndex
+    from funday_bundle.bundle_graph import BundleGraph
 
 @dataclass(slots=True, frozen=True)
 class GameCache:
@@ -24,49 +32,302 @@ class BundleCache:
     title: str
     discount: float
     total_price: float
-    tags: list[str]
+    tags: list[str] # Always empty when scraped, see DatabaseManager.get_bundle_tag_discounts
     games_in_bundle: list[str] # Hashes of them
+
+
+T = TypeVar('T')
+
+@dataclass(slots=True)
+class LRUCache(Generic[T]):
+    max_size: int = 10_000
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    _items: OrderedDict[str, T] = field(default_factory=OrderedDict, init=False, repr=False)
+    # Shared by pool workers, async worker threads and the pipeline writer, a reorder must not meet an eviction
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: str) -> T | None:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def put(self, key: str, value: T) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"size": len(self._items), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
     
 
 @dataclass(slots=True)
 class CachedCollection:
-    db_manager: DatabaseManager = field(init=False, repr=False)
+    db_manager: 'DatabaseManager' = field(init=False, repr=False)
+    db_path: str = const.DB_PATH # The tag index is saved next to it
+    write_batch_size: int = 0 # Write-behind buffer size for the db, 0 commits every row
+    use_tag_index: bool = True # Allows the MinHash tag index, loaded on the first similar_games call
+    tag_index: 'TagLSHIndex | None' = field(default=None, init=False, repr=False) # Kept up to date once loaded
+    _tag_index_saved: float = field(default=0.0, init=False, repr=False)
+    use_bundle_graph: bool = True # Co-bundling graph from bundle_contents, built on the first get_bundle_graph call
+    bundle_graph: 'BundleGraph | None' = field(default=None, init=False, repr=False) # Kept up to date once built
+    snapshot_path: str | None = None # Columnar snapshot refreshed on close, see snapshot.py
+
+    # Recently used objects, kept in step with every add
+    object_cache_size: int = 10_000
+    game_cache: LRUCache[GameCache] = field(init=False, repr=False)
+    bundle_cache: LRUCache[BundleCache] = field(init=False, repr=False)
+
+    # Steam ids in the database, one bit each, see id_index.py
+    known_game_ids: SteamIdBitmap = field(init=False)
+    known_bundle_ids: SteamIdBitmap = field(init=False)
 
-    # Cached hashes from database to save time on lookup
-    known_game_hashes: set[str] = field(default_factory=set, init=False)
-    known_bundle_hashes: set[str] = field(default_factory=set, init=False)
+    # Steam ids currently being scraped, so parallel workers never fetch the same app
+    in_flight_ids: set[int] = field(default_factory=set, init=False)
+    _claim_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False) # Also held for writes to the known id bitmaps
 
     def __post_init__(self):
-        self.db_manager = DatabaseManager()
+        from funday_bundle.db_manager import DatabaseManager
+        self.db_manager = DatabaseManager(self.db_path, batch_size=self.write_batch_size)
+        self.db_manager.on_rows_dropped = self._forget_rows
+        self.game_cache = LRUCache(self.object_cache_size)
+        self.bundle_cache = LRUCache(self.object_cache_size)
         
-        self.known_game_hashes = self.db_manager.get_all_game_hashes()
-        self.known_bundle_hashes = self.db_manager.get_all_bundle_hashes()
-        logging.info(f"Loaded {len(self.known_game_hashes)} games and {len(self.known_bundle_hashes)} bundles into memory.")
+        self.known_game_ids = SteamIdBitmap(self.db_manager.get_all_game_ids())
+        self.known_bundle_ids = SteamIdBitmap(self.db_manager.get_all_bundle_ids())
+        logging.info(f"Loaded {len(self.known_game_ids)} games and {len(self.known_bundle_ids)} bundles into memory.")
+
+    def _forget_rows(self, games: list[GameCache], bundles: list[BundleCache]) -> None:
+        # Rows the db rejected, they counted as known since add_game. Ids with an
+        # older row still stored stay known
+        stored_games = self.db_manager.get_stored_hashes("games", [game.hash for game in games])
+        stored_bundles = self.db_manager.get_stored_hashes("bundles", [bundle.hash for bundle in bundles])
+        
+        with self._claim_lock:
+            for game in games:
+                self.in_flight_ids.discard(game.steam_id)
+                if game.hash not in stored_games:
+                    self.known_game_ids.discard(game.steam_id)
+            for bundle in bundles:
+                if bundle.hash not in stored_bundles:
+                    self.known_bundle_ids.discard(bundle.steam_id)
+        
+        for game in games:
+            self.game_cache.discard(game.hash)
+            if self.tag_index and game.hash not in stored_games:
+                self.tag_index.remove(game.hash)
+        for bundle in bundles:
+            self.bundle_cache.discard(bundle.hash)
+        if bundles:
+            self.bundle_graph = None # Edges can't be taken out, rebuilt from the db on next use
+        logging.error(f"Forgot {len(games)} games and {len(bundles)} bundles the DB rejected, they will be scraped again")
+
+    # ***
+    # Tag Index and Bundle Graph
+    # ***
+    
+    def get_tag_index(self) -> 'TagLSHIndex':
+        # Loaded on first use and synced with the games written since its last save
+        if self.tag_index is None:
+            if not self.use_tag_index:
+                raise RuntimeError("The tag index is turned off for this collection")
+            from funday_bundle.tag_lsh import TagLSHIndex
+            self.tag_index = TagLSHIndex.load_or_build(self.db_manager)
+            self._tag_index_saved = time.monotonic()
+        return self.tag_index
+    
+    def similar_games(self, game_hash: str, min_similarity: float = 0.0, limit: int | None = None) -> list[tuple[str, float]]:
+        return self.get_tag_index().similar_games(game_hash, min_similarity, limit)
+    
+    def get_bundle_graph(self) -> 'BundleGraph':
+        # Built from bundle_contents on first use, bundles added after that go in as deltas
+        if self.bundle_graph is None:
+            if not self.use_bundle_graph:
+                raise RuntimeError("The bundle graph is turned off for this collection")
+            from funday_bundle.bundle_graph import BundleGraph
+            self.bundle_graph = BundleGraph.from_database(self.db_manager)
+        return self.bundle_graph
+    
+    def checkpoint(self, force: bool = False) -> None:
+        # Saves the tag index with the write_seq it covers, at most every LSH_SAVE_INTERVAL seconds.
+        # A crash loses only what was written since, the next load re-reads exactly that
+        if not self.tag_index:
+            return
+        if not force and time.monotonic() - self._tag_index_saved < const.LSH_SAVE_INTERVAL:
+            return
+        if self.db_manager.flush():
+            self.tag_index.save(self.db_manager.get_write_seq())
+            self._tag_index_saved = time.monotonic()
+
+    def is_known_game(self, steam_id: int | str) -> bool:
+        return steam_id in self.known_game_ids
+
+    def is_known_bundle(self, bundle_id: int | str) -> bool:
+        return bundle_id in self.known_bundle_ids
+
+    def claim_game(self, steam_id: int, force: bool = False) -> bool:
+        # force claims known games too, used when re-scraping stale rows
+        with self._claim_lock:
+            if steam_id in self.in_flight_ids:
+                return False
+            if not force and steam_id in self.known_game_ids:
+                return False
+            self.in_flight_ids.add(steam_id)
+            return True
+
+    def release_game(self, steam_id: int) -> None:
+        with self._claim_lock:
+            self.in_flight_ids.discard(steam_id)
 
     def add_game(self, game_obj: GameCache) -> bool:
+        # Known before the write, a flush this row sets off may already hand it to _forget_rows
+        with self._claim_lock:
+            self.known_game_ids.add(game_obj.steam_id)
+        self.game_cache.put(game_obj.hash, game_obj)
+        if self.tag_index:
+            self.tag_index.update(game_obj.hash, game_obj.tags)
+        
         if self.db_manager.add_game(game_obj):
-            self.known_game_hashes.add(game_obj.hash)
+            self.release_game(game_obj.steam_id)
             return True
         
+        self._forget_rows([game_obj], [])
         return False
             
+    def add_games(self, game_objs: list[GameCache]) -> bool:
+        success = self.db_manager.add_games(game_objs)
+        with self._claim_lock:
+            for game_obj in game_objs:
+                if success:
+                    self.known_game_ids.add(game_obj.steam_id)
+                self.in_flight_ids.discard(game_obj.steam_id)
+        if success:
+            for game_obj in game_objs:
+                self.game_cache.put(game_obj.hash, game_obj)
+                if self.tag_index:
+                    self.tag_index.update(game_obj.hash, game_obj.tags)
+        return success
+
     def add_bundle(self, bundle_obj: BundleCache) -> bool:
+        # Known before the write, as in add_game
+        with self._claim_lock:
+            self.known_bundle_ids.add(bundle_obj.steam_id)
+        self.bundle_cache.put(bundle_obj.hash, bundle_obj)
+        
         if self.db_manager.add_bundle(bundle_obj):
-            self.known_bundle_hashes.add(bundle_obj.hash)
+            if self.bundle_graph:
+                self.bundle_graph.add_bundle(bundle_obj.hash, bundle_obj.games_in_bundle)
+            return True
+        
+        self._forget_rows([], [bundle_obj])
+        return False
+
+    def add_bundles(self, bundle_objs: list[BundleCache]) -> bool:
+        if self.db_manager.add_bundles(bundle_objs):
+            with self._claim_lock:
+                self.known_bundle_ids.add_many(int(bundle_obj.steam_id) for bundle_obj in bundle_objs)
+            for bundle_obj in bundle_objs:
+                self.bundle_cache.put(bundle_obj.hash, bundle_obj)
+                if self.bundle_graph:
+                    self.bundle_graph.add_bundle(bundle_obj.hash, bundle_obj.games_in_bundle)
             return True
         return False
     
-    def does_game_exists(self, steam_id_hash: str, return_object=False) -> GameCache | bool:
-        if steam_id_hash not in self.known_game_hashes:
+    def add_bundle_contents(self, pairs: list[tuple[str, str]]) -> bool:
+        if not self.db_manager.add_bundle_contents(pairs):
+            return False
+        if self.bundle_graph:
+            games_by_bundle: dict[str, list[str]] = {}
+            for game_hash, bundle_hash in pairs:
+                games_by_bundle.setdefault(bundle_hash, []).append(game_hash)
+            for bundle_hash, games in games_by_bundle.items():
+                self.bundle_graph.add_bundle(bundle_hash, games)
+        return True
+    
+    def does_game_exists(self, steam_id: int | str, return_object=False) -> GameCache | bool:
+        if steam_id not in self.known_game_ids:
             return False
         
         if return_object:
-            game = self.db_manager.get_game(steam_id_hash)
+            game = self.get_game(util.get_hash_by_id(steam_id, util.UrlType.GAME_PAGE))
             if game:
-                return True
+                return game
             else:
                 return False
         return True
     
+    # ***
+    # Object Lookups (LRU first, then the db)
+    # ***
+    
+    def get_game(self, game_hash: str) -> GameCache | None:
+        game = self.game_cache.get(game_hash)
+        if game is None:
+            game = self.db_manager.get_game(game_hash)
+            if game:
+                self.game_cache.put(game_hash, game)
+        return game
+    
+    def get_games(self, game_hashes: Iterable[str]) -> dict[str, GameCache]:
+        found: dict[str, GameCache] = {}
+        missing: list[str] = []
+        for game_hash in game_hashes:
+            game = self.game_cache.get(game_hash)
+            if game is not None:
+                found[game_hash] = game
+            else:
+                missing.append(game_hash)
+        
+        for game_hash, game in self.db_manager.get_games(missing).items():
+            self.game_cache.put(game_hash, game)
+            found[game_hash] = game
+        return found
+    
+    def get_bundle(self, bundle_hash: str) -> BundleCache | None:
+        bundle = self.bundle_cache.get(bundle_hash)
+        if bundle is None:
+            bundle = self.db_manager.get_bundle(bundle_hash)
+            if bundle:
+                self.bundle_cache.put(bundle_hash, bundle)
+        return bundle
+    
+    def get_bundles(self, bundle_hashes: Iterable[str]) -> dict[str, BundleCache]:
+        found: dict[str, BundleCache] = {}
+        missing: list[str] = []
+        for bundle_hash in bundle_hashes:
+            bundle = self.bundle_cache.get(bundle_hash)
+            if bundle is not None:
+                found[bundle_hash] = bundle
+            else:
+                missing.append(bundle_hash)
+        
+        for bundle_hash, bundle in self.db_manager.get_bundles(missing).items():
+            self.bundle_cache.put(bundle_hash, bundle)
+            found[bundle_hash] = bundle
+        return found
+    
     def close_connections(self) -> None:
-        self.db_manager.close_connection()
\ No newline at end of file
+        try:
+            self.checkpoint(force=True)
+            if self.snapshot_path:
+                from funday_bundle.snapshot import refresh_snapshot
+                refresh_snapshot(self.db_manager, self.snapshot_path)
+        finally:
+            self.db_manager.close_connection()
\ No newline at end of file
@@ -1,15 +1,50 @@
 import sqlite3
 import json
 import logging
+import math
+import threading
+import time
+from bisect import bisect_right
 from datetime import datetime
+from typing import Callable, Iterable, Iterator
+import funday_bundle.constants as const
+import funday_bundle.utils as util
 from funday_bundle.data_structures import GameCache, BundleCache
+from funday_bundle.utils import HistoryMetric, UrlType
 
 class DatabaseManager:
-    def __init__(self, db_path: str = "scraped_data/steam_games_n_bundles.db"):
+    # batch_size > 0 turns on write-behind: add_game/add_bundle are buffered and
+    # flushed in one transaction when batch_size rows pile up, or by a timer thread
+    # when flush_interval seconds pass without a flush. Rows that fail to
+    # flush stay buffered for the next try, only rows the db rejects on their own
+    # are dropped and handed to on_rows_dropped.
+    def __init__(self, db_path: str = const.DB_PATH, batch_size: int = 0, flush_interval: float = 5.0):
         self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
+        # Handed to the pipeline's writer thread, only one thread uses it at a time
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row  # Allows accessing columns by name
+        self.conn.create_function("log1p", 1, math.log1p, deterministic=True) # sqlite math functions are a build option
+        
+        # WAL lets readers run next to the writer, NORMAL only fsyncs on checkpoints
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending_games: list[GameCache] = []
+        self._pending_bundles: list[BundleCache] = []
+        self._last_flush = time.monotonic()
+        self.on_rows_dropped: Callable[[list[GameCache], list[BundleCache]], None] | None = None
+        
+        # Held for every write transaction, the flush timer shares the connection
+        self.lock = threading.RLock()
+        self._flush_timer: threading.Thread | None = None
+        self._closed = threading.Event()
+        
+        self._tag_ids: dict[str, int] = {} # name -> tags.id, cleared on rollback
+        
         self._create_tables()
+        self._migrate()
 
     def _create_tables(self):
         cursor = self.conn.cursor()
@@ -53,132 +88,923 @@ class DatabaseManager:
         # Note: The Primary Key (game_hash, bundle_hash) automatically indexes 
         # game_hash, making lookups extremely fast.
         
+        # The other direction, bundle tags are read through a bundle's games
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_bundle_contents_bundle ON bundle_contents (bundle_hash, game_hash)
+        ''')
+        
+        # Identity is the steam id, the hash is derived from it
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_games_steam_id ON games (steam_id)
+        ''')
+        
+        # Lets the refresh scheduler pick the oldest rows without a table scan
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_games_last_time_scraped ON games (last_time_scraped)
+        ''')
+        
+        # Tag dictionary and game <-> tag junction, so tag queries run as indexed sql
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tags (
+                id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS game_tags (
+                game_hash TEXT,
+                tag_id INTEGER,
+                PRIMARY KEY (game_hash, tag_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_game_tags_tag ON game_tags (tag_id, game_hash)
+        ''')
+        
+        # Price and review history, one row per metric and only when the value changed,
+        # so it grows with the changes and not with the scrapes. time is unix seconds
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS game_history (
+                game_hash TEXT,
+                metric INTEGER,
+                time INTEGER,
+                value REAL,
+                PRIMARY KEY (game_hash, metric, time)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Summaries kept up to date by every game/bundle write, so dashboards read a
+        # handful of rows instead of scanning the catalog. Sums, averages are sum / count
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tag_stats (
+                tag_id INTEGER PRIMARY KEY,
+                game_count INTEGER DEFAULT 0,
+                rating_sum REAL DEFAULT 0,
+                rated_count INTEGER DEFAULT 0,
+                price_sum REAL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS price_bands (
+                band INTEGER PRIMARY KEY, -- index into PRICE_BANDS
+                game_count INTEGER DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bundle_tag_stats (
+                tag_id INTEGER PRIMARY KEY,
+                bundle_count INTEGER DEFAULT 0,
+                discount_sum REAL DEFAULT 0
+            )
+        ''')
+        
+        # Crawl frontier, see frontier.py
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                url_type INTEGER,
+                steam_id TEXT,
+                depth INTEGER DEFAULT 0,
+                state TEXT,
+                attempts INTEGER DEFAULT 0,
+                next_eligible REAL,
+                last_error TEXT,
+                updated_at REAL
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_frontier_state ON frontier (state, next_eligible)
+        ''')
+        
         self.conn.commit()
+    
+    
+    # ***
+    # Migrations (tracked with PRAGMA user_version)
+    # ***
+    
+    def _migrate(self) -> None:
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        
+        if version < 1:
+            self._migrate_tags_to_junction()
+            self.conn.execute("PRAGMA user_version = 1")
+        
+        if version < 2:
+            self._migrate_canonical_hashes()
+            self.conn.execute("PRAGMA user_version = 2")
+        
+        if version < 3:
+            self._migrate_seed_history()
+            self.conn.execute("PRAGMA user_version = 3")
+        
+        if version < 4:
+            self.rebuild_aggregates()
+            self.conn.execute("PRAGMA user_version = 4")
+        
+        if version < 5:
+            self._migrate_write_seq()
+            self.conn.execute("PRAGMA user_version = 5")
+        
+        if version < 6:
+            # Bundle tags are derived from the member games now, the old bundle_tag_stats were empty
+            if version >= 4:
+                self.rebuild_aggregates()
+            self.conn.execute("PRAGMA user_version = 6")
+    
+    def _migrate_tags_to_junction(self) -> None:
+        # Fills game_tags from the json text column of databases made before it existed
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT hash, tags FROM games")
+        
+        with self.conn:
+            while rows := cursor.fetchmany(1000):
+                tags_by_game = {row['hash']: json.loads(row['tags']) if row['tags'] else [] for row in rows}
+                self._insert_game_tags(self.conn.cursor(), tags_by_game)
+        
+        logging.info("Migrated game tags into game_tags table.")
+    
+    def _find_renames(self, table: str, url_type: UrlType) -> dict[str, str]:
+        renames: dict[str, str] = {}
+        for row in self.conn.execute(f"SELECT hash, steam_id FROM {table} WHERE steam_id IS NOT NULL"):
+            canonical = util.get_hash_by_id(row['steam_id'], url_type)
+            if canonical != row['hash']:
+                renames[row['hash']] = canonical
+        return renames
+    
+    def _migrate_canonical_hashes(self) -> None:
+        # Rows keyed by an older url form get the hash of their steam id's canonical url,
+        # a row already under the canonical key is kept over the old one
+        game_renames = self._find_renames("games", UrlType.GAME_PAGE)
+        bundle_renames = self._find_renames("bundles", UrlType.BUNDLE_PAGE)
+        if not game_renames and not bundle_renames:
+            return
+        
+        with self.conn:
+            cursor = self.conn.cursor()
+            for table, column, renames in (
+                ("games", "hash", game_renames),
+                ("game_tags", "game_hash", game_renames),
+                ("bundle_contents", "game_hash", game_renames),
+                ("bundles", "hash", bundle_renames),
+                ("bundle_contents", "bundle_hash", bundle_renames),
+            ):
+                cursor.executemany(f"UPDATE OR IGNORE {table} SET {column} = ? WHERE {column} = ?", [(new, old) for old, new in renames.items()])
+                cursor.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(old,) for old in renames])
+            
+            if game_renames:
+                rows = cursor.execute("SELECT hash, games_in_bundle FROM bundles").fetchall()
+                cursor.executemany("UPDATE bundles SET games_in_bundle = ? WHERE hash = ?", [
+                    (json.dumps([game_renames.get(h, h) for h in json.loads(row['games_in_bundle'])]), row['hash'])
+                    for row in rows if row['games_in_bundle']
+                ])
+        
+        logging.info(f"Migrated {len(game_renames)} game and {len(bundle_renames)} bundle rows to canonical hashes.")
+    
+    def _migrate_write_seq(self) -> None:
+        # Every games write stamps its rows with the next sequence number, existing rows start at 0
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(games)")}
+        with self.conn:
+            if "write_seq" not in columns:
+                self.conn.execute("ALTER TABLE games ADD COLUMN write_seq INTEGER NOT NULL DEFAULT 0")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_games_write_seq ON games (write_seq)")
+        
+        logging.info("Added write_seq change marker to games.")
+    
+    def _migrate_seed_history(self) -> None:
+        # The values already stored become the first point of every game
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT * FROM games")
+        
+        with self.conn:
+            while rows := cursor.fetchmany(1000):
+                self._insert_history(self.conn.cursor(), [game for game in map(self._row_to_game, rows) if game])
+        
+        logging.info("Seeded game_history from the games table.")
 
-    def add_game(self, game: 'GameCache') -> bool:
+    # ***
+    # Row Conversion
+    # ***
+    
+    @staticmethod
+    def _game_to_row(game: GameCache) -> tuple:
+        return (
+            game.hash,
+            game.steam_id,
+            game.title,
+            game.price,
+            game.overall_rating,
+            game.overall_count,
+            json.dumps(game.tags), # Convert list to JSON string
+            game.release_date.isoformat() if game.release_date else None,
+            game.last_time_scraped.isoformat() if game.last_time_scraped else None
+        )
+    
+    @staticmethod
+    def _bundle_to_row(bundle: BundleCache) -> tuple:
+        return (
+            bundle.hash,
+            bundle.steam_id,
+            bundle.title,
+            bundle.discount,
+            bundle.total_price,
+            json.dumps(bundle.tags),
+            json.dumps(bundle.games_in_bundle)
+        )
+    
+    
+    @staticmethod
+    def _row_to_game(row: sqlite3.Row) -> GameCache | None:
         try:
+            return GameCache(
+                hash=row['hash'],
+                steam_id=row['steam_id'],
+                title=row['title'],
+                price=row['price'],
+                overall_rating=row['overall_rating'],
+                overall_count=row['overall_count'],
+                tags=json.loads(row['tags']) if row['tags'] else [],
+                release_date=datetime.fromisoformat(row['release_date']) if row['release_date'] else None,
+                last_time_scraped=datetime.fromisoformat(row['last_time_scraped']) if row['last_time_scraped'] else None
+            )
+        except Exception as e:
+            logging.error(f"Error parsing game from DB: {e}")
+            return None
+    
+    @staticmethod
+    def _row_to_bundle(row: sqlite3.Row) -> BundleCache | None:
+        try:
+            return BundleCache(
+                hash=row['hash'],
+                steam_id=row['steam_id'],
+                title=row['title'],
+                discount=row['discount'],
+                total_price=row['total_price'],
+                tags=json.loads(row['tags']) if row['tags'] else [],
+                games_in_bundle=json.loads(row['games_in_bundle']) if row['games_in_bundle'] else []
+            )
+        except Exception as e:
+            logging.error(f"Error parsing bundle from DB: {e}")
+            return None
+    
+    def _select_by_hashes(self, table: str, hashes: Iterable[str], chunk_size: int, convert) -> Iterator:
+        hashes = list(dict.fromkeys(hashes))
+        cursor = self.conn.cursor()
+        
+        for i in range(0, len(hashes), chunk_size):
+            chunk = hashes[i:i + chunk_size]
+            cursor.execute(f"SELECT * FROM {table} WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+            yield from (convert(row) for row in cursor.fetchall())
+    
+    
+    # ***
+    # Writing
+    # ***
+    
+    def _get_tag_ids(self, cursor: sqlite3.Cursor, names: set[str]) -> dict[str, int]:
+        missing = [name for name in names if name not in self._tag_ids]
+        
+        if missing:
+            cursor.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(name,) for name in missing])
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                cursor.execute(f"SELECT id, name FROM tags WHERE name IN ({','.join('?' * len(chunk))})", chunk)
+                self._tag_ids.update({row['name']: row['id'] for row in cursor.fetchall()})
+        
+        return {name: self._tag_ids[name] for name in names}
+    
+    def _insert_game_tags(self, cursor: sqlite3.Cursor, tags_by_game: dict[str, list[str]]) -> None:
+        tag_ids = self._get_tag_ids(cursor, {tag for tags in tags_by_game.values() for tag in tags})
+        
+        # Replaced games drop their old tags first
+        cursor.executemany("DELETE FROM game_tags WHERE game_hash = ?", [(game_hash,) for game_hash in tags_by_game])
+        cursor.executemany('''
+            INSERT OR IGNORE INTO game_tags (game_hash, tag_id)
+            VALUES (?, ?)
+        ''', [(game_hash, tag_ids[tag]) for game_hash, tags in tags_by_game.items() for tag in tags])
+    
+    @staticmethod
+    def _to_unix(moment: datetime | None) -> int:
+        return int((moment if moment else datetime.now()).timestamp())
+    
+    def _insert_history(self, cursor: sqlite3.Cursor, games: Iterable[GameCache]) -> None:
+        # A point is only added when it differs from the point in effect at its time
+        points = []
+        for game in games:
+            moment = self._to_unix(game.last_time_scraped)
+            for metric, value in (
+                (HistoryMetric.PRICE, game.price),
+                (HistoryMetric.OVERALL_RATING, game.overall_rating),
+                (HistoryMetric.OVERALL_COUNT, game.overall_count),
+            ):
+                if value is not None:
+                    points.append({"hash": game.hash, "metric": metric.value, "time": moment, "value": value})
+        
+        cursor.executemany('''
+            INSERT OR IGNORE INTO game_history (game_hash, metric, time, value)
+            SELECT :hash, :metric, :time, :value
+            WHERE :value IS NOT (
+                SELECT value FROM game_history
+                WHERE game_hash = :hash AND metric = :metric AND time <= :time
+                ORDER BY time DESC LIMIT 1
+            )
+        ''', points)
+    
+    def _insert_games(self, cursor: sqlite3.Cursor, games: list[GameCache]) -> None:
+        # Rows being replaced take their old contribution out of the aggregates
+        games = list({game.hash: game for game in games}.values())
+        old_games = [game for game in self._select_by_hashes("games", [game.hash for game in games], 500, self._row_to_game) if game]
+        tag_delta: dict[int, list] = {}
+        band_delta: dict[int, int] = {}
+        self._add_game_contributions(cursor, old_games, -1, tag_delta, band_delta)
+        self._add_game_contributions(cursor, games, 1, tag_delta, band_delta)
+        
+        # Bundles take their tags from their games, only games with new tags move them
+        old_tags = {game.hash: set(game.tags) for game in old_games}
+        retagged = [game.hash for game in games if set(game.tags) != old_tags.get(game.hash, set())]
+        bundle_hashes = self._get_bundles_of_games(cursor, retagged)
+        old_bundle_tags = self._get_bundle_tag_sets(cursor, bundle_hashes)
+        
+        # One sequence number per write, it only grows, unlike last_time_scraped of replayed or imported rows
+        write_seq = cursor.execute("SELECT COALESCE(MAX(write_seq), 0) + 1 FROM games").fetchone()[0]
+        cursor.executemany('''
+            INSERT OR REPLACE INTO games 
+            (hash, steam_id, title, price, overall_rating, overall_count, tags, release_date, last_time_scraped, write_seq)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(*self._game_to_row(game), write_seq) for game in games])
+        
+        self._insert_game_tags(cursor, {game.hash: game.tags for game in games})
+        self._insert_history(cursor, games)
+        self._apply_game_deltas(cursor, tag_delta, band_delta)
+        self._apply_bundle_tag_change(cursor, old_bundle_tags, self._get_bundle_tag_sets(cursor, bundle_hashes))
+    
+    def _insert_bundles(self, cursor: sqlite3.Cursor, bundles: list[BundleCache]) -> None:
+        bundles = list({bundle.hash: bundle for bundle in bundles}.values())
+        bundle_hashes = [bundle.hash for bundle in bundles]
+        old_bundle_tags = self._get_bundle_tag_sets(cursor, bundle_hashes)
+        
+        cursor.executemany('''
+            INSERT OR REPLACE INTO bundles 
+            (hash, steam_id, title, discount, total_price, tags, games_in_bundle)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [self._bundle_to_row(bundle) for bundle in bundles])
+        
+        # Prepare list of tuples for bulk insertion: [(game1, bundleA), (game2, bundleA)]
+        contents_data = [(g_hash, bundle.hash) for bundle in bundles for g_hash in bundle.games_in_bundle]
+
+        cursor.executemany('''
+            INSERT OR IGNORE INTO bundle_contents (game_hash, bundle_hash)
+            VALUES (?, ?)
+        ''', contents_data)
+        
+        self._apply_bundle_tag_change(cursor, old_bundle_tags, self._get_bundle_tag_sets(cursor, bundle_hashes))
+    
+    # ***
+    # Aggregates
+    # ***
+    
+    @staticmethod
+    def _price_band(price: float | None) -> int:
+        return max(0, bisect_right(const.PRICE_BANDS, price or 0) - 1)
+    
+    def _add_game_contributions(self, cursor: sqlite3.Cursor, games: list[GameCache], sign: int,
+                                tag_delta: dict[int, list], band_delta: dict[int, int]) -> None:
+        # sign -1 takes games out, tag_delta holds [game_count, rating_sum, rated_count, price_sum]
+        tag_ids = self._get_tag_ids(cursor, {tag for game in games for tag in game.tags})
+        
+        for game in games:
+            band = self._price_band(game.price)
+            band_delta[band] = band_delta.get(band, 0) + sign
+            
+            for tag in set(game.tags): # game_tags keeps every tag once
+                delta = tag_delta.setdefault(tag_ids[tag], [0, 0.0, 0, 0.0])
+                delta[0] += sign
+                if game.overall_rating is not None:
+                    delta[1] += sign * game.overall_rating
+                    delta[2] += sign
+                delta[3] += sign * (game.price or 0)
+    
+    @staticmethod
+    def _get_bundles_of_games(cursor: sqlite3.Cursor, game_hashes: list[str]) -> list[str]:
+        bundle_hashes: set[str] = set()
+        for i in range(0, len(game_hashes), 500):
+            chunk = game_hashes[i:i + 500]
+            cursor.execute(f"SELECT bundle_hash FROM bundle_contents WHERE game_hash IN ({','.join('?' * len(chunk))})", chunk)
+            bundle_hashes.update(row['bundle_hash'] for row in cursor.fetchall())
+        return list(bundle_hashes)
+    
+    @staticmethod
+    def _get_bundle_tag_sets(cursor: sqlite3.Cursor, bundle_hashes: Iterable[str]) -> dict[str, tuple[float, set[int]]]:
+        # bundle hash -> (discount, tag ids of its games). The bundle page has no tags, so
+        # BundleCache.tags stays empty and the stored games are the only source
+        tag_sets: dict[str, tuple[float, set[int]]] = {}
+        bundle_hashes = list(dict.fromkeys(bundle_hashes))
+        
+        for i in range(0, len(bundle_hashes), 500):
+            chunk = bundle_hashes[i:i + 500]
+            cursor.execute(f'''
+                SELECT DISTINCT b.hash, b.discount, gt.tag_id
+                FROM bundles b
+                LEFT JOIN bundle_contents bc ON bc.bundle_hash = b.hash
+                LEFT JOIN game_tags gt ON gt.game_hash = bc.game_hash
+                WHERE b.hash IN ({','.join('?' * len(chunk))})
+            ''', chunk)
+            for row in cursor.fetchall():
+                _, tag_ids = tag_sets.setdefault(row['hash'], (row['discount'] or 0.0, set()))
+                if row['tag_id'] is not None:
+                    tag_ids.add(row['tag_id'])
+        return tag_sets
+    
+    @staticmethod
+    def _add_bundle_contributions(tag_sets: dict[str, tuple[float, set[int]]], sign: int, tag_delta: dict[int, list]) -> None:
+        # tag_delta holds [bundle_count, discount_sum]
+        for discount, tag_ids in tag_sets.values():
+            for tag_id in tag_ids:
+                delta = tag_delta.setdefault(tag_id, [0, 0.0])
+                delta[0] += sign
+                delta[1] += sign * discount
+    
+    def _apply_bundle_tag_change(self, cursor: sqlite3.Cursor, old_tag_sets: dict[str, tuple[float, set[int]]],
+                                 new_tag_sets: dict[str, tuple[float, set[int]]]) -> None:
+        tag_delta: dict[int, list] = {}
+        self._add_bundle_contributions(old_tag_sets, -1, tag_delta)
+        self._add_bundle_contributions(new_tag_sets, 1, tag_delta)
+        self._apply_bundle_deltas(cursor, tag_delta)
+    
+    def _apply_game_deltas(self, cursor: sqlite3.Cursor, tag_delta: dict[int, list], band_delta: dict[int, int]) -> None:
+        cursor.executemany('''
+            INSERT INTO tag_stats (tag_id, game_count, rating_sum, rated_count, price_sum) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (tag_id) DO UPDATE SET
+                game_count = game_count + excluded.game_count,
+                rating_sum = rating_sum + excluded.rating_sum,
+                rated_count = rated_count + excluded.rated_count,
+                price_sum = price_sum + excluded.price_sum
+        ''', [(tag_id, *delta) for tag_id, delta in tag_delta.items() if any(delta)])
+        cursor.executemany('''
+            INSERT INTO price_bands (band, game_count) VALUES (?, ?)
+            ON CONFLICT (band) DO UPDATE SET game_count = game_count + excluded.game_count
+        ''', [(band, delta) for band, delta in band_delta.items() if delta])
+    
+    def _apply_bundle_deltas(self, cursor: sqlite3.Cursor, tag_delta: dict[int, list]) -> None:
+        cursor.executemany('''
+            INSERT INTO bundle_tag_stats (tag_id, bundle_count, discount_sum) VALUES (?, ?, ?)
+            ON CONFLICT (tag_id) DO UPDATE SET
+                bundle_count = bundle_count + excluded.bundle_count,
+                discount_sum = discount_sum + excluded.discount_sum
+        ''', [(tag_id, *delta) for tag_id, delta in tag_delta.items() if any(delta)])
+    
+    def rebuild_aggregates(self, chunk_size: int = 1000) -> None:
+        # Recomputes every summary from games and bundles, for recovery or new PRICE_BANDS
+        self._flush_before_read()
+        tag_delta: dict[int, list] = {}
+        band_delta: dict[int, int] = {}
+        
+        with self.lock, self.conn:
             cursor = self.conn.cursor()
+            for table in ("tag_stats", "price_bands", "bundle_tag_stats"):
+                cursor.execute(f"DELETE FROM {table}")
+            
+            reader = self.conn.execute("SELECT * FROM games")
+            while rows := reader.fetchmany(chunk_size):
+                self._add_game_contributions(cursor, [game for game in map(self._row_to_game, rows) if game], 1, tag_delta, band_delta)
+            
+            self._apply_game_deltas(cursor, tag_delta, band_delta)
+            
+            # Every tag of a bundle's games counts the bundle once
             cursor.execute('''
-                INSERT OR REPLACE INTO games 
-                (hash, steam_id, title, price, overall_rating, overall_count, tags, release_date, last_time_scraped)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                game.hash,
-                game.steam_id,
-                game.title,
-                game.price,
-                game.overall_rating,
-                game.overall_count,
-                json.dumps(game.tags), # Convert list to JSON string
-                game.release_date.isoformat() if game.release_date else None,
-                game.last_time_scraped.isoformat() if game.last_time_scraped else None
-            ))
-            self.conn.commit()
+                INSERT INTO bundle_tag_stats (tag_id, bundle_count, discount_sum)
+                SELECT tag_id, COUNT(*), SUM(discount) FROM (
+                    SELECT DISTINCT b.hash, COALESCE(b.discount, 0) AS discount, gt.tag_id
+                    FROM bundles b
+                    JOIN bundle_contents bc ON bc.bundle_hash = b.hash
+                    JOIN game_tags gt ON gt.game_hash = bc.game_hash
+                )
+                GROUP BY tag_id
+            ''')
+            bundle_tags = cursor.rowcount
+        
+        logging.info(f"Rebuilt aggregates for {len(tag_delta)} game tags and {bundle_tags} bundle tags.")
+    
+    def add_games(self, games: Iterable[GameCache]) -> bool:
+        games = list(games)
+        if not games:
+            return True
+        
+        try:
+            with self.lock, self.conn: # One transaction, commits on success and rolls back on error
+                self._insert_games(self.conn.cursor(), games)
             return True
         except Exception as e:
-            logging.error(f"Failed to add game to DB: {e}")
+            self._tag_ids.clear()
+            logging.error(f"Failed to add {len(games)} games to DB: {e}")
             return False
+    
+    def add_bundles(self, bundles: Iterable[BundleCache]) -> bool:
+        bundles = list(bundles)
+        if not bundles:
+            return True
+        
+        try:
+            with self.lock, self.conn:
+                self._insert_bundles(self.conn.cursor(), bundles)
+            return True
+        except Exception as e:
+            self._tag_ids.clear()
+            logging.error(f"Failed to add {len(bundles)} bundles to DB: {e}")
+            return False
+    
+    def flush(self) -> bool:
+        # True once nothing is buffered any more
+        with self.lock:
+            self._last_flush = time.monotonic()
+            games, bundles = list(self._pending_games), list(self._pending_bundles)
+            if not games and not bundles:
+                return True
+            
+            try:
+                with self.conn:
+                    cursor = self.conn.cursor()
+                    self._insert_games(cursor, games)
+                    self._insert_bundles(cursor, bundles)
+                self._pending_games, self._pending_bundles = [], []
+                logging.info(f"Flushed {len(games)} games and {len(bundles)} bundles to DB")
+                return True
+            except sqlite3.OperationalError as e:
+                # Locked or busy db, every row is kept for the next flush
+                self._tag_ids.clear()
+                logging.error(f"Failed to flush {len(games)} games and {len(bundles)} bundles to DB, kept for retry: {e}")
+                return False
+            except Exception as e:
+                self._tag_ids.clear()
+                logging.error(f"Failed to flush {len(games)} games and {len(bundles)} bundles to DB, retrying row by row: {e}")
+            
+            return self._flush_row_by_row(games, bundles)
+    
+    def _flush_row_by_row(self, games: list[GameCache], bundles: list[BundleCache]) -> bool:
+        # Finds the rows at fault, the rest is committed. A locked db on the way keeps everything left buffered
+        kept: dict[str, list] = {"games": [], "bundles": []}
+        dropped: dict[str, list] = {"games": [], "bundles": []}
+        blocked = False
+        
+        for table, rows, insert in (("games", games, self._insert_games), ("bundles", bundles, self._insert_bundles)):
+            for row in rows:
+                if blocked:
+                    kept[table].append(row)
+                    continue
+                try:
+                    with self.conn:
+                        insert(self.conn.cursor(), [row])
+                except sqlite3.OperationalError as e:
+                    self._tag_ids.clear()
+                    logging.error(f"DB unavailable during flush, keeping the rest buffered: {e}")
+                    kept[table].append(row)
+                    blocked = True
+                except Exception as e:
+                    self._tag_ids.clear()
+                    logging.error(f"Dropping {table} row {row.hash} the DB rejected: {e}")
+                    dropped[table].append(row)
+        
+        self._pending_games, self._pending_bundles = kept["games"], kept["bundles"]
+        if (dropped["games"] or dropped["bundles"]) and self.on_rows_dropped:
+            self.on_rows_dropped(dropped["games"], dropped["bundles"])
+        return not blocked and not dropped["games"] and not dropped["bundles"]
+    
+    def _run_flush_timer(self) -> None:
+        while not self._closed.wait(self.flush_interval / 2):
+            if time.monotonic() - self._last_flush >= self.flush_interval and (self._pending_games or self._pending_bundles):
+                try:
+                    self.flush()
+                except Exception as e: # Never let the timer die, the next tick tries again
+                    logging.error(f"Timed flush failed: {e}")
+    
+    def _maybe_flush(self) -> bool:
+        # Started on the first buffered row, batch_size can be switched on after init
+        if self._flush_timer is None:
+            self._flush_timer = threading.Thread(target=self._run_flush_timer, name="db-flush-timer", daemon=True)
+            self._flush_timer.start()
+        
+        pending = len(self._pending_games) + len(self._pending_bundles)
+        if pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            # A failed flush keeps the rows buffered, the caller's row is not lost
+            self.flush()
+        return True
+    
+    def _flush_before_read(self) -> None:
+        # Reads must see buffered rows
+        if self._pending_games or self._pending_bundles:
+            self.flush()
+    
+    def add_game(self, game: 'GameCache') -> bool:
+        if self.batch_size > 0:
+            with self.lock:
+                self._pending_games.append(game)
+                return self._maybe_flush()
+        
+        return self.add_games([game])
 
     def get_game(self, game_hash: str) -> GameCache | None:
+        self._flush_before_read()
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM games WHERE hash = ?", (game_hash,))
         row = cursor.fetchone()
 
         if row:
-            try:
-                return GameCache(
-                    hash=row['hash'],
-                    steam_id=row['steam_id'],
-                    title=row['title'],
-                    price=row['price'],
-                    overall_rating=row['overall_rating'],
-                    overall_count=row['overall_count'],
-                    tags=json.loads(row['tags']) if row['tags'] else [],
-                    release_date=datetime.fromisoformat(row['release_date']),
-                    last_time_scraped=datetime.fromisoformat(row['last_time_scraped'])
-                )
-            except Exception as e:
-                logging.error(f"Error parsing game from DB: {e}")
-                return None
+            return self._row_to_game(row)
         return None
     
+    def get_games(self, game_hashes: Iterable[str], chunk_size: int = 500) -> dict[str, GameCache]:
+        # Many games in a few IN (...) queries, missing hashes are left out
+        self._flush_before_read()
+        return {game.hash: game for game in self._select_by_hashes("games", game_hashes, chunk_size, self._row_to_game) if game}
+    
 
     def add_bundle(self, bundle: 'BundleCache') -> bool:
+        if self.batch_size > 0:
+            with self.lock:
+                self._pending_bundles.append(bundle)
+                return self._maybe_flush()
+        
+        return self.add_bundles([bundle])
+    
+    def add_bundle_contents(self, pairs: Iterable[tuple[str, str]]) -> bool:
+        # (game_hash, bundle_hash) links on their own, stored bundles gain the tags of the linked games
+        pairs = list(pairs)
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO bundles 
-                (hash, steam_id, title, discount, total_price, tags, games_in_bundle)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                bundle.hash,
-                bundle.steam_id,
-                bundle.title,
-                bundle.discount,
-                bundle.total_price,
-                json.dumps(bundle.tags),
-                json.dumps(bundle.games_in_bundle)
-            ))
-            
-            
-            # Prepare list of tuples for bulk insertion: [(game1, bundleA), (game2, bundleA)]
-            contents_data = [(g_hash, bundle.hash) for g_hash in bundle.games_in_bundle]
-
-            cursor.executemany('''
-                INSERT OR IGNORE INTO bundle_contents (game_hash, bundle_hash)
-                VALUES (?, ?)
-            ''', contents_data)
-
-
-            self.conn.commit()
+            with self.lock, self.conn:
+                cursor = self.conn.cursor()
+                bundle_hashes = list({bundle_hash for _, bundle_hash in pairs})
+                old_bundle_tags = self._get_bundle_tag_sets(cursor, bundle_hashes)
+                cursor.executemany("INSERT OR IGNORE INTO bundle_contents (game_hash, bundle_hash) VALUES (?, ?)", pairs)
+                self._apply_bundle_tag_change(cursor, old_bundle_tags, self._get_bundle_tag_sets(cursor, bundle_hashes))
             return True
-        
         except Exception as e:
-            logging.error(f"Failed to add bundle to DB: {e}")
+            logging.error(f"Failed to add {len(pairs)} bundle contents to DB: {e}")
             return False
     
     def get_bundle(self, bundle_hash: str) -> BundleCache | None:
+        self._flush_before_read()
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM bundles WHERE hash = ?", (bundle_hash,))
         row = cursor.fetchone()
 
         if row:
-            try:
-                return BundleCache(
-                    hash=row['hash'],
-                    steam_id=row['steam_id'],
-                    title=row['title'],
-                    discount=row['discount'],
-                    total_price=row['total_price'],
-                    tags=json.loads(row['tags']) if row['tags'] else [],
-                    games_in_bundle=json.loads(row['games_in_bundle']) if row['games_in_bundle'] else []
-                )
-            except Exception as e:
-                logging.error(f"Error parsing game from DB: {e}")
-                return None
+            return self._row_to_bundle(row)
         return None
     
+    def get_bundles(self, bundle_hashes: Iterable[str], chunk_size: int = 500) -> dict[str, BundleCache]:
+        self._flush_before_read()
+        return {bundle.hash: bundle for bundle in self._select_by_hashes("bundles", bundle_hashes, chunk_size, self._row_to_bundle) if bundle}
+    
+    
+    def get_stored_hashes(self, table: str, hashes: Iterable[str], chunk_size: int = 500) -> set[str]:
+        # Does not flush, so it is safe inside on_rows_dropped
+        hashes = list(hashes)
+        stored: set[str] = set()
+        for i in range(0, len(hashes), chunk_size):
+            chunk = hashes[i:i + chunk_size]
+            rows = self.conn.execute(f"SELECT hash FROM {table} WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+            stored.update(row[0] for row in rows)
+        return stored
     
     def get_all_game_hashes(self) -> set[str]:
         cursor = self.conn.cursor()
         cursor.execute("SELECT hash FROM games")
         return {row['hash'] for row in cursor.fetchall()}
 
+    def iter_game_tags(self, game_hashes: Iterable[str] | None = None, chunk_size: int = 500) -> Iterator[tuple[str, list[str]]]:
+        # Streams (hash, tags) for all games or only the given hashes
+        self._flush_before_read()
+        cursor = self.conn.cursor()
+        
+        if game_hashes is None:
+            cursor.execute("SELECT hash, tags FROM games")
+            while rows := cursor.fetchmany(chunk_size):
+                yield from ((row['hash'], json.loads(row['tags']) if row['tags'] else []) for row in rows)
+            return
+        
+        game_hashes = list(game_hashes)
+        for i in range(0, len(game_hashes), chunk_size):
+            chunk = game_hashes[i:i + chunk_size]
+            cursor.execute(f"SELECT hash, tags FROM games WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+            yield from ((row['hash'], json.loads(row['tags']) if row['tags'] else []) for row in cursor.fetchall())
+
+    def get_scrape_times(self, game_hashes: Iterable[str], chunk_size: int = 500) -> dict[str, datetime | None]:
+        # last_time_scraped of the stored games, missing hashes are left out
+        self._flush_before_read()
+        game_hashes = list(game_hashes)
+        times: dict[str, datetime | None] = {}
+        for i in range(0, len(game_hashes), chunk_size):
+            chunk = game_hashes[i:i + chunk_size]
+            rows = self.conn.execute(f"SELECT hash, last_time_scraped FROM games WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+            times.update((row[0], datetime.fromisoformat(row[1]) if row[1] else None) for row in rows)
+        return times
+    
+    def get_write_seq(self) -> int:
+        # Highest games.write_seq, 0 for an empty table
+        self._flush_before_read()
+        return self.conn.execute("SELECT COALESCE(MAX(write_seq), 0) FROM games").fetchone()[0]
+    
+    def iter_game_tags_since(self, write_seq: int, chunk_size: int = 500) -> Iterator[tuple[str, list[str]]]:
+        # (hash, tags) of games written after write_seq, walks idx_games_write_seq
+        self._flush_before_read()
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT hash, tags FROM games WHERE write_seq > ?", (write_seq,))
+        while rows := cursor.fetchmany(chunk_size):
+            yield from ((row['hash'], json.loads(row['tags']) if row['tags'] else []) for row in rows)
+    
+    def count_tagged_games(self) -> int:
+        self._flush_before_read()
+        return self.conn.execute("SELECT COUNT(DISTINCT game_hash) FROM game_tags").fetchone()[0]
+
+    def get_all_game_ids(self) -> Iterator[int]:
+        self._flush_before_read()
+        for row in self.conn.execute("SELECT steam_id FROM games WHERE steam_id IS NOT NULL"):
+            yield row[0]
+    
+    def get_all_bundle_ids(self) -> Iterator[int]:
+        self._flush_before_read()
+        for row in self.conn.execute("SELECT CAST(steam_id AS INTEGER) FROM bundles WHERE steam_id IS NOT NULL"):
+            yield row[0]
+
     def get_all_bundle_hashes(self) -> set[str]:
         cursor = self.conn.cursor()
         cursor.execute("SELECT hash FROM bundles")
         return {row['hash'] for row in cursor.fetchall()}
     
     
+    def get_stale_games(self, older_than: datetime, max_age: float, limit: int) -> list[sqlite3.Row]:
+        # Every row older than older_than ranked in sql, so no stale game is left out by a window:
+        # (seconds overdue / max_age) * (1 + log1p(reviews)), older and more reviewed games first
+        self._flush_before_read()
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT hash, steam_id, overall_count, last_time_scraped FROM games
+            WHERE last_time_scraped < :cutoff
+            ORDER BY (julianday(:cutoff) - julianday(last_time_scraped)) * 86400.0 / :max_age
+                     * (1 + log1p(MAX(COALESCE(overall_count, 0), 0))) DESC
+            LIMIT :limit
+        ''', {"cutoff": older_than.isoformat(), "max_age": max_age, "limit": limit})
+        return cursor.fetchall()
+    
+    
+    # ***
+    # Tag Queries
+    # ***
+    
+    def get_games_by_tag(self, tag: str) -> list[str]:
+        self._flush_before_read()
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT gt.game_hash FROM game_tags gt
+            JOIN tags t ON t.id = gt.tag_id
+            WHERE t.name = ?
+        ''', (tag.strip().lower(),))
+        return [row['game_hash'] for row in cursor.fetchall()]
+    
+    def get_tag_counts(self, limit: int | None = None) -> list[tuple[str, int]]:
+        return [(name, game_count) for name, game_count, _, _ in self.get_tag_stats(limit)]
+    
+    
+    # ***
+    # Aggregate Queries (read the summary tables, never the catalog)
+    # ***
+    
+    def get_tag_stats(self, limit: int | None = None) -> list[tuple[str, int, float | None, float]]:
+        # (tag, game count, average rating, average price), most used first
+        self._flush_before_read()
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT t.name, s.game_count, s.rating_sum / NULLIF(s.rated_count, 0) AS avg_rating,
+                   s.price_sum / s.game_count AS avg_price
+            FROM tag_stats s
+            JOIN tags t ON t.id = s.tag_id
+            WHERE s.game_count > 0
+            ORDER BY s.game_count DESC
+            LIMIT ?
+        ''', (limit if limit is not None else -1,))
+        return [(row['name'], row['game_count'], row['avg_rating'], row['avg_price']) for row in cursor.fetchall()]
+    
+    def get_price_bands(self) -> list[tuple[float, float | None, int]]:
+        # (from, to, game count) for every band in PRICE_BANDS, the last one has no upper edge
+        self._flush_before_read()
+        counts = dict(self.conn.execute("SELECT band, game_count FROM price_bands").fetchall())
+        edges = list(const.PRICE_BANDS)
+        return [
+            (low, edges[i + 1] if i + 1 < len(edges) else None, counts.get(i, 0))
+            for i, low in enumerate(edges)
+        ]
+    
+    def get_bundle_tag_discounts(self, limit: int | None = None) -> list[tuple[str, int, float]]:
+        # (tag, bundle count, average discount), most used first
+        self._flush_before_read()
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT t.name, s.bundle_count, s.discount_sum / s.bundle_count AS avg_discount
+            FROM bundle_tag_stats s
+            JOIN tags t ON t.id = s.tag_id
+            WHERE s.bundle_count > 0
+            ORDER BY s.bundle_count DESC
+            LIMIT ?
+        ''', (limit if limit is not None else -1,))
+        return [(row['name'], row['bundle_count'], row['avg_discount']) for row in cursor.fetchall()]
+    
+    def get_games_sharing_tags(self, game_hash: str, min_shared: int = 1) -> list[tuple[str, int]]:
+        # Other games with at least min_shared tags in common, most shared first
+        self._flush_before_read()
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT other.game_hash, COUNT(*) AS shared FROM game_tags mine
+            JOIN game_tags other ON other.tag_id = mine.tag_id
+            WHERE mine.game_hash = ? AND other.game_hash != mine.game_hash
+            GROUP BY other.game_hash
+            HAVING shared >= ?
+            ORDER BY shared DESC
+        ''', (game_hash, min_shared))
+        return [(row['game_hash'], row['shared']) for row in cursor.fetchall()]
+    
+    
+    # ***
+    # History Queries
+    # ***
+    
+    def get_values_at(self, game_hashes: Iterable[str], metric: HistoryMetric, at: datetime,
+                      chunk_size: int = 500) -> dict[str, float]:
+        # Value in effect at a moment, games without a point before it are left out
+        self._flush_before_read()
+        game_hashes = list(dict.fromkeys(game_hashes))
+        cursor = self.conn.cursor()
+        values: dict[str, float] = {}
+        
+        for i in range(0, len(game_hashes), chunk_size):
+            chunk = game_hashes[i:i + chunk_size]
+            # sqlite takes the bare value column from the MAX(time) row
+            cursor.execute(f'''
+                SELECT game_hash, value, MAX(time) FROM game_history
+                WHERE metric = ? AND time <= ? AND game_hash IN ({','.join('?' * len(chunk))})
+                GROUP BY game_hash
+            ''', (metric.value, self._to_unix(at), *chunk))
+            values.update((row[0], row[1]) for row in cursor.fetchall())
+        return values
+    
+    def get_value_at(self, game_hash: str, metric: HistoryMetric, at: datetime) -> float | None:
+        return self.get_values_at([game_hash], metric, at).get(game_hash)
+    
+    def get_histories(self, game_hashes: Iterable[str], metric: HistoryMetric, start: datetime | None = None,
+                      end: datetime | None = None, chunk_size: int = 500) -> dict[str, list[tuple[datetime, float]]]:
+        # Trajectories over [start, end], each starting with the point already in effect at start
+        game_hashes = list(dict.fromkeys(game_hashes))
+        histories: dict[str, list[tuple[datetime, float]]] = {game_hash: [] for game_hash in game_hashes}
+        low = self._to_unix(start) if start else None
+        high = self._to_unix(end)
+        
+        if start:
+            for game_hash, value in self.get_values_at(game_hashes, metric, start, chunk_size).items():
+                histories[game_hash].append((start, value))
+        else:
+            self._flush_before_read()
+        
+        cursor = self.conn.cursor()
+        for i in range(0, len(game_hashes), chunk_size):
+            chunk = game_hashes[i:i + chunk_size]
+            cursor.execute(f'''
+                SELECT game_hash, time, value FROM game_history
+                WHERE metric = ? AND time > ? AND time <= ? AND game_hash IN ({','.join('?' * len(chunk))})
+                ORDER BY game_hash, time
+            ''', (metric.value, low if low is not None else -1, high, *chunk))
+            for game_hash, moment, value in cursor.fetchall():
+                histories[game_hash].append((datetime.fromtimestamp(moment), value))
+        
+        return {game_hash: points for game_hash, points in histories.items() if points}
+    
+    def get_history(self, game_hash: str, metric: HistoryMetric, start: datetime | None = None,
+                    end: datetime | None = None) -> list[tuple[datetime, float]]:
+        return self.get_histories([game_hash], metric, start, end).get(game_hash, [])
+    
+    
     def get_bundles_containing_game(self, game_hash: str) -> list[str]:
+        self._flush_before_read()
         cursor = self.conn.cursor()
         cursor.execute("SELECT bundle_hash FROM bundle_contents WHERE game_hash = ?", (game_hash,))
         return [row['bundle_hash'] for row in cursor.fetchall()]
     
+    def iter_bundle_contents(self, chunk_size: int = 1000) -> Iterator[tuple[str, str]]:
+        # Streams (game_hash, bundle_hash), grouped by bundle
+        self._flush_before_read()
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT game_hash, bundle_hash FROM bundle_contents ORDER BY bundle_hash")
+        while rows := cursor.fetchmany(chunk_size):
+            yield from ((row['game_hash'], row['bundle_hash']) for row in rows)
+    
     
     
 
     def close_connection(self):
         if self.conn:
-            self.conn.close()
+            self._closed.set()
+            if self._flush_timer:
+                self._flush_timer.join()
+            try:
+                self.flush()
+            finally:
+                self.conn.close()
             logging.info("Database connection closed.")
\ No newline at end of file
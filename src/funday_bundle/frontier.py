@@ -0,0 +1,192 @@
+import logging, random, sqlite3, time
+
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Iterable
+
+import funday_bundle.constants as const
+import funday_bundle.utils as util
+from funday_bundle.db_manager import DatabaseManager
+from funday_bundle.utils import ReturnInfo, UrlType
+
+
+class FrontierState(Enum):
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    DONE = "done"
+    FAILED = "failed" # Out of attempts
+
+
+@dataclass(slots=True, frozen=True)
+class FrontierItem:
+    url: str
+    url_type: UrlType
+    steam_id: str
+    attempts: int
+    depth: int = 0 # Link distance from the seeds, used by the bundle crawler
+
+
+# Crawl work kept in the frontier table, so a restarted process picks up where
+# the last one stopped. Claiming sets a lease in next_eligible, items of a
+# crashed run are handed out again once it runs out. Results are buffered and
+# checkpointed after the scraped rows are flushed, a row is never marked done
+# before it is in the db. When the flush fails its items go back to pending.
+@dataclass(slots=True)
+class Frontier:
+    db_manager: DatabaseManager
+    max_attempts: int = const.FRONTIER_MAX_ATTEMPTS
+    backoff_base: float = const.FRONTIER_BACKOFF_BASE
+    backoff_max: float = const.FRONTIER_BACKOFF_MAX
+    lease: float = const.FRONTIER_LEASE
+
+    _claimed: dict[tuple[UrlType, str], FrontierItem] = field(default_factory=dict, init=False, repr=False)
+    _pending_results: list[tuple] = field(default_factory=list, init=False, repr=False)
+
+
+    # ***
+    # Adding Work
+    # ***
+
+    def add(self, steam_ids: Iterable[str | int], url_type: UrlType = UrlType.GAME_PAGE, depth: int = 0) -> int:
+        # Ids or links, already known urls keep their state
+        now = time.time()
+        rows = []
+        for steam_id in steam_ids:
+            url = util.get_url_by_id(steam_id, url_type)
+            clean_id = util.extract_steam_id(url)
+            if not url or not clean_id:
+                util.print_scraping_error(steam_id)
+                continue
+            rows.append((url, url_type.value, clean_id, depth, FrontierState.PENDING.value, now, now))
+
+        with self.db_manager.lock, self.db_manager.conn:
+            before = self.db_manager.conn.total_changes
+            self.db_manager.conn.executemany('''
+                INSERT OR IGNORE INTO frontier (url, url_type, steam_id, depth, state, next_eligible, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            added = self.db_manager.conn.total_changes - before
+
+        logging.info(f"Frontier got {added} new of {len(rows)} urls")
+        return added
+
+    def retry_failed(self) -> int:
+        # Gives items out of attempts a fresh start
+        with self.db_manager.lock, self.db_manager.conn:
+            cursor = self.db_manager.conn.execute(
+                "UPDATE frontier SET state = ?, attempts = 0, next_eligible = ? WHERE state = ?",
+                (FrontierState.PENDING.value, time.time(), FrontierState.FAILED.value)
+            )
+        return cursor.rowcount
+
+
+    # ***
+    # Claiming
+    # ***
+
+    def claim(self, limit: int = const.FRONTIER_BATCH_SIZE, url_type: UrlType = UrlType.GAME_PAGE) -> list[FrontierItem]:
+        # One UPDATE ... RETURNING, two processes on the same db never get the same row.
+        # Shallow items first, so the bundle crawler goes breadth first
+        now = time.time()
+        with self.db_manager.lock, self.db_manager.conn:
+            rows = self.db_manager.conn.execute('''
+                UPDATE frontier
+                SET state = ?, attempts = attempts + 1, next_eligible = ?, updated_at = ?
+                WHERE url IN (
+                    SELECT url FROM frontier
+                    WHERE state IN (?, ?) AND next_eligible <= ? AND url_type = ?
+                    ORDER BY depth, next_eligible
+                    LIMIT ?
+                )
+                RETURNING url, url_type, steam_id, attempts, depth
+            ''', (
+                FrontierState.IN_PROGRESS.value, now + self.lease, now,
+                FrontierState.PENDING.value, FrontierState.IN_PROGRESS.value, now, url_type.value,
+                limit
+            )).fetchall()
+
+        items = [FrontierItem(row['url'], UrlType(row['url_type']), row['steam_id'], row['attempts'], row['depth']) for row in rows]
+        for item in items:
+            self._claimed[(item.url_type, item.steam_id)] = item
+        return items
+
+    def seconds_until_next(self, url_type: UrlType = UrlType.GAME_PAGE) -> float | None:
+        # None when there is nothing left that could ever be claimed
+        row = self.db_manager.conn.execute(
+            "SELECT MIN(next_eligible) FROM frontier WHERE state IN (?, ?) AND url_type = ?",
+            (FrontierState.PENDING.value, FrontierState.IN_PROGRESS.value, url_type.value)
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+
+    # ***
+    # Checkpointing
+    # ***
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2) # Jitter spreads retries of one failed batch
+
+    def record(self, steam_id: str | int, return_info: ReturnInfo, error: str | None = None,
+               url_type: UrlType = UrlType.GAME_PAGE) -> None:
+        item = self._claimed.pop((url_type, util.extract_steam_id(steam_id) or str(steam_id)), None)
+        if not item:
+            logging.error(f"Frontier result for unclaimed {steam_id}")
+            return
+
+        now = time.time()
+        if return_info != ReturnInfo.FAILED:
+            # Kept with its item, checkpoint puts it back if the scraped row never reaches the db
+            self._pending_results.append((FrontierState.DONE.value, now, None, now, item.url, item))
+        elif item.attempts >= self.max_attempts:
+            logging.error(f"Frontier giving up on {item.url} after {item.attempts} attempts")
+            self._pending_results.append((FrontierState.FAILED.value, now, error or return_info.name, now, item.url, item))
+        else:
+            retry_at = now + self._backoff(item.attempts)
+            self._pending_results.append((FrontierState.PENDING.value, retry_at, error or return_info.name, now, item.url, item))
+
+    def checkpoint(self) -> bool:
+        # Scraped rows first, then the states pointing at them. False when the flush failed
+        if not self._pending_results:
+            self.db_manager.flush()
+            return True
+
+        if not self.db_manager.flush():
+            self._defer_done()
+            return False
+
+        with self.db_manager.lock, self.db_manager.conn:
+            self.db_manager.conn.executemany(
+                "UPDATE frontier SET state = ?, next_eligible = ?, last_error = ?, updated_at = ? WHERE url = ?",
+                [result[:5] for result in self._pending_results]
+            )
+        logging.info(f"Frontier checkpointed {len(self._pending_results)} results")
+        self._pending_results.clear()
+        return True
+
+    def _defer_done(self) -> None:
+        # Done items whose rows may not be stored go back to pending with backoff. They stay in
+        # _pending_results with the new state, so the next checkpoint still writes them
+        now = time.time()
+        deferred = 0
+        for i, (state, next_eligible, error, updated_at, url, item) in enumerate(self._pending_results):
+            if state == FrontierState.DONE.value:
+                self._pending_results[i] = (FrontierState.PENDING.value, now + self._backoff(item.attempts), "db flush failed", now, url, item)
+                deferred += 1
+
+        # Written now if the db takes it, else the lease from claim holds them until the next checkpoint
+        try:
+            with self.db_manager.lock, self.db_manager.conn:
+                self.db_manager.conn.executemany(
+                    "UPDATE frontier SET state = ?, next_eligible = ?, last_error = ?, updated_at = ? WHERE url = ?",
+                    [result[:5] for result in self._pending_results]
+                )
+        except sqlite3.Error as e:
+            logging.error(f"Frontier states kept in memory until the next checkpoint: {e}")
+        logging.error(f"DB flush failed, {deferred} frontier items set back to pending")
+
+    def counts(self) -> dict[str, int]:
+        rows = self.db_manager.conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall()
+        return {row[0]: row[1] for row in rows}
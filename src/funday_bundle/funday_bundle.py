@@ -1,29 +1,95 @@
-import logging
+import logging, random, time
 from dataclasses import dataclass, field
+from functools import partial
 
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 
+import funday_bundle.constants as const
+from funday_bundle.browser import create_driver
+from funday_bundle.bundle_crawler import BundleCrawler
 from funday_bundle.data_structures import CachedCollection
+from funday_bundle.frontier import Frontier
+from funday_bundle.metrics import metrics
+from funday_bundle.page_archive import PageArchive, replay
+from funday_bundle.pipeline import Pipeline
+from funday_bundle.refresh_scheduler import RefreshScheduler
+from funday_bundle.scraper_pool import ScraperPool
+from funday_bundle.steam_api import SteamStoreApi
 from funday_bundle.steam_scraping import SteamScraper
+from funday_bundle.utils import UrlType
 
 
 @dataclass(slots=True)
 class FundayBundle:
-    driver: webdriver.Chrome = field(init=False)
+    driver: webdriver.Chrome | None = field(init=False, default=None)
     cache_collection: CachedCollection = field(default_factory=CachedCollection)
+    workers: int = 1 # More than one scrapes games with a pool of drivers
+    lean_browser: bool = True # Blocks media, eager page loads and a persistent profile
+    archive_pages: bool = True # Keeps the raw html of every fetched page
+    use_pipeline: bool = False # Games go through fetcher threads, parser processes and one writer
+    base_url: str = const.STORE_BASE_URL # Swap for a local stand-in server
+    use_api: bool = False # Games are read from the store json api first, html when it is incomplete
+    frontier: Frontier = field(init=False)
+    archive: PageArchive | None = field(init=False, default=None)
+    pipeline: Pipeline | None = field(init=False, default=None)
+    pool: ScraperPool | None = field(init=False, default=None) # Started on first use, its drivers live until end_program
+    api: SteamStoreApi | None = field(init=False, default=None)
 
     def __post_init__(self):
-        # Driver Init
-        options = Options()
-        options.add_argument("--headless") 
-        self.driver = webdriver.Chrome(options=options)
+        # Driver Init, the pool starts its own drivers
+        if self.workers <= 1:
+            self.driver = create_driver(lean=self.lean_browser)
+        
+        # Work left over from an earlier run stays in the db
+        self.frontier = Frontier(self.cache_collection.db_manager)
+        
+        if self.archive_pages:
+            self.archive = PageArchive()
+        
+        if self.use_api:
+            self.api = SteamStoreApi(base_url=self.base_url)
+            if self.use_pipeline:
+                logging.info("The pipeline parses html, the store api is only used by the browser scrapers")
+        
+        if self.use_pipeline:
+            self.pipeline = Pipeline(self.cache_collection, archive=self.archive, base_url=self.base_url).start()
         
     def end_program(self):
+        # Finish what the pipeline already took, before anything it writes to is closed
+        if self.pipeline:
+            try:
+                self.pipeline.close()
+            except Exception as e:
+                logging.error(f"Pipeline could not be drained: {e}")
+        
         # Close driver
         if self.driver:
             self.driver.quit()
         
+        if self.pool:
+            try:
+                self.pool.close()
+            except Exception as e:
+                logging.error(f"Scraper pool could not be closed: {e}")
+        
+        try:
+            metrics.write()
+            logging.info(f"Run metrics\n{metrics.summary()}")
+        except Exception as e:
+            logging.error(f"Metrics could not be written: {e}")
+        
+        try:
+            self.frontier.checkpoint()
+            logging.info(f"Frontier state: {self.frontier.counts()}")
+        except Exception as e:
+            logging.error(f"Frontier could not be checkpointed: {e}")
+        
+        if self.archive:
+            try:
+                self.archive.close()
+            except Exception as e:
+                logging.error(f"Page archive could not be closed: {e}")
+        
         try:
             # STOP DB CONNECTION instead of export_to_csv
             self.cache_collection.close_connections()
@@ -31,26 +97,95 @@ class FundayBundle:
             logging.error("Database connection could not be closed properly")
             logging.exception(f"Details: {e}")
 
+    def refresh_stale_games(self, budget: int = 100) -> list[int]:
+        # Same engine as any other scrape, the pool and pipeline modes have no driver of their own
+        steam_ids = RefreshScheduler(self.cache_collection, budget=budget).run(partial(self.scrape_ids, force=True))
+        if self.pipeline:
+            self.pipeline.join()
+        return steam_ids
+
+    def crawl_frontier(self, batch_size: int = const.FRONTIER_BATCH_SIZE, wait_for_retries: bool = False) -> None:
+        # Claim, scrape and checkpoint until nothing is claimable, a restart resumes from the table.
+        # Failed urls wait out their backoff in the table, wait_for_retries sleeps until they are due instead
+        scraper: SteamScraper | None = SteamScraper(self.driver, self.cache_collection, api=self.api, archive=self.archive, base_url=self.base_url) if self.workers <= 1 else None
+        
+        while True:
+            items = self.frontier.claim(batch_size)
+            if not items:
+                wait = self.frontier.seconds_until_next()
+                if wait is None or not wait_for_retries:
+                    break
+                logging.info(f"Frontier waiting {wait:.0f}s for the next retry")
+                time.sleep(wait)
+                continue
+            
+            steam_ids = [item.steam_id for item in items]
+            if self.pipeline:
+                self.pipeline.submit(steam_ids, on_result=self.frontier.record) # Only claimed ids go back to the frontier
+                self.pipeline.join()
+            elif scraper:
+                scraper.scrape_game_pages(steam_ids, on_result=self.frontier.record)
+            else:
+                self._get_pool().scrape_game_pages(steam_ids, on_result=self.frontier.record)
+            self.frontier.checkpoint()
+            self.cache_collection.checkpoint()
+    
+    def _get_pool(self) -> ScraperPool:
+        if self.pool is None:
+            self.pool = ScraperPool(self.cache_collection, pool_size=self.workers, archive=self.archive, base_url=self.base_url, api=self.api,
+                                    driver_factory=partial(create_driver, lean=self.lean_browser, profile_dir=None))
+        return self.pool
+    
+    def scrape_ids(self, steam_ids: list[int], url_type: UrlType = UrlType.GAME_PAGE, force: bool = False) -> None:
+        # One chunk of a batch job, on whichever engine this app runs. The pipeline returns once the chunk is queued.
+        # force re-scrapes known games
+        if self.pipeline:
+            self.pipeline.submit(steam_ids, url_type, force=force)
+        elif url_type == UrlType.BUNDLE_PAGE:
+            scraper = SteamScraper(self.driver, self.cache_collection, api=self.api, archive=self.archive, base_url=self.base_url)
+            for bundle_id in steam_ids:
+                scraper.scrape_bundle_page(bundle_id)
+                time.sleep(random.uniform(*const.PAGE_DELAY))
+        elif self.workers <= 1:
+            SteamScraper(self.driver, self.cache_collection, api=self.api, archive=self.archive, base_url=self.base_url).scrape_game_pages(steam_ids, force)
+        else:
+            self._get_pool().scrape_game_pages(steam_ids, force)
+    
+    def crawl_bundles(self, seed_ids: list[str] | list[int], max_depth: int = const.CRAWL_MAX_DEPTH,
+                      budget: int | None = const.CRAWL_BUDGET) -> None:
+        # Bundlelists are js rendered, the pool mode has no driver of its own so one is borrowed
+        driver = self.driver if self.driver else create_driver(lean=self.lean_browser)
+        try:
+            crawler = BundleCrawler(SteamScraper(driver, self.cache_collection, api=self.api, archive=self.archive, base_url=self.base_url), self.frontier, max_depth, budget)
+            crawler.seed(seed_ids)
+            crawler.crawl()
+        finally:
+            if driver is not self.driver:
+                driver.quit()
+    
+    def replay_archive(self, url_type: UrlType | None = None, workers: int | None = None) -> dict[str, int]:
+        # Re-extracts every archived page with the current selectors, no network
+        if not self.archive:
+            logging.error("Page archiving is off, nothing to replay")
+            return {}
+        counts = replay(self.archive, self.cache_collection, url_type, workers)
+        logging.info(f"Archive replay: {counts}")
+        return counts
+    
     # run as app() instead of app.run()
     def __call__(self) -> None:
-        scraper: SteamScraper = SteamScraper(self.driver, self.cache_collection)
-        
         urls_to_scrape = [
             "https://store.steampowered.com/bundlelist/1721110/Abyssus",
             "https://store.steampowered.com/bundlelist/1625450/Muck"
         ]
-
-        #for url in urls_to_scrape:
-        #    scraper.scrape_bundle_page(url)
-        #    time.sleep(random.uniform(2, 5))
+        self.crawl_bundles(urls_to_scrape)
         
         urls_game_scrape = [
-            "https://store.steampowered.com/app/2835570/Buckshot_Roulette/",
-            "https://store.steampowered.com/app/3419520/Quarantine_Zone_The_Last_Check/",
             "https://store.steampowered.com/app/2835570/Buckshot_Roulette/",
             "https://store.steampowered.com/app/3419520/Quarantine_Zone_The_Last_Check/"
         ]
         
-        scraper.scrape_game_pages(urls_game_scrape)
+        self.frontier.add(urls_game_scrape)
+        self.crawl_frontier()
 
     
\ No newline at end of file
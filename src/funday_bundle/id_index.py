@@ -0,0 +1,72 @@
+from typing import Iterable
+
+import numpy as np
+
+
+# Exact membership of integer steam ids as one bit per id. App ids are below a
+# few million, so the whole catalog is a few hundred KB and builds from a
+# single column scan.
+class SteamIdBitmap:
+    def __init__(self, ids: Iterable[int] = ()):
+        self._bits = np.zeros(0, dtype=np.uint8)
+        self._count = 0
+        self.add_many(ids)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, steam_id: int | str) -> bool:
+        steam_id = int(steam_id)
+        byte = steam_id >> 3
+        return 0 <= byte < len(self._bits) and bool(self._bits[byte] & (1 << (steam_id & 7)))
+
+    @property
+    def nbytes(self) -> int:
+        return self._bits.nbytes
+
+    def _grow(self, max_id: int) -> None:
+        needed = (max_id >> 3) + 1
+        if needed > len(self._bits):
+            # Doubling keeps appends of rising ids amortized O(1)
+            grown = np.zeros(max(needed, 2 * len(self._bits)), dtype=np.uint8)
+            grown[:len(self._bits)] = self._bits
+            self._bits = grown
+
+    def add(self, steam_id: int | str) -> None:
+        steam_id = int(steam_id)
+        if steam_id < 0 or steam_id in self:
+            return
+        self._grow(steam_id)
+        self._bits[steam_id >> 3] |= np.uint8(1 << (steam_id & 7))
+        self._count += 1
+
+    def add_many(self, ids: Iterable[int]) -> None:
+        ids = np.fromiter(ids, dtype=np.int64)
+        ids = np.sort(ids[ids >= 0])
+        ids = ids[np.diff(ids, prepend=-1) != 0] # np.unique is many times slower on big id lists
+        if not len(ids):
+            return
+
+        # Sets the bits in place, the cost follows the number of ids and not the largest one
+        self._grow(int(ids[-1]))
+        bytes_ = ids >> 3
+        masks = (1 << (ids & 7)).astype(np.uint8)
+        self._count += int(np.count_nonzero((self._bits[bytes_] & masks) == 0))
+        np.bitwise_or.at(self._bits, bytes_, masks)
+
+    def discard(self, steam_id: int | str) -> None:
+        steam_id = int(steam_id)
+        if steam_id in self:
+            self._bits[steam_id >> 3] &= np.uint8(~(1 << (steam_id & 7)) & 0xFF)
+            self._count -= 1
+
+    def contains_many(self, ids: Iterable[int]) -> np.ndarray:
+        ids = np.fromiter(ids, dtype=np.int64)
+        bytes_ = ids >> 3
+        inside = (ids >= 0) & (bytes_ < len(self._bits))
+        found = np.zeros(len(ids), dtype=bool)
+        found[inside] = (self._bits[bytes_[inside]] & (1 << (ids[inside] & 7)).astype(np.uint8)) != 0
+        return found
+
+    def to_array(self) -> np.ndarray:
+        return np.flatnonzero(np.unpackbits(self._bits, bitorder='little'))
@@ -1,7 +1,11 @@
-import logging, os
+import argparse, logging, multiprocessing, os
 from datetime import datetime
 
+import funday_bundle.constants as const
+from funday_bundle.batch import run_batch
 from funday_bundle.funday_bundle import FundayBundle
+from funday_bundle.metrics import profile
+from funday_bundle.utils import UrlType
 
 def init_project():
     # Making folders for data storage
@@ -20,14 +24,43 @@ def init_project():
     )
 
 
-def main():
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="funday_bundle")
+    parser.add_argument("--workers", type=int, default=1, help="Browsers scraping games at once")
+    parser.add_argument("--pipeline", action="store_true", help="Fetcher threads, parser processes and one writer")
+    parser.add_argument("--no-archive", action="store_true", help="Do not keep the raw html of fetched pages")
+    parser.add_argument("--api", action="store_true", help="Read games from the store json api, html only when it is incomplete")
+    
+    commands = parser.add_subparsers(dest="command")
+    batch = commands.add_parser("batch", help="Scrape the app ids or store links in files, '-' is stdin")
+    batch.add_argument("paths", nargs="*", default=["-"])
+    batch.add_argument("--bundles", action="store_true", help="The ids are bundle ids")
+    batch.add_argument("--chunk-size", type=int, default=const.BATCH_CHUNK_SIZE)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
     init_project()
 
-    app: FundayBundle = FundayBundle()
+    app: FundayBundle = FundayBundle(workers=args.workers, archive_pages=not args.no_archive, use_pipeline=args.pipeline, use_api=args.api)
+    
+    if args.command == "batch":
+        url_type = UrlType.BUNDLE_PAGE if args.bundles else UrlType.GAME_PAGE
+        job = lambda: run_batch(app, args.paths, url_type, args.chunk_size)
+    else:
+        job = app
     
     try:
         logging.info("Starting Program...")
-        app()
+        
+        # FUNDAY_PROFILE=<file> profiles this one run with cProfile
+        profile_path = os.environ.get("FUNDAY_PROFILE")
+        if profile_path:
+            with profile(profile_path):
+                job()
+        else:
+            job()
         
     except Exception as e:
         logging.error("Program Crashed Unexcpectedly")
@@ -39,4 +72,5 @@ def main():
         app.end_program()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Parser processes of the frozen exe start through main again
     main()
\ No newline at end of file
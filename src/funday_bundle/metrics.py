@@ -0,0 +1,192 @@
+import bisect, cProfile, io, json, logging, os, pstats, threading, time
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+import funday_bundle.constants as const
+from funday_bundle.utils import ReturnInfo
+
+
+# In-process scraper metrics: latency histograms per stage and per selector,
+# ReturnInfo counts and the time lost waiting on selectors that never showed.
+# One module level registry, like the root logger, so any scraper can record.
+
+@dataclass(slots=True)
+class Histogram:
+    bounds: tuple[float, ...] = const.METRIC_BUCKETS # Upper bounds in seconds, the last bucket is +Inf
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+    max: float = 0.0
+
+    def __post_init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "max": round(self.max, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip([*map(str, self.bounds), "+Inf"], self.counts)),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages: dict[str, Histogram] = {}
+            self.selectors: dict[str, Histogram] = {}
+            self.outcomes: dict[ReturnInfo, int] = {info: 0 for info in ReturnInfo}
+            self.timeouts: dict[str, int] = {}
+            self.timeout_seconds: dict[str, float] = {}
+            self.started = time.time()
+
+
+    # ***
+    # Recording
+    # ***
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages.setdefault(stage, Histogram()).observe(seconds)
+
+    def observe_selector(self, selector: str, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.selectors.setdefault(selector, Histogram()).observe(seconds)
+            if timed_out:
+                self.timeouts[selector] = self.timeouts.get(selector, 0) + 1
+                self.timeout_seconds[selector] = self.timeout_seconds.get(selector, 0.0) + seconds
+
+    def count_outcome(self, return_info: ReturnInfo) -> None:
+        with self._lock:
+            self.outcomes[return_info] += 1
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        # Recorded even when the block raises, failed stages cost time too
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - start)
+
+
+    # ***
+    # Export
+    # ***
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started, 3),
+                "outcomes": {info.name: n for info, n in self.outcomes.items()},
+                "stages": {name: hist.to_dict() for name, hist in self.stages.items()},
+                "selectors": {name: hist.to_dict() for name, hist in self.selectors.items()},
+                "timeouts": {
+                    name: {"count": n, "seconds_lost": round(self.timeout_seconds[name], 3)}
+                    for name, n in self.timeouts.items()
+                },
+            }
+
+    @staticmethod
+    def _escape(label: str) -> str:
+        return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    def _prometheus_histogram(self, lines: list[str], metric: str, label: str, value: str, hist: Histogram) -> None:
+        cumulative = 0
+        for bound, bucket_count in zip([*map(str, hist.bounds), "+Inf"], hist.counts):
+            cumulative += bucket_count
+            lines.append(f'{metric}_bucket{{{label}="{self._escape(value)}",le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{{label}="{self._escape(value)}"}} {hist.total}')
+        lines.append(f'{metric}_count{{{label}="{self._escape(value)}"}} {hist.count}')
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            lines = ["# TYPE funday_scrape_outcomes_total counter"]
+            for info, n in self.outcomes.items():
+                lines.append(f'funday_scrape_outcomes_total{{outcome="{info.name}"}} {n}')
+
+            lines.append("# TYPE funday_stage_seconds histogram")
+            for name, hist in self.stages.items():
+                self._prometheus_histogram(lines, "funday_stage_seconds", "stage", name, hist)
+
+            lines.append("# TYPE funday_selector_wait_seconds histogram")
+            for name, hist in self.selectors.items():
+                self._prometheus_histogram(lines, "funday_selector_wait_seconds", "selector", name, hist)
+
+            lines.append("# TYPE funday_selector_timeouts_total counter")
+            for name, n in self.timeouts.items():
+                lines.append(f'funday_selector_timeouts_total{{selector="{self._escape(name)}"}} {n}')
+
+            lines.append("# TYPE funday_selector_timeout_seconds_total counter")
+            for name, seconds in self.timeout_seconds.items():
+                lines.append(f'funday_selector_timeout_seconds_total{{selector="{self._escape(name)}"}} {seconds}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str = const.METRICS_PATH) -> None:
+        # metrics.json and metrics.prom, the .prom file suits node_exporter's textfile collector
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "metrics.json"), "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        with open(os.path.join(path, "metrics.prom"), "w") as f:
+            f.write(self.to_prometheus())
+
+    def summary(self) -> str:
+        data = self.to_dict()
+        lines = [f"Outcomes: {data['outcomes']}"]
+
+        for name, hist in sorted(data["stages"].items(), key=lambda item: -item[1]["sum"]):
+            lines.append(f"  stage {name}: n={hist['count']} total={hist['sum']:.2f}s p50<={hist['p50']}s p95<={hist['p95']}s max={hist['max']:.2f}s")
+
+        lost = sum(timeout["seconds_lost"] for timeout in data["timeouts"].values())
+        lines.append(f"Time lost to selector timeouts: {lost:.2f}s")
+        for name, timeout in sorted(data["timeouts"].items(), key=lambda item: -item[1]["seconds_lost"]):
+            lines.append(f"  {name}: {timeout['count']} timeouts, {timeout['seconds_lost']:.2f}s")
+        return "\n".join(lines)
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def profile(path: str, top: int = 25) -> Iterator[cProfile.Profile]:
+    # cProfile around one run, raw stats to path for snakeviz/pstats, the top entries to the log
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(path)
+
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(top)
+        logging.info(f"Profile written to {path}\n{report.getvalue()}")
@@ -0,0 +1,266 @@
+import gzip, hashlib, logging, multiprocessing, os, sqlite3, threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from itertools import islice, repeat
+from typing import Iterable, Iterator
+
+try:
+    import zstandard
+except ImportError: # Optional, gzip is used without it
+    zstandard = None
+
+import funday_bundle.constants as const
+import funday_bundle.static_scraping as static
+import funday_bundle.utils as util
+from funday_bundle.data_structures import CachedCollection, GameCache, BundleCache
+from funday_bundle.utils import UrlType
+
+
+# Every fetched page is kept, so a selector change means re-parsing the archive
+# instead of re-crawling the store.
+#
+#   pages/
+#     index.db                       url hash, url type, steam id, body, fetch time
+#     objects/ab/ab12....html.zst    one compressed file per distinct page body
+#
+# Bodies are content addressed by their sha256, a page that did not change
+# between fetches is stored once and only gets another index row. Rows are
+# keyed by the same canonical url hash as the games and bundles tables.
+
+_SUFFIXES = {".zst": "zstd", ".gz": "gzip"}
+
+ArchiveEntry = tuple[str, int, int, str, str] # url_hash, url_type, steam_id, object, fetched_at
+
+
+def default_compression() -> str:
+    return "zstd" if zstandard else "gzip"
+
+
+def _compress(body: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(body)
+    return gzip.compress(body, compresslevel=6)
+
+
+def read_object(archive_path: str, object_path: str) -> str:
+    with open(os.path.join(archive_path, object_path), "rb") as f:
+        data = f.read()
+    
+    if _SUFFIXES[os.path.splitext(object_path)[1]] == "zstd":
+        if not zstandard:
+            raise RuntimeError(f"{object_path} is zstd compressed, install zstandard to read it")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        data = gzip.decompress(data)
+    return data.decode("utf-8")
+
+
+@dataclass(slots=True)
+class PageArchive:
+    path: str = const.ARCHIVE_PATH
+    compression: str = field(default_factory=default_compression) # "zstd" or "gzip"
+    commit_every: int = const.ARCHIVE_COMMIT_EVERY
+    
+    conn: sqlite3.Connection = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _uncommitted: int = field(default=0, init=False, repr=False)
+    
+    def __post_init__(self):
+        if self.compression == "zstd" and not zstandard:
+            logging.error("zstandard is not installed, archiving with gzip")
+            self.compression = "gzip"
+        
+        os.makedirs(os.path.join(self.path, "objects"), exist_ok=True)
+        
+        # Scraper threads, pool workers and the async engine all archive through this one connection
+        self.conn = sqlite3.connect(os.path.join(self.path, "index.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS pages (
+                url_hash TEXT NOT NULL,
+                url_type INTEGER NOT NULL,
+                steam_id INTEGER NOT NULL,
+                object TEXT NOT NULL,
+                fetched_at TEXT NOT NULL,
+                PRIMARY KEY (url_hash, fetched_at)
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_type ON pages (url_type, url_hash);
+        ''')
+    
+    
+    # ***
+    # Writing
+    # ***
+    
+    def _write_object(self, body: bytes) -> str:
+        content_hash = hashlib.sha256(body).hexdigest()
+        suffix = ".zst" if self.compression == "zstd" else ".gz"
+        object_path = os.path.join("objects", content_hash[:2], f"{content_hash}.html{suffix}")
+        full_path = os.path.join(self.path, object_path)
+        
+        if not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            # Written aside and renamed, a crash never leaves half a page under the final name
+            temp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(_compress(body, self.compression))
+            os.replace(temp_path, full_path)
+        return object_path
+    
+    def put(self, url: str, html: str, fetched_at: datetime | None = None) -> str | None:
+        # Keyed by the canonical url hash, so pages fetched from a stand-in server land under the store key
+        url_type = util.get_url_type(url)
+        steam_id = util.extract_steam_id(url)
+        if not url_type or not steam_id:
+            logging.error(f"Not archiving {url}, no steam page")
+            return None
+        
+        url_hash = util.get_hash_by_id(steam_id, url_type)
+        fetched_at = fetched_at if fetched_at else datetime.now()
+        
+        try:
+            object_path = self._write_object(html.encode("utf-8"))
+            with self._lock:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO pages (url_hash, url_type, steam_id, object, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (url_hash, url_type.value, int(steam_id), object_path, fetched_at.isoformat())
+                )
+                self._uncommitted += 1
+                if self._uncommitted >= self.commit_every:
+                    self.conn.commit()
+                    self._uncommitted = 0
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Failed to archive {url}: {e}")
+            return None
+        return url_hash
+    
+    def flush(self) -> None:
+        with self._lock:
+            self.conn.commit()
+            self._uncommitted = 0
+    
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+    
+    
+    # ***
+    # Reading
+    # ***
+    
+    def get(self, url_hash: str) -> str | None:
+        # Latest fetch of a page
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT object FROM pages WHERE url_hash = ? ORDER BY fetched_at DESC LIMIT 1", (url_hash,)
+            ).fetchone()
+        return read_object(self.path, row[0]) if row else None
+    
+    def history(self, url_hash: str) -> list[tuple[str, str]]:
+        # (fetched_at, object) of every fetch, oldest first
+        with self._lock:
+            return self.conn.execute(
+                "SELECT fetched_at, object FROM pages WHERE url_hash = ? ORDER BY fetched_at", (url_hash,)
+            ).fetchall()
+    
+    def latest(self, url_type: UrlType | None = None) -> list[ArchiveEntry]:
+        # Newest fetch per url, sqlite takes the bare columns from the MAX row
+        where = "WHERE url_type = ?" if url_type else ""
+        params = (url_type.value,) if url_type else ()
+        with self._lock:
+            self.conn.commit()
+            self._uncommitted = 0
+            return self.conn.execute(f'''
+                SELECT url_hash, url_type, steam_id, object, MAX(fetched_at)
+                FROM pages {where} GROUP BY url_hash
+            ''', params).fetchall()
+    
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            pages, urls, objects = self.conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT url_hash), COUNT(DISTINCT object) FROM pages"
+            ).fetchone()
+        return {"pages": pages, "urls": urls, "objects": objects}
+
+
+# ***
+# Offline Replay
+# ***
+
+def _parse_chunk(archive_path: str, entries: list[ArchiveEntry]) -> tuple[list[GameCache], list[BundleCache], int]:
+    # Runs in a worker process, reads and parses without any network or db access
+    games: list[GameCache] = []
+    bundles: list[BundleCache] = []
+    failed = 0
+    
+    for url_hash, url_type, steam_id, object_path, fetched_at in entries:
+        try:
+            html = read_object(archive_path, object_path)
+            match UrlType(url_type):
+                case UrlType.GAME_PAGE:
+                    game_obj = static.parse_game_page(html, steam_id, url_hash)
+                    if game_obj:
+                        # The data is as old as the page, not as the replay
+                        games.append(replace(game_obj, last_time_scraped=datetime.fromisoformat(fetched_at)))
+                        continue
+                case UrlType.BUNDLE_PAGE:
+                    bundle_obj = static.parse_bundle_page(html, str(steam_id), url_hash)
+                    if bundle_obj:
+                        bundles.append(bundle_obj)
+                        continue
+        except Exception as e:
+            logging.error(f"Replay failed for {object_path}: {e}")
+        failed += 1
+    
+    return games, bundles, failed
+
+
+def _chunks(entries: Iterable[ArchiveEntry], size: int) -> Iterator[list[ArchiveEntry]]:
+    iterator = iter(entries)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _newer_than_stored(cache_collection: CachedCollection, entries: list[ArchiveEntry]) -> list[ArchiveEntry]:
+    # Game pages older than the stored row are left out, it may come from the api or an unarchived run.
+    # The row written from the page's own fetch is a little newer than it and still gets replaced
+    stored = cache_collection.db_manager.get_scrape_times(
+        [entry[0] for entry in entries if entry[1] == UrlType.GAME_PAGE.value]
+    )
+    slack = timedelta(seconds=const.ARCHIVE_REPLAY_SLACK)
+    
+    def is_newer(entry: ArchiveEntry) -> bool:
+        scraped = stored.get(entry[0])
+        return scraped is None or datetime.fromisoformat(entry[4]) + slack >= scraped
+    
+    return [entry for entry in entries if entry[1] != UrlType.GAME_PAGE.value or is_newer(entry)]
+
+
+def replay(archive: PageArchive, cache_collection: CachedCollection, url_type: UrlType | None = None,
+           workers: int | None = None, chunk_size: int = const.ARCHIVE_REPLAY_CHUNK) -> dict[str, int]:
+    # Re-runs extraction over the newest copy of every archived page and writes the results.
+    # Bundles have no scrape time to compare, their newest archived page always wins
+    # failed counts pages that did not parse, unwritten parsed rows the db rejected
+    counts = {"pages": 0, "games": 0, "bundles": 0, "failed": 0, "unwritten": 0, "skipped": 0}
+    entries = archive.latest(url_type)
+    current = _newer_than_stored(cache_collection, entries)
+    counts["skipped"] = len(entries) - len(current)
+    chunks = list(_chunks(current, chunk_size))
+    
+    # Spawned, forking next to running pipeline or scraper threads can deadlock the children
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for chunk, (games, bundles, failed) in zip(chunks, pool.map(_parse_chunk, repeat(archive.path), chunks)):
+            counts["pages"] += len(chunk)
+            counts["failed"] += failed
+            for key, rows, add in (("games", games, cache_collection.add_games), ("bundles", bundles, cache_collection.add_bundles)):
+                if not rows:
+                    continue
+                if add(rows):
+                    counts[key] += len(rows)
+                else:
+                    counts["unwritten"] += len(rows)
+                    logging.error(f"Replay could not write {len(rows)} {key}, they keep their stored rows")
+            logging.info(f"Replayed {counts['pages']} archived pages")
+    
+    return counts
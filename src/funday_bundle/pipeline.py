@@ -0,0 +1,367 @@
+import logging, multiprocessing, os, queue, random, threading, time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+import requests
+
+import funday_bundle.constants as const
+import funday_bundle.static_scraping as static
+import funday_bundle.utils as util
+from funday_bundle.data_structures import CachedCollection, GameCache, BundleCache
+from funday_bundle.metrics import metrics
+from funday_bundle.page_archive import PageArchive
+from funday_bundle.utils import ReturnInfo, UrlType
+
+
+# Staged scraping for big crawls, every stage scales on its own:
+#
+#   submit -> [fetch queue] -> fetcher threads -> [parse queue] -> parser processes
+#                                                      |
+#                                   writer thread <- futures, resolved in order
+#
+# Both queues are bounded. A slow commit stops the writer from taking parse
+# futures, the full parse queue blocks the fetchers and the full fetch queue
+# blocks submit, so memory stays flat however long the crawl is. The writer is
+# the only thread touching the db while the pipeline runs.
+
+@dataclass(slots=True, frozen=True)
+class _Page:
+    url_type: UrlType
+    steam_id: str
+    url_hash: str
+    on_result: Callable[[str | int, ReturnInfo, str | None], None] | None = None
+    force: bool = False # Re-scrapes a known game
+
+
+def _parse_page(url_type: UrlType, html: str, steam_id: str, url_hash: str) -> GameCache | BundleCache | None:
+    # Runs in a parser process
+    if url_type == UrlType.GAME_PAGE:
+        return static.parse_game_page(html, int(steam_id), url_hash)
+    return static.parse_bundle_page(html, steam_id, url_hash)
+
+
+@dataclass(slots=True)
+class Pipeline:
+    cache_collection: CachedCollection
+    fetchers: int = const.PIPELINE_FETCHERS
+    parsers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    queue_size: int = const.PIPELINE_QUEUE_SIZE # Per queue
+    write_batch: int = const.PIPELINE_WRITE_BATCH # Rows per transaction
+    page_delay: tuple[float, float] = const.PAGE_DELAY # Per fetcher, after every fetch
+    base_url: str = const.STORE_BASE_URL
+    archive: PageArchive | None = None
+    on_result: Callable[[str | int, ReturnInfo, str | None], None] | None = None # Default for submits without their own
+
+    session: requests.Session = field(init=False, repr=False)
+    _fetch_queue: queue.Queue = field(init=False, repr=False)
+    _parse_queue: queue.Queue = field(init=False, repr=False)
+    _executor: ProcessPoolExecutor | None = field(default=None, init=False, repr=False)
+    _executor_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _threads: list[threading.Thread] = field(default_factory=list, init=False, repr=False)
+    _writer: threading.Thread | None = field(default=None, init=False, repr=False)
+    _stopping: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+
+    # Items submitted but not finished, join() waits for zero
+    _outstanding: int = field(default=0, init=False, repr=False)
+    _done: threading.Condition = field(default_factory=threading.Condition, init=False, repr=False)
+
+    _counts: dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _counts_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _started: float = field(default=0.0, init=False, repr=False)
+
+    def __post_init__(self):
+        self.session = static.create_session(pool_size=self.fetchers)
+        self._fetch_queue = queue.Queue(maxsize=self.queue_size)
+        self._parse_queue = queue.Queue(maxsize=self.queue_size)
+
+
+    # ***
+    # Bookkeeping
+    # ***
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._counts_lock:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def _finish(self, page: _Page, return_info: ReturnInfo | None, error: str | None = None) -> None:
+        # None means dropped on shutdown, not attempted, so nothing is reported
+        if return_info:
+            metrics.count_outcome(return_info)
+            if page.on_result:
+                page.on_result(page.steam_id, return_info, error)
+
+        with self._done:
+            self._outstanding -= 1
+            self._done.notify_all()
+
+    def _release(self, page: _Page) -> None:
+        if page.url_type == UrlType.GAME_PAGE:
+            self.cache_collection.release_game(int(page.steam_id))
+
+    def stats(self) -> dict[str, float]:
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        with self._counts_lock:
+            counts = dict(self._counts)
+
+        stats: dict[str, float] = dict(counts)
+        for stage in ("fetched", "parsed", "written"):
+            stats[f"{stage}_per_second"] = counts.get(stage, 0) / elapsed if elapsed else 0.0
+        stats["fetch_queue"] = self._fetch_queue.qsize()
+        stats["parse_queue"] = self._parse_queue.qsize()
+        return stats
+
+
+    # ***
+    # Stages
+    # ***
+
+    def _claim(self, page: _Page) -> bool:
+        if page.url_type == UrlType.GAME_PAGE:
+            return self.cache_collection.claim_game(int(page.steam_id), page.force)
+        return not self.cache_collection.is_known_bundle(page.steam_id)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Spawned, forking next to running fetcher threads can deadlock the children
+        return ProcessPoolExecutor(max_workers=self.parsers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _submit_parse(self, page: _Page, html: str) -> Future:
+        executor = self._executor
+        try:
+            return executor.submit(_parse_page, page.url_type, html, page.steam_id, page.url_hash)
+        except BrokenProcessPool:
+            # A parser process died, futures of the old pool fail in the writer, new pages get a fresh pool
+            with self._executor_lock:
+                if self._executor is executor:
+                    logging.error("Parser pool broken, starting a new one")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = self._new_executor()
+            return self._executor.submit(_parse_page, page.url_type, html, page.steam_id, page.url_hash)
+
+    def _fetch_and_submit(self, page: _Page) -> Future | None:
+        url = util.get_url_by_id(page.steam_id, page.url_type, self.base_url)
+        with metrics.stage("static_fetch"):
+            html = static.fetch_html(self.session, url)
+        if not html:
+            return None
+
+        if self.archive:
+            self.archive.put(url, html)
+        return self._submit_parse(page, html)
+
+    def _fetcher(self) -> None:
+        while True:
+            try:
+                page: _Page = self._fetch_queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            # Nothing would write it, dropped unclaimed like on shutdown
+            if not self._writer_alive():
+                self._finish(page, None)
+                continue
+
+            # A claim taken here is released by whoever ends the item
+            try:
+                claimed = self._claim(page)
+            except Exception as e:
+                logging.error(f"Fetcher could not claim {page.steam_id}: {e}")
+                self._count("fetch_failed")
+                self._finish(page, ReturnInfo.FAILED, str(e))
+                continue
+
+            if not claimed:
+                self._count("skipped")
+                self._finish(page, ReturnInfo.FOUND_IN_CACHE)
+                continue
+
+            # Any error ends the item here, a fetcher never dies holding a claim
+            error = "fetch failed"
+            try:
+                future = self._fetch_and_submit(page)
+            except Exception as e:
+                logging.error(f"Fetcher failed on {page.steam_id}: {e}")
+                future, error = None, str(e)
+
+            if future is None:
+                self._count("fetch_failed")
+                self._release(page)
+                self._finish(page, ReturnInfo.FAILED, error)
+            else:
+                self._count("fetched")
+                self._hand_to_writer(page, future) # Blocks while the parsers are behind
+
+            time.sleep(random.uniform(*self.page_delay))
+
+    def _hand_to_writer(self, page: _Page, future: Future) -> None:
+        while True:
+            try:
+                self._parse_queue.put((page, future), timeout=1)
+                return
+            except queue.Full:
+                if not self._writer_alive():
+                    self._drop_parsed(page, future)
+                    return
+
+    def _drop_parsed(self, page: _Page, future: Future) -> None:
+        # Fetched but the writer is gone, the claim must not outlive the pipeline
+        future.cancel()
+        self._count("write_failed")
+        self._release(page)
+        self._finish(page, ReturnInfo.FAILED, "writer died")
+
+    def _write(self, batch: list[tuple[_Page, GameCache | BundleCache]]) -> None:
+        games = [obj for _, obj in batch if isinstance(obj, GameCache)]
+        bundles = [obj for _, obj in batch if isinstance(obj, BundleCache)]
+
+        # An error fails the batch, the writer outlives it so no claim is left behind
+        with metrics.stage("db_write"):
+            try:
+                written = self.cache_collection.add_games(games) and self.cache_collection.add_bundles(bundles)
+            except Exception as e:
+                logging.error(f"Writer failed on {len(batch)} rows: {e}")
+                written = False
+
+        for page, _ in batch:
+            if written:
+                self._count("written")
+                self._finish(page, ReturnInfo.SCRAPED_SCUCCESFULLY)
+            else:
+                self._count("write_failed")
+                self._release(page)
+                self._finish(page, ReturnInfo.FAILED, "db write failed")
+
+    def _writer_loop(self) -> None:
+        batch: list[tuple[_Page, GameCache | BundleCache]] = []
+
+        while True:
+            try:
+                page, future = self._parse_queue.get(timeout=0.5 if not batch else 0.05)
+            except queue.Empty:
+                # Nothing more right now, commit what is there instead of waiting for a full batch
+                if batch:
+                    self._write(batch)
+                    batch = []
+                elif self._stopping.is_set() and not any(thread.is_alive() for thread in self._threads):
+                    return
+                continue
+
+            try:
+                obj = future.result()
+            except Exception as e:
+                logging.error(f"Parser failed on {page.steam_id}: {e}")
+                obj = None
+
+            if not obj:
+                self._count("parse_failed")
+                self._release(page)
+                self._finish(page, ReturnInfo.FAILED, "parse failed")
+                continue
+
+            self._count("parsed")
+            batch.append((page, obj))
+            if len(batch) >= self.write_batch:
+                self._write(batch)
+                batch = []
+
+
+    # ***
+    # Control
+    # ***
+
+    def start(self) -> 'Pipeline':
+        self._started = time.monotonic()
+        self._stopping.clear()
+        self._executor = self._new_executor()
+
+        # Writer first, fetchers drop their work while it is not running
+        self._writer = threading.Thread(target=self._writer_loop, name="pipeline-writer", daemon=True)
+        self._writer.start()
+        self._threads = [
+            threading.Thread(target=self._fetcher, name=f"pipeline-fetch-{i}", daemon=True)
+            for i in range(self.fetchers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logging.info(f"Pipeline started with {self.fetchers} fetchers and {self.parsers} parsers")
+        return self
+
+    def submit(self, steam_ids: Iterable[str | int], url_type: UrlType = UrlType.GAME_PAGE,
+               on_result: Callable[[str | int, ReturnInfo, str | None], None] | None = None, force: bool = False) -> int:
+        # Blocks while the fetch queue is full. on_result gets the outcome of these ids only, force re-scrapes known games
+        on_result = on_result if on_result else self.on_result
+        submitted = 0
+        for steam_id in steam_ids:
+            url = util.get_url_by_id(steam_id, url_type)
+            clean_id = util.extract_steam_id(url)
+            if not url or not clean_id:
+                util.print_scraping_error(steam_id)
+                continue
+
+            if not self._alive():
+                raise RuntimeError("Pipeline threads died, nothing takes new work")
+
+            with self._done:
+                self._outstanding += 1
+            page = _Page(url_type, clean_id, util.get_hash_from_url(url), on_result, force)
+            while True:
+                try:
+                    self._fetch_queue.put(page, timeout=1)
+                    break
+                except queue.Full:
+                    if not self._alive():
+                        self._finish(page, None)
+                        raise RuntimeError("Pipeline threads died, nothing takes new work")
+            submitted += 1
+        return submitted
+
+    def _writer_alive(self) -> bool:
+        writer = self._writer
+        return bool(writer and writer.is_alive())
+
+    def _alive(self) -> bool:
+        # Without the writer or any fetcher nothing outstanding can finish
+        return self._writer_alive() and any(thread.is_alive() for thread in self._threads)
+
+    def join(self) -> None:
+        # Until every submitted item is written or failed
+        with self._done:
+            while self._outstanding > 0 and self._alive():
+                self._done.wait(timeout=1)
+        if self._outstanding > 0:
+            logging.error(f"Pipeline threads died with {self._outstanding} items outstanding")
+
+    def close(self, drain: bool = True) -> None:
+        # drain=False drops items not fetched yet, they were never claimed so nothing is lost
+        if not self._writer:
+            return
+
+        if not drain or not self._alive():
+            while True:
+                try:
+                    page: _Page = self._fetch_queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._finish(page, None)
+
+        self.join()
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        self._writer.join()
+        self._writer = None
+
+        # Left behind by a writer that died, their claims go back
+        while True:
+            try:
+                page, future = self._parse_queue.get_nowait()
+            except queue.Empty:
+                break
+            self._drop_parsed(page, future)
+
+        self._executor.shutdown()
+        self._executor = None
+        logging.info(f"Pipeline stopped: {self.stats()}")
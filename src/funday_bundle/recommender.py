@@ -0,0 +1,134 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from funday_bundle.db_manager import DatabaseManager
+
+
+# Scores bundle partners for a game against the whole catalog at once.
+# All games are loaded a single time into arrays, tags as a sparse incidence
+# matrix kept in both directions (game -> tags and tag -> games).
+class PartnerRecommender:
+    def __init__(self, games: pd.DataFrame, game_tags: pd.DataFrame,
+                 rating_weight: float = 0.5, price_weight: float = 1.0, release_weight: float = 0.2):
+        self.rating_weight = rating_weight
+        self.price_weight = price_weight
+        self.release_weight = release_weight
+
+        self.hashes: np.ndarray = games['hash'].to_numpy()
+        self.hash_index: dict[str, int] = {game_hash: i for i, game_hash in enumerate(self.hashes)}
+        n_games = len(self.hashes)
+
+        # Numeric columns
+        self.price = games['price'].fillna(0).to_numpy(dtype=np.float64)
+        self.rating = games['overall_rating'].fillna(0).to_numpy(dtype=np.float64)
+        self.review_count = games['overall_count'].fillna(0).to_numpy(dtype=np.float64)
+        release = pd.to_datetime(games['release_date'], errors='coerce')
+        self.release_years = (release - pd.Timestamp(0)).dt.days.to_numpy(dtype=np.float64) / 365.25 # nan if unknown
+
+        # Game quality in [0, 1], rating scaled by how many reviews back it
+        max_log_count = np.log1p(self.review_count.max()) if n_games else 1.0
+        self.quality = self.rating * (np.log1p(self.review_count) / max(max_log_count, 1e-9))
+        self.log_price = np.log1p(self.price)
+
+        # Tag incidence, rows of game_tags mapped to game positions
+        game_pos = pd.Index(self.hashes).get_indexer(game_tags['game_hash'])
+        keep = game_pos >= 0
+        game_pos = game_pos[keep]
+        tag_ids = game_tags['tag_id'].to_numpy(dtype=np.int64)[keep]
+        n_tags = int(tag_ids.max()) + 1 if len(tag_ids) else 0
+
+        # game -> tags (CSR)
+        order = np.lexsort((tag_ids, game_pos))
+        self.game_tag_ids = tag_ids[order]
+        self.game_tag_ptr = np.concatenate(([0], np.cumsum(np.bincount(game_pos, minlength=n_games))))
+
+        # tag -> games (CSC)
+        order = np.lexsort((game_pos, tag_ids))
+        self.tag_games = game_pos[order]
+        self.tag_game_ptr = np.concatenate(([0], np.cumsum(np.bincount(tag_ids, minlength=n_tags))))
+
+        self.tag_count = np.diff(self.game_tag_ptr).astype(np.float64)
+
+        logging.info(f"Recommender loaded {n_games} games with {len(tag_ids)} tag links")
+
+    @classmethod
+    def from_database(cls, db_manager: DatabaseManager, **weights) -> 'PartnerRecommender':
+        db_manager.flush()
+        games = pd.read_sql_query(
+            "SELECT hash, price, overall_rating, overall_count, release_date FROM games ORDER BY hash",
+            db_manager.conn
+        )
+        game_tags = pd.read_sql_query("SELECT game_hash, tag_id FROM game_tags", db_manager.conn)
+        return cls(games, game_tags, **weights)
+
+
+    # ***
+    # Scoring
+    # ***
+
+    def _focal_tags(self, focal: int) -> np.ndarray:
+        return self.game_tag_ids[self.game_tag_ptr[focal]:self.game_tag_ptr[focal + 1]]
+
+    def _shared_tags(self, focal: int) -> np.ndarray:
+        tags = self._focal_tags(focal)
+        if not len(tags):
+            return np.zeros(len(self.hashes))
+
+        postings = np.concatenate([self.tag_games[self.tag_game_ptr[t]:self.tag_game_ptr[t + 1]] for t in tags])
+        return np.bincount(postings, minlength=len(self.hashes)).astype(np.float64)
+
+    def _score(self, focal: np.ndarray, shared: np.ndarray) -> np.ndarray:
+        # focal is (F,), shared is (F, N), result is (F, N)
+        focal_tag_count = self.tag_count[focal][:, None]
+        denominator = np.sqrt(focal_tag_count * self.tag_count[None, :])
+        cosine = np.divide(shared, denominator, out=np.zeros_like(shared), where=denominator > 0)
+
+        quality = (1 - self.rating_weight) + self.rating_weight * self.quality[None, :]
+        price_fit = np.exp(-self.price_weight * np.abs(self.log_price[None, :] - self.log_price[focal][:, None]))
+
+        release_gap = np.abs(self.release_years[None, :] - self.release_years[focal][:, None])
+        release_fit = np.exp(-self.release_weight * np.nan_to_num(release_gap, nan=0.0))
+
+        scores = cosine * quality * price_fit * release_fit
+        scores[np.arange(len(focal)), focal] = -np.inf # Never recommend the game itself
+        return scores
+
+    def _top_k(self, scores: np.ndarray, k: int) -> list[tuple[str, float]]:
+        k = min(k, len(scores) - 1)
+        if k <= 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.hashes[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+    # ***
+    # Callable functions
+    # ***
+
+    def recommend_partners(self, game_hash: str, k: int = 10) -> list[tuple[str, float]]:
+        focal = self.hash_index.get(game_hash)
+        if focal is None:
+            logging.error(f"Game {game_hash} is not loaded in the recommender")
+            return []
+
+        scores = self._score(np.array([focal]), self._shared_tags(focal)[None, :])
+        return self._top_k(scores[0], k)
+
+    def recommend_many(self, game_hashes: list[str], k: int = 10, chunk_size: int = 64) -> dict[str, list[tuple[str, float]]]:
+        focal_all = np.array([self.hash_index[h] for h in game_hashes if h in self.hash_index], dtype=np.int64)
+        results: dict[str, list[tuple[str, float]]] = {}
+
+        # Chunks keep the (F, N) score matrix small
+        for start in range(0, len(focal_all), chunk_size):
+            focal = focal_all[start:start + chunk_size]
+            shared = np.stack([self._shared_tags(f) for f in focal])
+
+            scores = self._score(focal, shared)
+            for row, f in enumerate(focal):
+                results[self.hashes[f]] = self._top_k(scores[row], k)
+
+        return results
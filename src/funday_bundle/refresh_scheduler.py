@@ -0,0 +1,33 @@
+import logging
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable
+
+import funday_bundle.constants as const
+from funday_bundle.data_structures import CachedCollection
+
+
+# Incremental refresh: only games older than max_age are re-scraped, a budget per run
+@dataclass(slots=True)
+class RefreshScheduler:
+    cache_collection: CachedCollection
+    budget: int = 100 # Games re-scraped per run
+    max_age: int = const.MAX_AGE # Seconds
+
+    def select_batch(self, now: datetime | None = None) -> list[int]:
+        # Older and more reviewed games first, unreviewed games still age in. Ranked over all stale rows
+        now = now if now else datetime.now()
+        cutoff = now - timedelta(seconds=self.max_age)
+
+        rows = self.cache_collection.db_manager.get_stale_games(cutoff, self.max_age, self.budget)
+        return [row['steam_id'] for row in rows]
+
+    def run(self, scrape: Callable[[list[int]], object]) -> list[int]:
+        # scrape must re-scrape known games, e.g. FundayBundle.scrape_ids with force=True
+        steam_ids = self.select_batch()
+        logging.info(f"Refreshing {len(steam_ids)} stale games (max age {self.max_age}s)")
+
+        if steam_ids:
+            scrape(steam_ids)
+        return steam_ids
@@ -0,0 +1,184 @@
+import logging, os, queue, random, threading, time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+
+import funday_bundle.constants as const
+from funday_bundle.browser import create_driver
+from funday_bundle.data_structures import CachedCollection, GameCache
+from funday_bundle.metrics import metrics
+from funday_bundle.page_archive import PageArchive
+from funday_bundle.steam_api import SteamStoreApi
+from funday_bundle.steam_scraping import SteamScraper
+from funday_bundle.utils import ReturnInfo
+
+
+def default_pool_size() -> int:
+    cores = os.cpu_count() or 1
+    
+    try:
+        total_mb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError): # Not available on windows
+        return cores
+    
+    # Leave half the memory for the rest of the system
+    return max(1, min(cores, (total_mb // 2) // const.DRIVER_MEMORY_MB))
+
+
+@dataclass(slots=True)
+class ScraperPool:
+    cache_collection: CachedCollection
+    pool_size: int = field(default_factory=default_pool_size)
+    driver_factory: Callable[[], WebDriver] = partial(create_driver, profile_dir=None) # Workers can't share one locked profile
+    max_attempts: int = const.POOL_MAX_ATTEMPTS
+    archive: PageArchive | None = None # Shared, the archive serializes its own writes
+    base_url: str = const.STORE_BASE_URL
+    api: SteamStoreApi | None = None # Shared json api backend, tried before the html
+    
+    # Shared frontier and the results going to the single writer
+    _work: queue.Queue = field(default_factory=queue.Queue, init=False, repr=False)
+    _results: queue.Queue = field(default_factory=queue.Queue, init=False, repr=False)
+    
+    # Workers and their drivers live across scrape_game_pages calls until close()
+    _threads: list[threading.Thread] = field(default_factory=list, init=False, repr=False)
+    _stopping: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    
+    
+    # ***
+    # Worker Side
+    # ***
+    
+    def _restart_driver(self, worker_id: int, driver: WebDriver | None) -> WebDriver:
+        if driver:
+            try:
+                driver.quit()
+            except Exception as e:
+                logging.error(f"Worker {worker_id} could not quit crashed driver: {e}")
+        
+        logging.info(f"Worker {worker_id} starting driver")
+        return self.driver_factory()
+    
+    def _worker(self, worker_id: int) -> None:
+        driver: WebDriver | None = None
+        
+        try:
+            driver = self._restart_driver(worker_id, None)
+            scraper = SteamScraper(driver, self.cache_collection, api=self.api, archive=self.archive, base_url=self.base_url)
+            
+            while True:
+                try:
+                    steam_id, attempt, force = self._work.get(timeout=0.5)
+                except queue.Empty:
+                    if self._stopping.is_set():
+                        return
+                    continue
+                
+                error: str | None = None
+                try:
+                    with metrics.stage("game_page"):
+                        return_info, game_obj = scraper.scrape_game(steam_id, force)
+                    
+                except WebDriverException as e:
+                    logging.error(f"Worker {worker_id} driver crashed on {steam_id}: {e}")
+                    
+                    if attempt + 1 < self.max_attempts:
+                        self._work.put((steam_id, attempt + 1, force))
+                    else:
+                        self._results.put((steam_id, ReturnInfo.FAILED, None, str(e)))
+                    
+                    driver = self._restart_driver(worker_id, driver)
+                    scraper = SteamScraper(driver, self.cache_collection, api=self.api, archive=self.archive, base_url=self.base_url)
+                    continue
+                    
+                except Exception as e:
+                    logging.error(f"Worker {worker_id} error scraping {steam_id}: {e}")
+                    return_info, game_obj, error = ReturnInfo.FAILED, None, str(e)
+                
+                self._results.put((steam_id, return_info, game_obj, error))
+                
+                if return_info != ReturnInfo.FOUND_IN_CACHE:
+                    time.sleep(random.uniform(*const.PAGE_DELAY))
+        
+        except Exception as e:
+            logging.error(f"Worker {worker_id} stopped: {e}")
+        
+        finally:
+            if driver:
+                driver.quit()
+    
+    
+    # ***
+    # Writer Side (runs in the calling thread, which owns the db connection)
+    # ***
+    
+    def _write_result(self, steam_id: str | int, return_info: ReturnInfo, game_obj: GameCache | None, error: str | None,
+                      counts: dict[ReturnInfo, int], on_result: Callable[[str | int, ReturnInfo, str | None], None] | None) -> None:
+        if game_obj:
+            with metrics.stage("db_write"):
+                written = self.cache_collection.add_game(game_obj)
+            if not written:
+                return_info, error = ReturnInfo.FAILED, "db write failed"
+        
+        counts[return_info] += 1
+        metrics.count_outcome(return_info)
+        logging.info(f"Finished {steam_id}: {return_info.name}")
+        if on_result:
+            on_result(steam_id, return_info, error)
+    
+    def _ensure_workers(self, wanted: int) -> None:
+        # Replaces dead workers and grows up to wanted, live ones keep their drivers
+        self._stopping.clear()
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        for _ in range(min(self.pool_size, wanted) - len(self._threads)):
+            thread = threading.Thread(target=self._worker, args=(len(self._threads),), name=f"scraper-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def scrape_game_pages(self, steam_ids: list[str] | list[int], force: bool = False,
+                          on_result: Callable[[str | int, ReturnInfo, str | None], None] | None = None) -> dict[ReturnInfo, int]:
+        # force re-scrapes known games, as SteamScraper.scrape_game_pages
+        logging.info(f"Beginning scraping of {len(steam_ids)} games with {self.pool_size} workers")
+        
+        self._ensure_workers(len(steam_ids))
+        for steam_id in steam_ids:
+            self._work.put((steam_id, 0, force))
+        
+        counts = {info: 0 for info in ReturnInfo}
+        
+        # Every id sends exactly one result, retries are put back on the work queue without one
+        remaining = len(steam_ids)
+        while remaining:
+            try:
+                steam_id, return_info, game_obj, error = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if not any(thread.is_alive() for thread in self._threads):
+                    break
+                continue
+            self._write_result(steam_id, return_info, game_obj, error, counts, on_result)
+            remaining -= 1
+        
+        # Sent by a worker just before it died
+        while not self._results.empty():
+            self._write_result(*self._results.get_nowait(), counts, on_result)
+        
+        # Every worker died (e.g. chrome missing), nothing left to pick up the work
+        while not self._work.empty():
+            steam_id, _, _ = self._work.get_nowait()
+            counts[ReturnInfo.FAILED] += 1
+            metrics.count_outcome(ReturnInfo.FAILED)
+            logging.error(f"No worker left to scrape {steam_id}")
+            if on_result:
+                on_result(steam_id, ReturnInfo.FAILED, "no worker left")
+        
+        logging.info(f"Pool finished: { {info.name: n for info, n in counts.items()} }")
+        return counts
+    
+    def close(self) -> None:
+        # Workers finish their current page and quit their drivers
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
@@ -0,0 +1,285 @@
+import json, logging, os, shutil
+
+import numpy as np
+import pandas as pd
+
+import funday_bundle.constants as const
+from funday_bundle.db_manager import DatabaseManager
+
+
+# Columnar on-disk copy of the games/bundles tables for analytics.
+#
+#   snapshot/
+#     meta.json            write_seq watermark, segment list, row counts
+#     tags.json            tag names by tags.id
+#     games_000/ ...       one .npy per column, opened with mmap
+#     bundles/
+#
+# A refresh appends a segment holding the rows written after the watermark, the
+# highest games.write_seq it has seen. Scrape times are no watermark, replayed
+# and imported rows carry old ones. Deleted rows or too many segments make a
+# full rewrite.
+
+_GAME_COLUMNS = ("hash", "steam_id", "price", "overall_rating", "overall_count", "release_date", "last_time_scraped")
+
+
+# ***
+# Encoding Helpers
+# ***
+
+def _save_strings(directory: str, name: str, values: pd.Series) -> None:
+    # Dictionary encoding: int32 codes into a utf-8 blob split by offsets
+    codes, uniques = pd.factorize(values.fillna(""), sort=False)
+    encoded = [str(value).encode("utf-8") for value in uniques]
+    offsets = np.concatenate(([0], np.cumsum([len(value) for value in encoded]))).astype(np.int64)
+
+    np.save(os.path.join(directory, f"{name}_codes.npy"), codes.astype(np.int32))
+    np.save(os.path.join(directory, f"{name}_offsets.npy"), offsets)
+    with open(os.path.join(directory, f"{name}_blob.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+
+
+def _load_strings(directory: str, name: str) -> pd.Categorical:
+    codes = np.load(os.path.join(directory, f"{name}_codes.npy"), mmap_mode="r")
+    offsets = np.load(os.path.join(directory, f"{name}_offsets.npy"))
+    with open(os.path.join(directory, f"{name}_blob.bin"), "rb") as f:
+        blob = f.read()
+
+    categories = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+    return pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object), validate=False)
+
+
+def _to_datetime64(values: pd.Series) -> np.ndarray:
+    return pd.to_datetime(values, errors="coerce", format="ISO8601").to_numpy(dtype="datetime64[s]")
+
+
+# ***
+# Writing
+# ***
+
+def _write_game_segment(db_manager: DatabaseManager, directory: str, newer_than: int | None) -> pd.DataFrame:
+    # Returns hash and write_seq of the rows written, empty when nothing is newer
+    where = "WHERE write_seq > ?" if newer_than is not None else ""
+    params = (newer_than,) if newer_than is not None else ()
+
+    games = pd.read_sql_query(
+        f"SELECT hash, steam_id, title, price, overall_rating, overall_count, release_date, last_time_scraped, write_seq FROM games {where} ORDER BY hash",
+        db_manager.conn, params=params
+    )
+    if games.empty:
+        return games[["hash", "write_seq"]]
+
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "hash.npy"), games["hash"].to_numpy(dtype="S16"))
+    np.save(os.path.join(directory, "steam_id.npy"), games["steam_id"].fillna(0).to_numpy(dtype=np.int64))
+    np.save(os.path.join(directory, "price.npy"), games["price"].to_numpy(dtype=np.float64))
+    np.save(os.path.join(directory, "overall_rating.npy"), games["overall_rating"].to_numpy(dtype=np.float64))
+    np.save(os.path.join(directory, "overall_count.npy"), games["overall_count"].fillna(0).to_numpy(dtype=np.int64))
+    np.save(os.path.join(directory, "release_date.npy"), _to_datetime64(games["release_date"]))
+    np.save(os.path.join(directory, "last_time_scraped.npy"), _to_datetime64(games["last_time_scraped"]))
+    _save_strings(directory, "title", games["title"])
+
+    # Tags as CSR rows of tags.id, read from the indexed junction instead of json
+    tag_rows = pd.read_sql_query(
+        f"SELECT gt.game_hash, gt.tag_id FROM game_tags gt JOIN games g ON g.hash = gt.game_hash {where.replace('write_seq', 'g.write_seq')}",
+        db_manager.conn, params=params
+    )
+    row_of_tag = pd.Index(games["hash"]).get_indexer(tag_rows["game_hash"])
+    order = np.argsort(row_of_tag, kind="stable")
+    np.save(os.path.join(directory, "tag_ids.npy"), tag_rows["tag_id"].to_numpy(dtype=np.int32)[order])
+    np.save(os.path.join(directory, "tag_offsets.npy"),
+            np.concatenate(([0], np.cumsum(np.bincount(row_of_tag, minlength=len(games))))).astype(np.int64))
+
+    return games[["hash", "write_seq"]]
+
+
+def _write_bundles(db_manager: DatabaseManager, directory: str) -> int:
+    bundles = pd.read_sql_query("SELECT hash, steam_id, title, discount, total_price FROM bundles ORDER BY hash", db_manager.conn)
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+
+    np.save(os.path.join(directory, "hash.npy"), bundles["hash"].to_numpy(dtype="S16"))
+    np.save(os.path.join(directory, "discount.npy"), bundles["discount"].to_numpy(dtype=np.float64))
+    np.save(os.path.join(directory, "total_price.npy"), bundles["total_price"].to_numpy(dtype=np.float64))
+    _save_strings(directory, "steam_id", bundles["steam_id"].astype(str))
+    _save_strings(directory, "title", bundles["title"])
+    return len(bundles)
+
+
+def _write_meta(path: str, meta: dict) -> None:
+    tmp_path = os.path.join(path, "meta.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(path, "meta.json"))
+
+
+def _read_meta(path: str) -> dict | None:
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def export_snapshot(db_manager: DatabaseManager, path: str = const.SNAPSHOT_PATH) -> dict:
+    db_manager.flush()
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+    written = _write_game_segment(db_manager, os.path.join(path, "games_000"), None)
+    rows = len(written)
+    meta = {
+        "write_seq": int(written["write_seq"].max()) if rows else 0,
+        "segments": ["games_000"] if rows else [],
+        "segment_rows": [rows] if rows else [],
+        "game_rows": rows, # Distinct games over all segments, equal to the db after every refresh
+        "bundle_rows": _write_bundles(db_manager, os.path.join(path, "bundles")),
+    }
+    _write_tags(db_manager, path)
+    _write_meta(path, meta)
+
+    logging.info(f"Exported snapshot with {rows} games to {path}")
+    return meta
+
+
+def _write_tags(db_manager: DatabaseManager, path: str) -> None:
+    # tags.id is append only, so one list serves every segment
+    rows = db_manager.conn.execute("SELECT id, name FROM tags").fetchall()
+    names = [""] * (max((row["id"] for row in rows), default=0) + 1)
+    for row in rows:
+        names[row["id"]] = row["name"]
+    with open(os.path.join(path, "tags.json"), "w") as f:
+        json.dump(names, f)
+
+
+def _snapshot_hashes(path: str, meta: dict) -> np.ndarray:
+    hashes = [np.load(os.path.join(path, name, "hash.npy"), mmap_mode="r") for name in meta["segments"]]
+    return np.unique(np.concatenate(hashes)) if hashes else np.zeros(0, dtype="S16")
+
+
+def refresh_snapshot(db_manager: DatabaseManager, path: str = const.SNAPSHOT_PATH) -> dict:
+    # Appends rows newer than the watermark, or rewrites when there is no usable snapshot.
+    # Snapshots from before write_seq have no "write_seq" key and are rewritten once
+    db_manager.flush()
+    meta = _read_meta(path)
+    if not meta or "write_seq" not in meta or len(meta["segments"]) >= const.SNAPSHOT_MAX_SEGMENTS:
+        return export_snapshot(db_manager, path)
+
+    segment = f"games_{len(meta['segments']):03d}"
+    segment_dir = os.path.join(path, segment)
+    written = _write_game_segment(db_manager, segment_dir, meta["write_seq"])
+    rows = len(written)
+
+    # Without deletions the db holds the old rows plus the new hashes among the written ones
+    new_hashes = int((~np.isin(written["hash"].to_numpy(dtype="S16"), _snapshot_hashes(path, meta))).sum()) if rows else 0
+    db_rows = db_manager.conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+    if db_rows != meta["game_rows"] + new_hashes:
+        shutil.rmtree(segment_dir, ignore_errors=True)
+        return export_snapshot(db_manager, path) # Rows were deleted, appending can't express that
+
+    if rows:
+        meta["segments"].append(segment)
+        meta["segment_rows"].append(rows)
+        meta["game_rows"] = db_rows
+        meta["write_seq"] = int(written["write_seq"].max())
+
+    meta["bundle_rows"] = _write_bundles(db_manager, os.path.join(path, "bundles"))
+    _write_tags(db_manager, path)
+    _write_meta(path, meta)
+
+    logging.info(f"Refreshed snapshot at {path} with {rows} newer games")
+    return meta
+
+
+def is_snapshot_stale(db_manager: DatabaseManager, path: str = const.SNAPSHOT_PATH) -> bool:
+    meta = _read_meta(path)
+    if not meta or "write_seq" not in meta:
+        return True
+    db_manager.flush()
+    newest, db_rows = db_manager.conn.execute("SELECT COALESCE(MAX(write_seq), 0), COUNT(*) FROM games").fetchone()
+    return newest > meta["write_seq"] or db_rows != meta["game_rows"]
+
+
+# ***
+# Reading
+# ***
+
+class Snapshot:
+    def __init__(self, path: str = const.SNAPSHOT_PATH):
+        meta = _read_meta(path)
+        if meta is None:
+            raise FileNotFoundError(f"No snapshot at {path}")
+
+        self.path = path
+        self.meta = meta
+        with open(os.path.join(path, "tags.json")) as f:
+            self.tag_names: list[str] = json.load(f)
+
+        self._segments = [self._open_segment(os.path.join(path, name)) for name in meta["segments"]]
+
+    @staticmethod
+    def _open_segment(directory: str) -> dict:
+        segment = {column: np.load(os.path.join(directory, f"{column}.npy"), mmap_mode="r") for column in _GAME_COLUMNS}
+        segment["title"] = _load_strings(directory, "title")
+        segment["tag_ids"] = np.load(os.path.join(directory, "tag_ids.npy"), mmap_mode="r")
+        segment["tag_offsets"] = np.load(os.path.join(directory, "tag_offsets.npy"), mmap_mode="r")
+        return segment
+
+    def _latest_rows(self) -> list[np.ndarray]:
+        # Later segments replace earlier rows with the same hash
+        seen: set[bytes] = set()
+        keep = []
+        for segment in reversed(self._segments):
+            hashes = segment["hash"]
+            mask = ~np.isin(hashes, np.array(list(seen), dtype="S16")) if seen else np.ones(len(hashes), dtype=bool)
+            seen.update(hashes[mask].tolist())
+            keep.append(np.flatnonzero(mask))
+        return keep[::-1]
+
+    def games_frame(self) -> pd.DataFrame:
+        # One segment is wrapped without copying, several are merged
+        if len(self._segments) == 1:
+            segment = self._segments[0]
+            return pd.DataFrame({
+                **{column: segment[column] for column in _GAME_COLUMNS},
+                "title": segment["title"],
+            }, copy=False)
+
+        frames = []
+        for segment, rows in zip(self._segments, self._latest_rows()):
+            frame = pd.DataFrame({column: segment[column][rows] for column in _GAME_COLUMNS})
+            frame["title"] = np.asarray(segment["title"])[rows]
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=[*_GAME_COLUMNS, "title"])
+        return pd.concat(frames, ignore_index=True)
+
+    def game_tags(self) -> tuple[np.ndarray, np.ndarray]:
+        # CSR (offsets, tag ids) aligned with games_frame(), names in self.tag_names
+        if len(self._segments) == 1:
+            return self._segments[0]["tag_offsets"], self._segments[0]["tag_ids"]
+
+        lengths, ids = [], []
+        for segment, rows in zip(self._segments, self._latest_rows()):
+            starts = segment["tag_offsets"][rows]
+            row_lengths = segment["tag_offsets"][rows + 1] - starts
+            positions = np.repeat(starts - np.cumsum(row_lengths) + row_lengths, row_lengths) + np.arange(row_lengths.sum())
+            ids.append(segment["tag_ids"][positions])
+            lengths.append(row_lengths)
+
+        if not lengths:
+            return np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32)
+        offsets = np.concatenate(([0], np.cumsum(np.concatenate(lengths)))).astype(np.int64)
+        return offsets, np.concatenate(ids)
+
+    def bundles_frame(self) -> pd.DataFrame:
+        directory = os.path.join(self.path, "bundles")
+        return pd.DataFrame({
+            "hash": np.load(os.path.join(directory, "hash.npy"), mmap_mode="r"),
+            "steam_id": _load_strings(directory, "steam_id"),
+            "title": _load_strings(directory, "title"),
+            "discount": np.load(os.path.join(directory, "discount.npy"), mmap_mode="r"),
+            "total_price": np.load(os.path.join(directory, "total_price.npy"), mmap_mode="r"),
+        }, copy=False)
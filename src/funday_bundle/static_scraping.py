@@ -0,0 +1,196 @@
+import json, logging, re
+
+from datetime import datetime
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+import funday_bundle.constants as const
+import funday_bundle.utils as util
+from funday_bundle.data_structures import GameCache, BundleCache
+from funday_bundle.utils import UrlType
+
+
+# ***
+# Fetching
+# ***
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    session = requests.Session()
+    session.headers.update(const.REQUEST_HEADERS)
+    session.cookies.update(const.STEAM_COOKIES)
+    
+    # One keep-alive pool shared by every request on the session
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_html(session: requests.Session, url: str, timeout: float = const.REQUEST_TIMEOUT) -> str | None:
+    try:
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logging.error(f"Static fetch failed for {url}: {e}")
+        return None
+
+    # Steam redirects to the age gate when the cookies are not accepted
+    if "/agecheck/" in response.url:
+        logging.info(f"Static fetch hit age gate for {url}")
+        return None
+
+    return response.text
+
+
+# ***
+# Game Page Parsing (works on saved html, so it can run offline)
+# ***
+
+def parse_game_title(soup: BeautifulSoup) -> str | None:
+    title_div = soup.select_one(const.TITLE_SELECTOR)
+    if not title_div:
+        return None
+
+    title = title_div.get_text().strip().lower()
+    return title if title else None
+
+
+def parse_game_price(soup: BeautifulSoup) -> float | None:
+    price_div = soup.select_one(const.PRICE_WRAPPER_SELECTOR)
+    if not price_div:
+        return None
+
+    price_span = price_div.select_one(const.NORMAL_GAME_PRICE)
+    if not price_span:
+        price_span = price_div.select_one(const.DISCOUNT_ORIGINAL_PRICE)
+    if not price_span:
+        return None
+
+    str_price = price_span.get_text().strip().lower()
+    if not str_price:
+        return None
+
+    return util.parse_price(str_price)
+
+
+def parse_game_ratings(soup: BeautifulSoup) -> tuple[int, float] | None:
+    rating_upper_div = soup.select_one(const.REVIEW_1_SELECTOR)
+    if not rating_upper_div:
+        return None
+
+    rating_div = rating_upper_div.select_one(const.REVIEW_2_SELECTOR)
+    if not rating_div:
+        return None
+
+    content = rating_div.get("data-tooltip-html")
+    if not content:
+        return None
+
+    return util.parse_ratings(str(content).strip().lower())
+
+
+def parse_game_tags(soup: BeautifulSoup) -> list[str]:
+    # The full list is what the tag button shows, it is handed to the page in a script
+    for script in soup.find_all("script"):
+        match = re.search(const.TAG_MODAL_PATTERN, script.get_text(), re.DOTALL)
+        if not match:
+            continue
+        try:
+            tags = [tag["name"].strip().lower() for tag in json.loads(match.group(1))]
+        except (ValueError, KeyError, TypeError) as e:
+            logging.error(f"Could not decode tag list from script: {e}")
+            break
+        if tags:
+            return tags
+
+    # Fallback to the tags shown on the page without clicking
+    tags = [tag.get_text().strip().lower() for tag in soup.select(const.GLANCE_TAGS_SELECTOR)]
+    return [tag for tag in tags if tag and tag != "+"]
+
+
+def parse_release_date(soup: BeautifulSoup) -> datetime | None:
+    release_date_div = soup.select_one(const.RELEASE_DATE_SELECTOR)
+    if not release_date_div:
+        return None
+
+    return util.get_time_from_str(release_date_div.get_text("\n", strip=True))
+
+
+def parse_game_page(html: str, steam_id: int, steam_link_hash: str) -> GameCache | None:
+    soup = BeautifulSoup(html, "html.parser")
+
+    game_title = parse_game_title(soup)
+    game_price = parse_game_price(soup)
+    temp_rating = parse_game_ratings(soup)
+    game_tags = parse_game_tags(soup)
+    release_date = parse_release_date(soup)
+
+    # Same requirements as the selenium scraper, anything missing means a fallback is needed
+    if not game_title or not game_price or not temp_rating or not game_tags or not release_date:
+        logging.info(f"Static parse incomplete for {steam_id}")
+        return None
+
+    overall_count, overall_rating = temp_rating
+
+    return GameCache(
+        hash=steam_link_hash,
+        steam_id=steam_id,
+        title=game_title,
+        price=game_price,
+        overall_rating=overall_rating,
+        overall_count=overall_count,
+        tags=game_tags,
+        release_date=release_date,
+        last_time_scraped=datetime.now()
+    )
+
+
+# ***
+# Bundle Page Parsing
+# ***
+
+def parse_bundle_page(html: str, bundle_id: str, bundle_link_hash: str) -> BundleCache | None:
+    return parse_bundle_page_with_games(html, bundle_id, bundle_link_hash)[0]
+
+
+def parse_bundle_page_with_games(html: str, bundle_id: str, bundle_link_hash: str) -> tuple[BundleCache | None, list[str]]:
+    # Also gives the steam ids of the games, the crawler follows them
+    soup = BeautifulSoup(html, "html.parser")
+
+    title_div = soup.select_one(const.BUNDLE_TITLE_SELECTOR)
+    if not title_div or not title_div.get_text().strip():
+        logging.info(f"Static bundle parse found no title for {bundle_id}")
+        return None, []
+    bundle_title = title_div.get_text().strip().lower()
+
+    game_ids: list[str] = []
+    for link in soup.select(const.BUNDLE_GAME_LINK_SELECTOR):
+        href = link.get("href")
+        game_id = util.extract_steam_id(str(href)) if href else None
+        if game_id and game_id not in game_ids:
+            game_ids.append(game_id)
+
+    if not game_ids:
+        logging.info(f"Static bundle parse found no games for {bundle_id}")
+        return None, []
+
+    # Games are stored by the hash of their canonical page, same as GameCache.hash
+    games_in_bundle = [util.get_hash_by_id(game_id, UrlType.GAME_PAGE) for game_id in game_ids]
+
+    discount_div = soup.select_one(const.BUNDLE_DISCOUNT_SELECTOR)
+    discount = util.parse_price(discount_div.get_text()) / 100.0 if discount_div else 0.0
+
+    price_div = soup.select_one(const.BUNDLE_PRICE_SELECTOR)
+    total_price = util.parse_price(price_div.get_text().strip().lower()) if price_div else 0.0
+
+    return BundleCache(
+        hash=bundle_link_hash,
+        steam_id=bundle_id,
+        title=bundle_title,
+        discount=discount,
+        total_price=total_price,
+        tags=[], # Not on the bundle page and never filled, the db derives bundle tags from the games
+        games_in_bundle=games_in_bundle
+    ), game_ids
@@ -0,0 +1,164 @@
+import logging
+
+from dataclasses import replace
+from datetime import datetime
+from typing import Callable, Iterable
+
+import requests
+from bs4 import BeautifulSoup
+
+import funday_bundle.constants as const
+import funday_bundle.static_scraping as static
+import funday_bundle.utils as util
+from funday_bundle.data_structures import GameCache
+from funday_bundle.utils import UrlType
+
+
+# Structured app data from the store json endpoints instead of html.
+# Point base_url at a stub server to replay recorded json.
+class SteamStoreApi:
+    def __init__(self, session: requests.Session | None = None, base_url: str = const.STORE_BASE_URL,
+                 country_code: str = const.API_COUNTRY_CODE, language: str = const.API_LANGUAGE,
+                 tag_source: Callable[[int], list[str]] | None = None):
+        self.session = session if session else static.create_session()
+        self.base_url = base_url
+        self.country_code = country_code
+        self.language = language
+
+        # User tags are not in the api and there is no batch endpoint for them.
+        # The default fetches the game's html page, one extra request per new game,
+        # callers that already know the tags pass them to fetch_game instead
+        self.tag_source = tag_source if tag_source else self._get_tags_from_html
+
+    # ***
+    # Raw Endpoints
+    # ***
+
+    def _get_json(self, path: str, params: dict) -> dict | None:
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=const.REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            logging.error(f"Api request to {path} failed: {e}")
+            return None
+
+    def get_app_details(self, steam_id: int) -> dict | None:
+        payload = self._get_json("/api/appdetails", {"appids": steam_id, "cc": self.country_code, "l": self.language})
+        if not payload:
+            return None
+
+        entry = payload.get(str(steam_id), {})
+        if not entry.get("success") or not isinstance(entry.get("data"), dict):
+            logging.info(f"No app details for {steam_id}")
+            return None
+        return entry["data"]
+
+    def get_review_summary(self, steam_id: int) -> tuple[int, float] | None:
+        payload = self._get_json(f"/appreviews/{steam_id}", {
+            "json": 1, "language": "all", "purchase_type": "all", "num_per_page": 0
+        })
+        if not payload or not payload.get("success"):
+            return None
+
+        summary = payload.get("query_summary", {})
+        total = int(summary.get("total_reviews", 0))
+        positive = int(summary.get("total_positive", 0))
+
+        # Same (count, fraction) shape as util.parse_ratings
+        return total, (positive / total if total else 0.0)
+
+    def get_prices(self, steam_ids: Iterable[int]) -> dict[int, float]:
+        # Many appids per request, the endpoint only allows this for the price filter
+        prices: dict[int, float] = {}
+        steam_ids = list(steam_ids)
+
+        for i in range(0, len(steam_ids), const.API_PRICE_BATCH_SIZE):
+            chunk = steam_ids[i:i + const.API_PRICE_BATCH_SIZE]
+            payload = self._get_json("/api/appdetails", {
+                "appids": ",".join(str(steam_id) for steam_id in chunk),
+                "filters": "price_overview",
+                "cc": self.country_code
+            })
+            if not payload:
+                continue
+
+            for steam_id in chunk:
+                entry = payload.get(str(steam_id), {})
+                data = entry.get("data")
+
+                # Free games come back with an empty list instead of price_overview
+                if entry.get("success") and isinstance(data, dict) and "price_overview" in data:
+                    prices[steam_id] = self._price_from_overview(data["price_overview"])
+
+        return prices
+
+
+    # ***
+    # Mapping to GameCache
+    # ***
+
+    @staticmethod
+    def _price_from_overview(price_overview: dict) -> float:
+        # initial is the price before discount, the same one the html scraper reads, in cents
+        return price_overview.get("initial", price_overview.get("final", 0)) / 100.0
+
+    def _get_tags_from_html(self, steam_id: int) -> list[str]:
+        html = static.fetch_html(self.session, util.get_url_by_id(steam_id, UrlType.GAME_PAGE, self.base_url))
+        if not html:
+            return []
+        return static.parse_game_tags(BeautifulSoup(html, "html.parser"))
+
+    def fetch_game(self, steam_id: int, tags: list[str] | None = None) -> GameCache | None:
+        details = self.get_app_details(steam_id)
+        if not details:
+            return None
+
+        title = str(details.get("name", "")).strip().lower()
+
+        # Free games have no price_overview, rejected like the html parsers reject a page without a price
+        if details.get("is_free") or "price_overview" not in details:
+            logging.info(f"No price in app details for {steam_id}")
+            return None
+        price = self._price_from_overview(details["price_overview"])
+        if not price:
+            logging.info(f"Zero price in app details for {steam_id}")
+            return None
+
+        release_info = details.get("release_date", {})
+        release_date = util.get_time_from_str(release_info.get("date", "")) if not release_info.get("coming_soon") else None
+
+        ratings = self.get_review_summary(steam_id)
+        if not title or not release_date or not ratings:
+            logging.info(f"Api data incomplete for {steam_id}")
+            return None
+        overall_count, overall_rating = ratings
+
+        # Known tags skip the html fetch, tags change far slower than prices and reviews
+        game_tags = tags if tags else self.tag_source(steam_id)
+        if not game_tags:
+            logging.info(f"No user tags found for {steam_id}")
+            return None
+
+        return GameCache(
+            hash=util.get_hash_by_id(steam_id, UrlType.GAME_PAGE),
+            steam_id=steam_id,
+            title=title,
+            price=price,
+            overall_rating=overall_rating,
+            overall_count=overall_count,
+            tags=game_tags,
+            release_date=release_date,
+            last_time_scraped=datetime.now()
+        )
+
+    def refresh_prices(self, games: Iterable[GameCache]) -> list[GameCache]:
+        # Cheap refresh of many known games, one request per API_PRICE_BATCH_SIZE apps
+        games = list(games)
+        prices = self.get_prices(game.steam_id for game in games)
+        now = datetime.now()
+
+        return [
+            replace(game, price=prices[game.steam_id], last_time_scraped=now)
+            for game in games if game.steam_id in prices
+        ]
@@ -1,12 +1,20 @@
 import logging, time, random
 
 from datetime import datetime
+from typing import Callable
+
+import requests
 
 import funday_bundle.constants as const
 import funday_bundle.utils as util
+import funday_bundle.static_scraping as static
+from funday_bundle.metrics import metrics
+from funday_bundle.page_archive import PageArchive
+from funday_bundle.steam_api import SteamStoreApi
 from funday_bundle.utils import ReturnInfo, UrlType
 from funday_bundle.data_structures import CachedCollection, GameCache, BundleCache
 
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.remote.webdriver import WebDriver
@@ -14,12 +22,68 @@ from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support import expected_conditions as EC
 
 
+# Reads every game field in the browser, one round trip instead of one per element.
+# Selectors and the tag pattern come in as arguments so constants.py stays the only copy.
+_EXTRACT_GAME_SCRIPT = """
+const [s] = arguments;
+const text = (el) => el ? (el.innerText || el.textContent || "").trim() : null;
+
+const wrapper = document.querySelector(s.priceWrapper);
+const priceEl = wrapper && (wrapper.querySelector(s.normalPrice) || wrapper.querySelector(s.discountOriginal));
+const reviewBox = document.querySelector(s.reviewOuter);
+const review = reviewBox && reviewBox.querySelector(s.reviewInner);
+
+let tags = null;
+const tagPattern = new RegExp(s.tagPattern);
+for (const script of document.scripts) {
+    const match = tagPattern.exec(script.textContent);
+    if (match) {
+        try { tags = JSON.parse(match[1]).map((tag) => tag.name); } catch (e) {}
+        break;
+    }
+}
+if (!tags || !tags.length) {
+    tags = Array.from(document.querySelectorAll(s.glanceTags))
+        .filter((el) => !el.matches(s.tagButton))
+        .map((el) => (el.textContent || "").trim())
+        .filter(Boolean);
+}
+
+return {
+    title: text(document.querySelector(s.title)),
+    price: text(priceEl),
+    review: review ? review.getAttribute("data-tooltip-html") : null,
+    tags: tags,
+    release_date: text(document.querySelector(s.releaseDate)),
+};
+"""
+
+
 # Class code
 class SteamScraper:
-    def __init__(self, driver: WebDriver, cache_collection: CachedCollection):
+    def __init__(self, driver: WebDriver, cache_collection: CachedCollection, session: requests.Session | None = None, use_static: bool = True, api: SteamStoreApi | None = None,
+                 base_url: str = const.STORE_BASE_URL, page_delay: tuple[float, float] = const.PAGE_DELAY, use_script: bool = True,
+                 archive: PageArchive | None = None):
         self.driver = driver
         self.wait = WebDriverWait(self.driver, 3)
         self.cache_collection = cache_collection
+        
+        # Browserless fast path, selenium is kept as fallback
+        self.use_static = use_static
+        self.session = session if session else static.create_session()
+        
+        # Optional json api backend, tried before any html
+        self.api = api
+        
+        # Pages are fetched from base_url (a local stand-in in benchmarks), hashes always use the store url
+        self.base_url = base_url
+        self.page_delay = page_delay
+        
+        # Browser pages are read with one execute_script, False walks the elements one by one
+        self.use_script = use_script
+        
+        # Raw copy of every fetched page, for re-parsing offline
+        self.archive = archive
     
     # ***   
     # Common Scraper Functions
@@ -33,7 +97,14 @@ class SteamScraper:
             return (element.find_element(By.CSS_SELECTOR, selector))
         
         else: # Using driver
-            self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+            start = time.perf_counter()
+            try:
+                self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+            except TimeoutException:
+                metrics.observe_selector(selector, time.perf_counter() - start, timed_out=True)
+                raise
+            metrics.observe_selector(selector, time.perf_counter() - start)
+            
             if find_multiple:
                 return (self.driver.find_elements(By.CSS_SELECTOR, selector))
             
@@ -83,152 +154,344 @@ class SteamScraper:
                 return util.parse_ratings(temp_rating)
     
     
-    def _scrape_single_game_page(self, steam_id: (str | int)) -> ReturnInfo:
+    def _scrape_game_static(self, url: str, steam_link_hash: str, steam_id: int) -> GameCache | None:
+        with metrics.stage("static_fetch"):
+            html = static.fetch_html(self.session, url)
+        if not html:
+            return None
+        if self.archive:
+            self.archive.put(url, html)
+        
+        with metrics.stage("static_parse"):
+            return static.parse_game_page(html, steam_id, steam_link_hash)
+    
+    
+    def _scrape_game_with_driver(self, url: str, steam_link_hash: str, steam_id: int) -> GameCache | None:
+        with metrics.stage("driver_get"):
+            self.driver.get(url)
+        
+        # Variables to fill
+        
+        game_title: str
+        game_price: float
+        _overall_rating: float
+        _overall_count: int
+        game_tags: list[str]
+        _release_date: datetime
+        
+        
+        #** Data scraping section **
+        
+        # Game Title Extraction
+        title_div = self._get_div_content(const.TITLE_SELECTOR)
+        
+        if not isinstance(title_div, list):
+            temp_title: str = title_div.text
+            game_title = temp_title.strip().lower()
+        
+        logging.info(f"Scraped Game Title: {game_title}")
+        
+                        
+        # Game Price
+        temp_price = self._get_game_price()
+        if not temp_price:
+            util.print_scraping_error(steam_id)
+            return None
+        
+        game_price = temp_price
+        logging.info(f"Scraped Game Price: {game_price}")
+        
+        
+        # Reviews
+        temp_rating = self._get_game_ratings()
+                    
+        if not temp_rating:
+            util.print_scraping_error(steam_id)
+            return None
+        
+        _overall_count, _overall_rating = temp_rating
+        
+        logging.info(f"Scraped Review Score: {_overall_rating * 100}%")
+        logging.info(f"Scraped Review Count: {_overall_count}")
+        
+        
+        # Tags
+        button_tags = self._get_div_content(const.BUTTON_TAGS)
+        if not isinstance(button_tags, list):
+            with metrics.stage("tag_button_click"):
+                button_tags.click()
+        
+        tags_div = self._get_div_content(const.TAGS_SELECTOR)
+        if not isinstance(tags_div, list):
+            tags_str = tags_div.text
+            tags_list = tags_str.split("\n")
+            strip_list = [tag.strip().lower() for tag in tags_list]
+            game_tags = strip_list
+        
+        logging.info(f"Scraped game user tags: {game_tags}")
+        
+        
+        
+        # Release Date
+        release_date_div = self._get_div_content(const.RELEASE_DATE_SELECTOR)
+        
+        if not isinstance(release_date_div, list):
+            release_date_str = release_date_div.text
+            date_obj = util.get_time_from_str(release_date_str)
+            if not date_obj:
+                util.print_scraping_error(steam_id)
+                return None
+            _release_date = date_obj
+        
+        logging.info(f"Scraped Release Date: {_release_date}")
+        
+        
+        return GameCache(
+            hash=steam_link_hash,
+            steam_id=steam_id,
+            title=game_title,
+            price=game_price,
+            overall_rating=_overall_rating,
+            overall_count=_overall_count,
+            tags=game_tags,
+            release_date=_release_date,
+            last_time_scraped=datetime.now()
+        )
+    
+    
+    def _scrape_game_with_script(self, url: str, steam_link_hash: str, steam_id: int) -> GameCache | None:
+        with metrics.stage("driver_get"):
+            self.driver.get(url)
+        
+        # One wait for the page, then every field in a single call
+        self._get_div_content(const.TITLE_SELECTOR)
+        with metrics.stage("execute_script"):
+            fields = self.driver.execute_script(_EXTRACT_GAME_SCRIPT, {
+                "title": const.TITLE_SELECTOR,
+                "priceWrapper": const.PRICE_WRAPPER_SELECTOR,
+                "normalPrice": const.NORMAL_GAME_PRICE,
+                "discountOriginal": const.DISCOUNT_ORIGINAL_PRICE,
+                "reviewOuter": const.REVIEW_1_SELECTOR,
+                "reviewInner": const.REVIEW_2_SELECTOR,
+                "glanceTags": const.GLANCE_TAGS_SELECTOR,
+                "tagButton": const.BUTTON_TAGS,
+                "tagPattern": const.TAG_MODAL_PATTERN,
+                "releaseDate": const.RELEASE_DATE_SELECTOR,
+            })
+        
+        return self._game_from_fields(fields, steam_link_hash, steam_id)
+    
+    
+    @staticmethod
+    def _game_from_fields(fields: dict | None, steam_link_hash: str, steam_id: int) -> GameCache | None:
+        # Same checks as the element by element path, a missing field fails the game
+        if not fields or not fields.get("title"):
+            util.print_scraping_error(steam_id)
+            return None
+        
+        game_price = util.parse_price(fields["price"].strip().lower()) if fields.get("price") else None
+        rating = util.parse_ratings(fields["review"].strip().lower()) if fields.get("review") else None
+        release_date = util.get_time_from_str(fields["release_date"]) if fields.get("release_date") else None
+        game_tags = [tag.strip().lower() for tag in fields.get("tags") or [] if tag.strip() and tag.strip() != "+"]
+        
+        # Missing tags fail the game too, as in static.parse_game_page
+        if not game_price or not rating or not release_date or not game_tags:
+            logging.info(f"Missing fields for {steam_id}: price={game_price} rating={rating} release={release_date} tags={len(game_tags)}")
+            util.print_scraping_error(steam_id)
+            return None
+        
+        overall_count, overall_rating = rating
+        
+        return GameCache(
+            hash=steam_link_hash,
+            steam_id=steam_id,
+            title=fields["title"].strip().lower(),
+            price=game_price,
+            overall_rating=overall_rating,
+            overall_count=overall_count,
+            tags=game_tags,
+            release_date=release_date,
+            last_time_scraped=datetime.now()
+        )
+    
+    
+    def _extract_game(self, url: str, steam_link_hash: str, steam_id: int) -> GameCache | None:
+        if self.api:
+            # Stored tags are reused so a refresh costs only the two json requests
+            stored = self.cache_collection.get_game(steam_link_hash)
+            with metrics.stage("api_fetch"):
+                game_obj = self.api.fetch_game(steam_id, tags=stored.tags if stored else None)
+            if game_obj:
+                logging.info(f"Scraped {steam_id} from store api")
+                return game_obj
+            logging.info(f"Store api incomplete for {steam_id}")
+        
+        # Plain GET first, the browser is only needed when the static html is not enough
+        if self.use_static:
+            game_obj = self._scrape_game_static(url, steam_link_hash, steam_id)
+            if game_obj:
+                logging.info(f"Scraped {steam_id} without browser")
+                return game_obj
+            logging.info(f"Falling back to browser for {steam_id}")
+        
+        with metrics.stage("driver_extract"):
+            if self.use_script:
+                game_obj = self._scrape_game_with_script(url, steam_link_hash, steam_id)
+            else:
+                game_obj = self._scrape_game_with_driver(url, steam_link_hash, steam_id)
+        
+        # The rendered dom reads with the same static parser on replay
+        if game_obj and self.archive:
+            self.archive.put(url, self.driver.page_source)
+        return game_obj
+    
+    
+    def scrape_game(self, steam_id: (str | int), force: bool = False) -> tuple[ReturnInfo, GameCache | None]:
+        # Claims the game and extracts it without writing, driver errors are raised to the caller
         url = util.get_url_by_id(steam_id, UrlType.GAME_PAGE)
         
         if not url:
-            return util.print_scraping_error(steam_id)
+            return util.print_scraping_error(steam_id), None
         
-        hash = util.get_hash_from_url(url)
-        logging.info(f"Calculated Hash: {hash}")
+        # ID saving, the steam id is the identity of the game
+        temp_id = util.extract_steam_id(url)
+        if not temp_id:
+            return util.print_scraping_error(steam_id), None
         
-        game_obj = self.cache_collection.does_game_exists(hash)
+        _steam_id = int(temp_id)
+        logging.info(f"Exctracetd ID: {_steam_id}")
         
-        if game_obj:
+        if not self.cache_collection.claim_game(_steam_id, force):
             logging.info(f"Game is already scraped.")
-            return ReturnInfo.FOUND_IN_CACHE
+            return ReturnInfo.FOUND_IN_CACHE, None
         
+        hash = util.get_hash_from_url(url)
+        logging.info(f"Calculated Hash: {hash}")
         
         try:
-            self.driver.get(url)
-            
-            # Variables to fill
-            
-            steam_link_hash: str
-            _steam_id: int
-            game_title: str
-            game_price: float
-            _overall_rating: float
-            _overall_count: int
-            game_tags: list[str]
-            _release_date: datetime
-            
-            
-            #** Data scraping section **
-            
-            # Hash calculation
-            steam_link_hash = hash            
-            
-            # ID saving
-            temp_id = util.extract_steam_id(steam_id)
-            if not temp_id:
-                return util.print_scraping_error(steam_id)
-            
-            _steam_id = int(temp_id)
-            logging.info(f"Exctracetd ID: {_steam_id}")
-            
-                        
-            # Game Title Extraction
-            title_div = self._get_div_content(const.TITLE_SELECTOR)
-            
-            if not isinstance(title_div, list):
-                temp_title: str = title_div.text
-                game_title = temp_title.strip().lower()
-            
-            logging.info(f"Scraped Game Title: {game_title}")
-            
-                            
-            # Game Price
-            temp_price = self._get_game_price()
-            if not temp_price:
-                return util.print_scraping_error(steam_id)
-            
-            game_price = temp_price
-            logging.info(f"Scraped Game Price: {game_price}")
-            
-            
-            # Reviews
-            temp_rating = self._get_game_ratings()
-                        
-            if not temp_rating:
-                return util.print_scraping_error(steam_id)
-            
-            _overall_count, _overall_rating = temp_rating
-            
-            logging.info(f"Scraped Review Score: {_overall_rating * 100}%")
-            logging.info(f"Scraped Review Count: {_overall_count}")
-            
-            
-            # Tags
-            button_tags = self._get_div_content(const.BUTTON_TAGS)
-            if not isinstance(button_tags, list):
-                button_tags.click()
-            
-            tags_div = self._get_div_content(const.TAGS_SELECTOR)
-            if not isinstance(tags_div, list):
-                tags_str = tags_div.text
-                tags_list = tags_str.split("\n")
-                strip_list = [tag.strip().lower() for tag in tags_list]
-                game_tags = strip_list
-            
-            logging.info(f"Scraped game user tags: {game_tags}")
-            
-            
-            
-            # Release Date
-            release_date_div = self._get_div_content(const.RELEASE_DATE_SELECTOR)
-            
-            if not isinstance(release_date_div, list):
-                release_date_str = release_date_div.text
-                date_obj = util.get_time_from_str(release_date_str)
-                if not date_obj:
-                    return util.print_scraping_error(steam_id)
-                _release_date = date_obj
-            
-            logging.info(f"Scraped Release Date: {_release_date}")
-            
-            
-            logging.info(f"Success Fully Scraping Game: {steam_id}")
-            game_scraped = GameCache(
-                hash=steam_link_hash,
-                steam_id=_steam_id,
-                title=game_title,
-                price=game_price,
-                overall_rating=_overall_rating,
-                overall_count=_overall_count,
-                tags=game_tags,
-                release_date=_release_date,
-                last_time_scraped=datetime.now()
-            )
+            game_scraped = self._extract_game(util.get_url_by_id(_steam_id, UrlType.GAME_PAGE, self.base_url), hash, _steam_id)
+        except Exception:
+            self.cache_collection.release_game(_steam_id)
+            raise
+        
+        if not game_scraped:
+            self.cache_collection.release_game(_steam_id)
+            return ReturnInfo.FAILED, None
+        
+        logging.info(f"Success Fully Scraping Game: {steam_id}")
+        return ReturnInfo.SCRAPED_SCUCCESFULLY, game_scraped
+    
+    
+    def _scrape_single_game_page(self, steam_id: (str | int), force: bool = False) -> ReturnInfo:
+        try:
+            with metrics.stage("game_page"):
+                return_info, game_scraped = self.scrape_game(steam_id, force)
             
-            self.cache_collection.add_game(game_scraped)
-            return ReturnInfo.SCRAPED_SCUCCESFULLY
+            if game_scraped:
+                with metrics.stage("db_write"):
+                    self.cache_collection.add_game(game_scraped)
             
         except Exception as e:
-            logging.error(f"Error scraping {steam_id}: e")
-            return ReturnInfo.FAILED
+            logging.error(f"Error scraping {steam_id}: {e}")
+            return_info = ReturnInfo.FAILED
+        
+        metrics.count_outcome(return_info)
+        return return_info
         
     # ***   
     # Bundle Scraper Sub Functions
     # ***
     
+    def _get_bundlelist_links(self) -> list[str]:
+        first_section = self._get_div_content(const.BUNDLE_SECTION_SELECTOR)
+        if isinstance(first_section, list):
+            return []
+        
+        bundle_containers = self._get_div_content(const.BUNDLE_ELEMENTS_SELECTOR, True, first_section)
+        if not isinstance(bundle_containers, list):
+            return []
+        
+        links: list[str] = []
+        for bundle in bundle_containers:
+            for element in bundle.find_elements(By.CSS_SELECTOR, f"{const.FOCUSABLE_SELECTOR}, a[href]"):
+                link = element.get_attribute('href')
+                if link:
+                    links.append(link)
+        return links
+    
+    
+    def scrape_bundlelist_page(self, steam_id: (str | int)) -> tuple[list[str], list[str]] | None:
+        # Bundle and game ids linked from the bundles containing a game, the list is rendered by js
+        url = util.get_url_by_id(steam_id, UrlType.GAME_BUNDLE_PAGE, self.base_url)
+        if not url:
+            return None
+        
+        try:
+            with metrics.stage("bundlelist_page"):
+                self.driver.get(url)
+                links = self._get_bundlelist_links()
+        except TimeoutException:
+            logging.info(f"No bundles on {url}")
+            return [], []
+        except Exception as e:
+            logging.error(f"Error scraping {url}: {e}")
+            return None
+        
+        bundle_ids: dict[str, None] = {}
+        game_ids: dict[str, None] = {}
+        for link in links:
+            match util.get_url_type(link):
+                case UrlType.BUNDLE_PAGE:
+                    bundle_ids[util.extract_steam_id(link)] = None
+                case UrlType.GAME_PAGE:
+                    game_ids[util.extract_steam_id(link)] = None
         
+        logging.info(f"Found {len(bundle_ids)} bundles and {len(game_ids)} games on {url}")
+        return list(bundle_ids), list(game_ids)
+    
+    
+    def scrape_bundle_page(self, bundle_id: (str | int)) -> tuple[ReturnInfo, list[str]]:
+        # Writes the bundle and gives the steam ids of its games
+        url = util.get_url_by_id(bundle_id, UrlType.BUNDLE_PAGE)
+        temp_id = util.extract_steam_id(url)
+        if not url or not temp_id:
+            return util.print_scraping_error(bundle_id), []
+        
+        if self.cache_collection.is_known_bundle(temp_id):
+            return ReturnInfo.FOUND_IN_CACHE, []
+        hash = util.get_hash_from_url(url)
         
+        with metrics.stage("bundle_page"):
+            html = static.fetch_html(self.session, util.get_url_by_id(temp_id, UrlType.BUNDLE_PAGE, self.base_url))
+            if html and self.archive:
+                self.archive.put(url, html)
+            bundle_obj, game_ids = static.parse_bundle_page_with_games(html, temp_id, hash) if html else (None, [])
+        
+        if not bundle_obj or not self.cache_collection.add_bundle(bundle_obj):
+            return util.print_scraping_error(bundle_id), []
+        
+        logging.info(f"Success Fully Scraping Bundle: {bundle_id}")
+        return ReturnInfo.SCRAPED_SCUCCESFULLY, game_ids
+    
+    
     # ***   
     # Callable Scraper functions
     # ***
         
 
-    def scrape_game_pages(self, steam_ids: list[str] | list[int]) -> None:
+    def scrape_game_pages(self, steam_ids: list[str] | list[int], force: bool = False,
+                          on_result: Callable[[str | int, ReturnInfo, str | None], None] | None = None) -> None:
         logging.info(f"Beginning scraping of {len(steam_ids)} games")
         
         for index, steam_id in enumerate(steam_ids):
             logging.info(f"Scraping game nr. {index + 1}: {steam_id}")
-            return_info = self._scrape_single_game_page(steam_id)
+            return_info = self._scrape_single_game_page(steam_id, force)
+            if on_result:
+                on_result(steam_id, return_info, None)
 
             if (return_info == ReturnInfo.FOUND_IN_CACHE):
                 wait_time: float = 0
             else:
-                wait_time: float = random.uniform(2, 5)
+                wait_time: float = random.uniform(*self.page_delay)
 
             time.sleep(wait_time)
\ No newline at end of file
@@ -0,0 +1,264 @@
+import hashlib, logging, os
+
+from typing import Iterable, Iterator
+
+import numpy as np
+
+import funday_bundle.constants as const
+from funday_bundle.db_manager import DatabaseManager
+
+
+_PRIME = np.uint64(4294967291) # Largest prime below 2^32, keeps signatures in uint32
+_BAND_MULT = np.uint64(0x9E3779B97F4A7C15) # Mixes the rows of a band into one key
+
+
+# The index saved for a database, e.g. scraped_data/games.db -> scraped_data/games_tag_lsh_index.npz
+def index_path(db_path: str) -> str:
+    return os.path.splitext(db_path)[0] + const.LSH_INDEX_SUFFIX
+
+
+# MinHash signatures of GameCache.tags with banded LSH buckets, gives candidate
+# near neighbours without comparing against the whole catalog.
+# Saved buckets are sorted arrays searched with searchsorted, updates since the
+# last save live in small dicts and are merged in on save. The file keeps the
+# games.write_seq it covers, loading only hashes the games written after it.
+class TagLSHIndex:
+    def __init__(self, path: str, num_perm: int = const.LSH_NUM_PERM,
+                 bands: int = const.LSH_BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.path = path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        # Fixed seed, signatures saved on disk must stay comparable
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._tag_hashes: dict[str, int] = {}
+
+        # Saved part
+        self._hashes: np.ndarray = np.array([], dtype=str)
+        self._row_of: dict[str, int] = {}
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._sorted_keys = np.zeros((bands, 0), dtype=np.uint64)
+        self._sorted_rows = np.zeros((bands, 0), dtype=np.int64)
+        self.write_seq = -1 # Covers games written up to this, -1 is nothing yet
+
+        # Changes since the last save
+        self._removed: set[str] = set()
+        self._delta_signatures: dict[str, np.ndarray] = {}
+        self._delta_buckets: list[dict[int, set[str]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._row_of) - len(self._removed) + len(self._delta_signatures)
+
+    def __contains__(self, game_hash: str) -> bool:
+        return game_hash in self._delta_signatures or (game_hash in self._row_of and game_hash not in self._removed)
+
+
+    # ***
+    # Signatures
+    # ***
+
+    def _tag_hash(self, tag: str) -> int:
+        if tag not in self._tag_hashes:
+            digest = hashlib.blake2b(tag.encode('utf-8'), digest_size=4).digest()
+            self._tag_hashes[tag] = int.from_bytes(digest, 'little')
+        return self._tag_hashes[tag]
+
+    def signature(self, tags: Iterable[str]) -> np.ndarray | None:
+        tag_hashes = np.fromiter({self._tag_hash(tag) for tag in tags}, dtype=np.uint64)
+        if not len(tag_hashes):
+            return None
+
+        # (a * h + b) mod p for every permutation and tag, min over tags
+        permuted = (self._a[:, None] * tag_hashes[None, :] + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        # (n, num_perm) -> (n, bands), uint64 arithmetic wraps on purpose
+        grouped = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        keys = np.zeros(grouped.shape[:2], dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for r in range(self.rows):
+                keys = keys * _BAND_MULT + grouped[:, :, r]
+        return keys
+
+    def get_signature(self, game_hash: str) -> np.ndarray | None:
+        if game_hash in self._delta_signatures:
+            return self._delta_signatures[game_hash]
+        if game_hash in self._row_of and game_hash not in self._removed:
+            return self._signatures[self._row_of[game_hash]]
+        return None
+
+
+    # ***
+    # Updating
+    # ***
+
+    def remove(self, game_hash: str) -> None:
+        if game_hash in self._row_of:
+            self._removed.add(game_hash)
+
+        old = self._delta_signatures.pop(game_hash, None)
+        if old is not None:
+            for band, key in enumerate(self._band_keys(old[None, :])[0]):
+                self._delta_buckets[band][int(key)].discard(game_hash)
+
+    def update(self, game_hash: str, tags: Iterable[str]) -> None:
+        # Inserting and refreshing are the same, the old signature is dropped first
+        self.remove(game_hash)
+
+        signature = self.signature(tags)
+        if signature is None:
+            return
+
+        self._delta_signatures[game_hash] = signature
+        for band, key in enumerate(self._band_keys(signature[None, :])[0]):
+            self._delta_buckets[band].setdefault(int(key), set()).add(game_hash)
+
+
+    # ***
+    # Queries
+    # ***
+
+    def candidates(self, signature: np.ndarray) -> set[str]:
+        found: set[str] = set()
+        keys = self._band_keys(signature[None, :])[0]
+
+        for band, key in enumerate(keys):
+            sorted_keys = self._sorted_keys[band]
+            start = np.searchsorted(sorted_keys, key, side='left')
+            end = np.searchsorted(sorted_keys, key, side='right')
+            found.update(self._hashes[self._sorted_rows[band][start:end]].tolist())
+            found.update(self._delta_buckets[band].get(int(key), ()))
+
+        # Saved rows that were refreshed or removed only count through the delta
+        return {h for h in found if h in self._delta_signatures or h not in self._removed}
+
+    def similar_games(self, game_hash: str, min_similarity: float = 0.0, limit: int | None = None) -> list[tuple[str, float]]:
+        # Candidates with estimated jaccard similarity, highest first
+        signature = self.get_signature(game_hash)
+        if signature is None:
+            return []
+
+        found = [h for h in self.candidates(signature) if h != game_hash]
+        if not found:
+            return []
+
+        estimates = (np.stack([self.get_signature(h) for h in found]) == signature).mean(axis=1)
+        order = np.argsort(-estimates)
+        result = [(found[i], float(estimates[i])) for i in order if estimates[i] >= min_similarity]
+        return result[:limit] if limit else result
+
+    def candidate_pairs(self) -> Iterator[tuple[str, str]]:
+        # Every pair sharing at least one bucket, for catalog wide "well matched pairs" reports
+        self._compact() # Merges the delta so every bucket is a sorted run
+        seen: set[tuple[str, str]] = set()
+
+        for band in range(self.bands):
+            keys = self._sorted_keys[band]
+            boundaries = np.flatnonzero(np.diff(keys)) + 1
+            for run in np.split(self._sorted_rows[band], boundaries):
+                if len(run) < 2:
+                    continue
+                members = sorted(self._hashes[run].tolist())
+                for i, first in enumerate(members):
+                    for second in members[i + 1:]:
+                        if (first, second) not in seen:
+                            seen.add((first, second))
+                            yield first, second
+
+
+    # ***
+    # Persistence
+    # ***
+
+    def _compact(self) -> None:
+        if not self._removed and not self._delta_signatures:
+            return
+
+        keep = [h for h in self._hashes.tolist() if h not in self._removed and h not in self._delta_signatures]
+        keep_rows = np.array([self._row_of[h] for h in keep], dtype=np.int64)
+
+        hashes = keep + list(self._delta_signatures)
+        signatures = np.concatenate([
+            self._signatures[keep_rows] if len(keep_rows) else np.zeros((0, self.num_perm), dtype=np.uint32),
+            np.array(list(self._delta_signatures.values()), dtype=np.uint32).reshape(-1, self.num_perm)
+        ])
+        self._set_arrays(np.array(hashes, dtype=str), signatures)
+
+        self._removed.clear()
+        self._delta_signatures.clear()
+        self._delta_buckets = [{} for _ in range(self.bands)]
+
+    def _set_arrays(self, hashes: np.ndarray, signatures: np.ndarray) -> None:
+        self._hashes = hashes
+        self._row_of = {h: i for i, h in enumerate(hashes)}
+        self._signatures = signatures
+
+        keys = self._band_keys(signatures).T # (bands, n)
+        self._sorted_rows = np.argsort(keys, axis=1, kind='stable')
+        self._sorted_keys = np.take_along_axis(keys, self._sorted_rows, axis=1)
+
+    def save(self, write_seq: int | None = None) -> None:
+        # write_seq is what the index covers now, only pass it after the db was flushed
+        changed_seq = write_seq is not None and write_seq != self.write_seq
+        if write_seq is not None:
+            self.write_seq = write_seq
+        if not self._removed and not self._delta_signatures and not changed_seq and os.path.exists(self.path):
+            return # Nothing changed since the last save
+
+        self._compact()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Written next to the target and renamed, a crash never leaves half an index
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, hashes=self._hashes, signatures=self._signatures,
+                 params=np.array([self.num_perm, self.bands]), write_seq=np.array(self.write_seq))
+        os.replace(tmp_path, self.path)
+        logging.info(f"Saved tag index with {len(self._hashes)} games to {self.path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'TagLSHIndex':
+        if not os.path.exists(path):
+            return cls(path)
+
+        with np.load(path) as data:
+            num_perm, bands = (int(v) for v in data['params'])
+            index = cls(path, num_perm=num_perm, bands=bands)
+            index._set_arrays(data['hashes'], data['signatures'])
+            if 'write_seq' in data: # Files from before write_seq are synced in full once
+                index.write_seq = int(data['write_seq'])
+
+        logging.info(f"Loaded tag index with {len(index)} games from {path}")
+        return index
+
+    @classmethod
+    def load_or_build(cls, db_manager: DatabaseManager, path: str | None = None) -> 'TagLSHIndex':
+        # Only games written after the saved write_seq are hashed again, a fresh db builds it all once
+        index = cls.load(path or index_path(db_manager.db_path))
+        write_seq = db_manager.get_write_seq()
+
+        synced = 0
+        for game_hash, tags in db_manager.iter_game_tags_since(index.write_seq):
+            index.update(game_hash, tags)
+            synced += 1
+
+        # Rows gone from the db, e.g. rekeyed by a migration. Only then the full hash list is read
+        stale: list[str] = []
+        if db_manager.count_tagged_games() != len(index):
+            known_hashes = db_manager.get_all_game_hashes()
+            stale = [h for h in index._hashes.tolist() + list(index._delta_signatures) if h not in known_hashes]
+            for game_hash in stale:
+                index.remove(game_hash)
+
+        index.write_seq = write_seq
+        if synced or stale:
+            logging.info(f"Tag index synced with database: {synced} updated, {len(stale)} removed")
+        return index
@@ -4,6 +4,7 @@ from datetime import datetime
 from re import Match
 from enum import Enum
 
+import funday_bundle.constants as const
 
 
 # Enums
@@ -12,6 +13,11 @@ class UrlType(Enum):
     BUNDLE_PAGE = 2
     GAME_BUNDLE_PAGE = 3
 
+class HistoryMetric(Enum):
+    PRICE = 1
+    OVERALL_RATING = 2
+    OVERALL_COUNT = 3
+
 class ReturnInfo(Enum):
     FOUND_IN_CACHE = 1
     SCRAPED_SCUCCESFULLY = 2
@@ -30,7 +36,14 @@ def extract_steam_id(url: (str | int)) -> str | None:
     return ""
 
 
-def get_url_by_id(steam_id: (str | int), url_type: UrlType) -> str | None:
+def get_url_type(url: str) -> UrlType | None:
+    match: (Match[str] | None) = re.search(r'/(app|bundle|bundlelist)/\d+', str(url))
+    if not match:
+        return None
+    return {"app": UrlType.GAME_PAGE, "bundle": UrlType.BUNDLE_PAGE, "bundlelist": UrlType.GAME_BUNDLE_PAGE}[match.group(1)]
+
+
+def get_url_by_id(steam_id: (str | int), url_type: UrlType, base_url: str = const.STORE_BASE_URL) -> str | None:
     cleaned_id = extract_steam_id(steam_id)
     
     if not cleaned_id:
@@ -38,13 +51,13 @@ def get_url_by_id(steam_id: (str | int), url_type: UrlType) -> str | None:
     
     match url_type:
         case UrlType.GAME_PAGE:
-            url_for_page = f"https://store.steampowered.com/app/{cleaned_id}/"
+            url_for_page = f"{base_url}/app/{cleaned_id}/"
             
         case UrlType.BUNDLE_PAGE:
-            url_for_page = f"https://store.steampowered.com/bundle/{cleaned_id}"
+            url_for_page = f"{base_url}/bundle/{cleaned_id}"
             
         case UrlType.GAME_BUNDLE_PAGE:
-            url_for_page = f"https://store.steampowered.com/bundlelist/{cleaned_id}/"
+            url_for_page = f"{base_url}/bundlelist/{cleaned_id}/"
             
         case _:
             return ""
@@ -76,15 +89,20 @@ def parse_ratings(raw_rating: str) -> tuple[int, float] | None:
         return count, percentage
     return None
 
+DATE_FORMATS = ("%d %b, %Y", "%b %d, %Y", "%d %B, %Y", "%B %d, %Y", "%b %Y", "%B %Y") # Steam varies by region
+
+
 def get_time_from_str(date_str: str) -> datetime | None:
-    try:
-        clean_date_string = date_str.split('\n')[-1]
-        date_object = datetime.strptime(clean_date_string, "%d %b, %Y")
-        
-        return date_object
-    except Exception as e:
-        logging.error(f"Error getting date from {str}: {e}")
-        return None
+    clean_date_string = date_str.split('\n')[-1].strip()
+    
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(clean_date_string, date_format)
+        except ValueError:
+            continue
+    
+    logging.error(f"Error getting date from {date_str}")
+    return None
 
 
 def get_hash_from_url(url: str, hash_lenght=16) -> str:
@@ -92,6 +110,11 @@ def get_hash_from_url(url: str, hash_lenght=16) -> str:
     return hash_object.hexdigest()[:hash_lenght]
 
 
+def get_hash_by_id(steam_id: (str | int), url_type: UrlType) -> str:
+    # Hash of the canonical url, so any link form of the same page gets the same key
+    return get_hash_from_url(get_url_by_id(steam_id, url_type))
+
+
 def print_scraping_error(url: (str | int)) -> ReturnInfo:
     logging.error(f"Error scraping {url}")
     return ReturnInfo.FAILED
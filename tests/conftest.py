@@ -0,0 +1,28 @@
+# Shared fixtures: every test runs in its own scraped_data/ and pages come from
+# the benchmarks stand-in server, so nothing here touches the real store.
+import os
+
+import pytest
+
+from benchmarks.server import StandInServer
+from funday_bundle.data_structures import CachedCollection
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("scraped_data")
+    return tmp_path
+
+
+@pytest.fixture(scope="session")
+def server():
+    with StandInServer() as server:
+        yield server
+
+
+@pytest.fixture
+def collection():
+    collection = CachedCollection(use_tag_index=False, use_bundle_graph=False)
+    yield collection
+    collection.close_connections()
@@ -0,0 +1,95 @@
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+
+from funday_bundle.data_structures import BundleCache, GameCache
+from funday_bundle.db_manager import DatabaseManager
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager("scraped_data/aggregates.db")
+    yield db
+    db.close_connection()
+
+
+def _game(steam_id: int, tags: list[str], price: float = 10.0, rating: float = 0.8) -> GameCache:
+    return GameCache(f"g{steam_id}", steam_id, f"game {steam_id}", price, rating, 100, tags, datetime(2020, 1, 1), datetime(2024, 1, 1))
+
+
+def _bundle(steam_id: int, games: list[GameCache], discount: float) -> BundleCache:
+    return BundleCache(f"b{steam_id}", str(steam_id), f"bundle {steam_id}", discount, 20.0, [], [game.hash for game in games])
+
+
+def _bundle_stats(db: DatabaseManager) -> dict[str, tuple[int, float]]:
+    return {tag: (count, pytest.approx(discount)) for tag, count, discount in db.get_bundle_tag_discounts()}
+
+
+def _all_stats(db: DatabaseManager) -> tuple:
+    # Rounded, sums built in a different order differ in the last bits
+    tag_stats = {tag: (count, round(rating, 9), round(price, 9)) for tag, count, rating, price in db.get_tag_stats()}
+    bundle_stats = {tag: (count, round(discount, 9)) for tag, count, discount in db.get_bundle_tag_discounts()}
+    return tag_stats, db.get_price_bands(), bundle_stats
+
+
+def test_game_deltas(db):
+    db.add_games([_game(1, ["indie", "rpg"], price=4.0, rating=0.5), _game(2, ["indie"], price=12.0, rating=0.9)])
+    stats = {tag: rest for tag, *rest in db.get_tag_stats()}
+    assert stats["indie"] == [2, pytest.approx(0.7), pytest.approx(8.0)]
+    assert stats["rpg"] == [1, pytest.approx(0.5), pytest.approx(4.0)]
+
+    # A replaced game moves out of its old tag and price band
+    db.add_games([_game(1, ["rpg", "puzzle"], price=25.0, rating=0.5)])
+    stats = {tag: rest for tag, *rest in db.get_tag_stats()}
+    assert stats["indie"][0] == 1 and stats["puzzle"][0] == 1
+    assert {low: count for low, _, count in db.get_price_bands()} == {0: 0, 5: 0, 10: 1, 20: 1, 30: 0, 50: 0}
+
+
+def test_bundle_tags_come_from_games(db):
+    games = [_game(1, ["indie", "rpg"]), _game(2, ["indie", "puzzle"]), _game(3, ["action"])]
+    db.add_games(games)
+    db.add_bundles([_bundle(7, games[:2], 0.2), _bundle(8, games[1:], 0.5)])
+    assert _bundle_stats(db) == {"indie": (2, 0.35), "rpg": (1, 0.2), "puzzle": (2, 0.35), "action": (1, 0.5)}
+
+    # Replacing a bundle takes its old discount out
+    db.add_bundles([_bundle(7, games[:2], 0.4)])
+    assert _bundle_stats(db) == {"indie": (2, 0.45), "rpg": (1, 0.4), "puzzle": (2, 0.45), "action": (1, 0.5)}
+
+    # A member game's new tags move every bundle it is in
+    db.add_games([replace(games[2], tags=["action", "rpg"])])
+    assert _bundle_stats(db)["rpg"] == (2, 0.45)
+
+    # So do games stored after the bundle and links added on their own
+    db.add_games([_game(4, ["horror"])])
+    db.add_bundle_contents([("g4", "b7")])
+    assert _bundle_stats(db)["horror"] == (1, 0.4)
+    assert db.get_bundle("b7").tags == [] # Never on the bundle itself
+
+
+def test_rebuild_matches_incremental(db):
+    games = [_game(i, [f"tag {i % 3}", f"tag {i % 5}"], price=i * 3.0, rating=i / 20) for i in range(1, 15)]
+    db.add_games(games[:10])
+    db.add_bundles([_bundle(b, games[b:b + 4], b / 10) for b in range(1, 6)])
+    db.add_games(games[10:] + [replace(games[2], tags=["tag 4"])])
+    incremental = _all_stats(db)
+    assert incremental[2]
+
+    db.rebuild_aggregates()
+    assert _all_stats(db) == incremental
+
+
+def test_migration_fills_bundle_tags(db):
+    games = [_game(1, ["indie"]), _game(2, ["rpg"])]
+    db.add_games(games)
+    db.add_bundles([_bundle(7, games, 0.25)])
+    with db.conn:
+        db.conn.execute("DELETE FROM bundle_tag_stats") # As left by version 5
+        db.conn.execute("PRAGMA user_version = 5")
+    db.close_connection()
+
+    reopened = DatabaseManager("scraped_data/aggregates.db")
+    try:
+        assert _bundle_stats(reopened) == {"indie": (1, 0.25), "rpg": (1, 0.25)}
+    finally:
+        reopened.close_connection()
@@ -0,0 +1,66 @@
+import threading
+
+from benchmarks.server import StandInServer
+from funday_bundle.async_scraping import AsyncSteamScraper
+from funday_bundle.utils import ReturnInfo
+
+
+def test_scrape_game_pages(server, collection):
+    scraper = AsyncSteamScraper(collection, concurrency=4, base_url=server.base_url)
+    app_ids = server.corpus.game_ids[:12]
+
+    counts = scraper.run_game_pages(app_ids + app_ids[:3] + [3]) # Repeats and an unknown app
+    assert counts[ReturnInfo.SCRAPED_SCUCCESFULLY] == 12
+    assert counts[ReturnInfo.FOUND_IN_CACHE] == 3
+    assert counts[ReturnInfo.FAILED] == 1
+    assert all(collection.is_known_game(app_id) for app_id in app_ids)
+    assert not collection.in_flight_ids
+
+    # Nothing is fetched again on the second run
+    before = server.requests
+    counts = scraper.run_game_pages(app_ids)
+    assert counts[ReturnInfo.FOUND_IN_CACHE] == 12
+    assert server.requests == before
+
+
+def test_scrape_bundle_pages(server, collection):
+    scraper = AsyncSteamScraper(collection, concurrency=4, base_url=server.base_url)
+    bundle_ids = server.corpus.bundle_ids[:5]
+
+    counts = scraper.run_bundle_pages(bundle_ids + [str(bundle_ids[0])])
+    assert counts[ReturnInfo.SCRAPED_SCUCCESFULLY] == 5
+    assert all(collection.is_known_bundle(bundle_id) for bundle_id in bundle_ids)
+    assert scraper.run_bundle_pages(bundle_ids)[ReturnInfo.FOUND_IN_CACHE] == 5
+
+
+def test_failed_fetches_release_claims(collection):
+    with StandInServer(error_rate=1.0) as failing:
+        scraper = AsyncSteamScraper(collection, concurrency=4, base_url=failing.base_url)
+        counts = scraper.run_game_pages(failing.corpus.game_ids[:8])
+
+    assert counts[ReturnInfo.FAILED] == 8
+    assert not collection.in_flight_ids
+    assert not any(collection.is_known_game(app_id) for app_id in failing.corpus.game_ids[:8])
+
+
+def test_concurrency_is_bounded(collection):
+    with StandInServer(latency=0.02) as slow:
+        scraper = AsyncSteamScraper(collection, concurrency=3, base_url=slow.base_url)
+        fetch = scraper._fetch_and_parse_blocking
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def counting_fetch(*args):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            try:
+                return fetch(*args)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        scraper._fetch_and_parse_blocking = counting_fetch
+        counts = scraper.run_game_pages(slow.corpus.game_ids[:15])
+
+    assert counts[ReturnInfo.SCRAPED_SCUCCESFULLY] == 15
+    assert 1 < peak[0] <= 3
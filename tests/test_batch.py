@@ -0,0 +1,98 @@
+import gzip
+import logging
+from datetime import datetime
+
+import funday_bundle.constants as const
+from funday_bundle.batch import BatchProgress, iter_new_ids, run_batch
+from funday_bundle.data_structures import GameCache
+from funday_bundle.frontier import FrontierState
+from funday_bundle.funday_bundle import FundayBundle
+from funday_bundle.main import parse_args
+from funday_bundle.utils import UrlType
+
+
+class _RecordingApp:
+    # Stands in for FundayBundle, keeps the chunks instead of scraping them
+    pipeline = None
+    
+    def __init__(self, cache_collection):
+        self.cache_collection = cache_collection
+        self.chunks: list[tuple[list[int], UrlType]] = []
+    
+    def scrape_ids(self, steam_ids, url_type):
+        self.chunks.append((list(steam_ids), url_type))
+
+
+def _known_game(collection, steam_id: int) -> None:
+    collection.add_games([GameCache(f"g{steam_id}", steam_id, "known", 1.0, 0.5, 1, [], None, datetime(2024, 1, 1))])
+
+
+def test_parse_batch_args():
+    args = parse_args(["--workers", "3", "batch", "a.txt", "b.csv.gz", "--bundles", "--chunk-size", "7"])
+    assert args.command == "batch" and args.workers == 3
+    assert args.paths == ["a.txt", "b.csv.gz"] and args.bundles and args.chunk_size == 7
+    
+    args = parse_args(["batch"])
+    assert args.paths == ["-"] and not args.bundles and args.chunk_size == const.BATCH_CHUNK_SIZE
+    assert parse_args([]).command is None
+
+
+def test_new_ids_counts(collection):
+    _known_game(collection, 30)
+    progress = BatchProgress(None)
+    steam_ids = ["10", "20", "10", "30", str(const.BATCH_MAX_ID + 1), "20", "40"]
+    
+    assert list(iter_new_ids(steam_ids, collection, UrlType.GAME_PAGE, progress)) == [10, 20, 40]
+    assert (progress.ids_read, progress.duplicates, progress.known, progress.invalid) == (7, 2, 1, 1)
+    
+    # Bundle ids are checked against the known bundles, game 30 is new there
+    assert list(iter_new_ids(["30"], collection, UrlType.BUNDLE_PAGE, BatchProgress(None))) == [30]
+
+
+def test_run_batch_chunks_and_reports(collection, capsys):
+    _known_game(collection, 50)
+    with open("ids.txt", "w") as f:
+        f.write("https://store.steampowered.com/app/10/x/\n20\nnot an id\n50\n")
+    with gzip.open("ids.csv.gz", "wt") as f:
+        f.write("id,name\n30,a\n20,b\n40,c\n60,d\n")
+    
+    app = _RecordingApp(collection)
+    progress = run_batch(app, ["ids.txt", "ids.csv.gz"], UrlType.GAME_PAGE, chunk_size=2)
+    
+    assert app.chunks == [([10, 20], UrlType.GAME_PAGE), ([30, 40], UrlType.GAME_PAGE), ([60], UrlType.GAME_PAGE)]
+    assert (progress.dispatched, progress.known, progress.duplicates) == (5, 1, 1)
+    assert progress.total_bytes is None # Unknown size of gzip input, no ETA
+    assert "new 5 | known 1 | duplicate 1" in capsys.readouterr().err
+
+
+def test_progress_has_eta_for_plain_files(collection, capsys):
+    with open("ids.txt", "w") as f:
+        f.write("10\n20\n")
+    progress = run_batch(_RecordingApp(collection), ["ids.txt"])
+    assert progress.total_bytes == progress.read_bytes == 6
+    assert "100.0% | ETA 0:00:00" in capsys.readouterr().err
+
+
+def test_batch_through_pipeline(server, caplog):
+    app_ids = server.corpus.game_ids[:12]
+    with open("ids.txt", "w") as f:
+        f.write("\n".join(str(app_id) for app_id in app_ids + app_ids[:4]) + "\n")
+
+    app = FundayBundle(workers=2, archive_pages=False, use_pipeline=True, base_url=server.base_url)
+    try:
+        with caplog.at_level(logging.INFO):
+            progress = run_batch(app, ["ids.txt"], chunk_size=5)
+
+        assert progress.dispatched == 12 and progress.duplicates == 4
+        assert all(app.cache_collection.is_known_game(app_id) for app_id in app_ids)
+
+        # Batch ids never went through the frontier, so it has nothing to say about them
+        assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+        assert app.frontier.counts() == {}
+
+        # Frontier crawls on the same pipeline still report back
+        app.frontier.add(server.corpus.game_ids[12:20])
+        app.crawl_frontier()
+        assert app.frontier.counts() == {FrontierState.DONE.value: 8}
+    finally:
+        app.end_program()
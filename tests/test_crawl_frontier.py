@@ -0,0 +1,34 @@
+import time
+
+from funday_bundle.frontier import FrontierState
+from funday_bundle.funday_bundle import FundayBundle
+
+
+def test_crawl_leaves_retries_in_the_table(server):
+    app = FundayBundle(workers=2, archive_pages=False, use_pipeline=True, base_url=server.base_url)
+    try:
+        app.frontier.backoff_base = 60
+        app.frontier.add(server.corpus.game_ids[:4] + [3]) # 3 is not in the corpus
+
+        start = time.monotonic()
+        app.crawl_frontier()
+        assert time.monotonic() - start < 30 # Not the backoff of the failed url
+
+        counts = app.frontier.counts()
+        assert counts == {FrontierState.DONE.value: 4, FrontierState.PENDING.value: 1}
+        assert 40 < app.frontier.seconds_until_next() <= 72
+    finally:
+        app.end_program()
+
+
+def test_crawl_can_wait_for_retries(server):
+    app = FundayBundle(workers=2, archive_pages=False, use_pipeline=True, base_url=server.base_url)
+    try:
+        app.frontier.backoff_base = 0.1
+        app.frontier.max_attempts = 2
+        app.frontier.add([3])
+
+        app.crawl_frontier(wait_for_retries=True)
+        assert app.frontier.counts() == {FrontierState.FAILED.value: 1}
+    finally:
+        app.end_program()
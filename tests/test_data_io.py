@@ -0,0 +1,94 @@
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from funday_bundle.data_io import export_csv, export_jsonl, import_ids_to_frontier, import_table, iter_ids, iter_pieces, iter_records
+from funday_bundle.data_structures import BundleCache, CachedCollection, GameCache
+from funday_bundle.frontier import Frontier
+
+
+_APP_LIST = json.dumps({"applist": {"apps": [{"appid": 10 * i, "name": f"app {i}"} for i in range(1, 40)]}})
+_MIXED = (
+    "https://store.steampowered.com/app/730/Counter_Strike/\n"
+    "not an id\n"
+    "570,Dota 2,free\n"
+    + _APP_LIST + "\n"
+    "https://store.steampowered.com/bundle/232/\n"
+    "  440\n"
+    "12345" # No newline at the end
+)
+_MIXED_IDS = ["730", "570", *(str(10 * i) for i in range(1, 40)), "232", "440", "12345"]
+
+
+def _ids(text: str, size: int) -> list[str]:
+    return list(iter_ids(iter_pieces(io.StringIO(text), size)))
+
+
+def test_ids_from_whole_lines():
+    assert list(iter_ids(io.StringIO(_MIXED))) == _MIXED_IDS
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 63, 64, 65, 100, 1000])
+def test_ids_across_piece_cuts(size):
+    # Any piece size must find the same ids, matches cut in two included
+    assert _ids(_MIXED, size) == _MIXED_IDS
+
+
+def test_json_only_dump_in_pieces():
+    # GetAppList dumps are one line without a trailing newline
+    assert _ids(_APP_LIST, 5) == [str(10 * i) for i in range(1, 40)]
+
+
+def _fill(collection: CachedCollection) -> None:
+    games = [GameCache(f"g{i}", i, f"game, \"{i}\"", 10.0 + i, 0.8, 100, ["indie", "rpg"], datetime(2020, 1, 1), datetime(2024, 1, i))
+             for i in range(1, 8)]
+    collection.add_games(games)
+    collection.add_bundles([BundleCache("b1", "7", "bundle", 0.3, 40.0, [], ["g1", "g2"])])
+    collection.add_bundle_contents([("g1", "b1"), ("g2", "b1")])
+
+
+@pytest.mark.parametrize("path", ["scraped_data/games.csv", "scraped_data/games.jsonl", "scraped_data/games.csv.gz"])
+def test_export_import_roundtrip(collection, path):
+    _fill(collection)
+    export = export_jsonl if ".jsonl" in path else export_csv
+    assert export(collection.db_manager, "games", path, chunk_size=3) == 7
+    assert len(list(iter_records(path))) == 7
+    
+    other = CachedCollection(db_path="scraped_data/other.db", use_tag_index=False, use_bundle_graph=False)
+    try:
+        assert import_table(other, "games", path, chunk_size=3) == 7
+        original = collection.get_games(f"g{i}" for i in range(1, 8))
+        assert other.get_games(f"g{i}" for i in range(1, 8)) == original
+    finally:
+        other.close_connections()
+
+
+def test_import_bundles_and_contents(collection):
+    _fill(collection)
+    export_csv(collection.db_manager, "bundles", "scraped_data/bundles.csv")
+    export_jsonl(collection.db_manager, "bundle_contents", "scraped_data/contents.jsonl")
+    
+    other = CachedCollection(db_path="scraped_data/other.db", use_tag_index=False, use_bundle_graph=False)
+    try:
+        assert import_table(other, "bundles", "scraped_data/bundles.csv") == 1
+        assert import_table(other, "bundle_contents", "scraped_data/contents.jsonl") == 2
+        assert other.get_bundles(["b1"])["b1"].games_in_bundle == ["g1", "g2"]
+        assert sorted(other.db_manager.iter_bundle_contents()) == [("g1", "b1"), ("g2", "b1")]
+    finally:
+        other.close_connections()
+
+
+def test_bad_records_are_skipped(collection):
+    with open("scraped_data/games.jsonl", "w") as f:
+        f.write(json.dumps({"hash": "g1", "steam_id": "not a number"}) + "\n")
+    assert import_table(collection, "games", "scraped_data/games.jsonl") == 0
+
+
+def test_ids_to_frontier(collection):
+    with open("scraped_data/ids.txt", "w") as f:
+        f.write(_MIXED)
+    frontier = Frontier(collection.db_manager)
+    assert import_ids_to_frontier(frontier, "scraped_data/ids.txt", chunk_size=4) == len(_MIXED_IDS)
+    assert import_ids_to_frontier(frontier, "scraped_data/ids.txt") == 0 # Known urls keep their state
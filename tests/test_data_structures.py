@@ -0,0 +1,69 @@
+import threading
+
+from benchmarks.corpus import synthetic_games
+from funday_bundle.data_structures import BundleCache, LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1 # b is now the oldest
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_lru_shared_by_threads():
+    cache = LRUCache(max_size=50)
+    errors = []
+
+    def hammer(offset: int):
+        try:
+            for i in range(20_000):
+                key = str((i * 7 + offset) % 200)
+                if cache.get(key) is None:
+                    cache.put(key, i)
+                if i % 11 == 0:
+                    cache.discard(key)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=hammer, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(cache) <= 50
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 8 * 20_000
+
+
+def test_collection_reads_through_the_cache(collection):
+    games = synthetic_games(5, start=10)
+    assert collection.add_games(games)
+    collection.game_cache = LRUCache(max_size=10) # Cold cache, the rows come from the db
+
+    found = collection.get_games([game.hash for game in games] + ["missing"])
+    assert set(found) == {game.hash for game in games}
+    assert collection.game_cache.stats()["misses"] == 6
+
+    collection.get_games([game.hash for game in games])
+    assert collection.game_cache.stats()["hits"] == 5
+
+
+def test_known_ids_follow_writes(collection):
+    games = synthetic_games(3, start=10)
+    collection.add_games(games)
+    collection.add_bundles([BundleCache("b7", "7", "bundle 7", 0.1, 10.0, [], [game.hash for game in games])])
+    collection.add_bundle(BundleCache("b8", "8", "bundle 8", 0.1, 10.0, [], [games[0].hash]))
+
+    assert all(collection.is_known_game(game.steam_id) for game in games)
+    assert collection.is_known_bundle(7) and collection.is_known_bundle("8")
+    assert not collection.is_known_bundle(9)
+    assert collection.claim_game(99) and not collection.claim_game(99)
+    assert not collection.claim_game(games[0].steam_id)
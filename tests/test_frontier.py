@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from benchmarks.corpus import synthetic_games
+from funday_bundle.db_manager import DatabaseManager
+from funday_bundle.frontier import Frontier, FrontierState
+from funday_bundle.utils import ReturnInfo
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager("scraped_data/frontier.db", batch_size=100)
+    yield db
+    db.close_connection()
+
+
+def _row(db: DatabaseManager, steam_id: int):
+    return db.conn.execute("SELECT * FROM frontier WHERE steam_id = ?", (str(steam_id),)).fetchone()
+
+
+def test_claim_holds_a_lease(db):
+    frontier = Frontier(db, lease=60)
+    assert frontier.add([10, 20, 30, 10]) == 3
+    assert frontier.add([10]) == 0
+
+    items = frontier.claim(2)
+    assert len(items) == 2 and all(item.attempts == 1 for item in items)
+    assert [item.steam_id for item in frontier.claim(10)] == ["30"]
+    assert frontier.claim(10) == [] # Leased, not handed out twice
+
+
+def test_expired_lease_is_claimed_again(db):
+    # A crashed run never records its items, the next one gets them after the lease
+    Frontier(db, lease=0).add([10, 20])
+    assert len(Frontier(db, lease=0).claim(10)) == 2
+
+    items = Frontier(db, lease=60).claim(10)
+    assert sorted(item.steam_id for item in items) == ["10", "20"]
+    assert all(item.attempts == 2 for item in items)
+
+
+def test_two_frontiers_never_share_items(db):
+    other = DatabaseManager("scraped_data/frontier.db")
+    try:
+        first, second = Frontier(db), Frontier(other)
+        first.add(range(10, 210, 10))
+        claimed = [item.steam_id for item in first.claim(12)] + [item.steam_id for item in second.claim(12)]
+    finally:
+        other.close_connection()
+    assert len(claimed) == len(set(claimed)) == 20
+
+
+def test_failure_backs_off_until_max_attempts(db):
+    frontier = Frontier(db, max_attempts=2, backoff_base=30, backoff_max=60, lease=0)
+    frontier.add([10])
+
+    frontier.claim(1)
+    frontier.record(10, ReturnInfo.FAILED, "timeout")
+    assert frontier.checkpoint()
+
+    row = _row(db, 10)
+    assert row["state"] == FrontierState.PENDING.value and row["last_error"] == "timeout"
+    assert 30 * 0.8 - 1 <= row["next_eligible"] - time.time() <= 30 * 1.2
+    assert frontier.claim(1) == []
+    assert frontier.seconds_until_next() > 20
+
+    # Out of attempts on the second failure
+    db.conn.execute("UPDATE frontier SET next_eligible = 0")
+    frontier.claim(1)
+    frontier.record(10, ReturnInfo.FAILED)
+    frontier.checkpoint()
+    assert _row(db, 10)["state"] == FrontierState.FAILED.value
+    assert frontier.seconds_until_next() is None
+
+    assert frontier.retry_failed() == 1
+    assert [item.attempts for item in frontier.claim(1)] == [1]
+
+
+def test_checkpoint_flushes_rows_before_done(db):
+    frontier = Frontier(db)
+    game = synthetic_games(1, start=10)[0]
+    frontier.add([game.steam_id])
+    frontier.claim(1)
+
+    db.add_games([game]) # Buffered, batch_size is 100
+    frontier.record(game.steam_id, ReturnInfo.SCRAPED_SCUCCESFULLY)
+    assert _row(db, game.steam_id)["state"] == FrontierState.IN_PROGRESS.value
+
+    assert frontier.checkpoint()
+    assert _row(db, game.steam_id)["state"] == FrontierState.DONE.value
+    assert db.conn.execute("SELECT COUNT(*) FROM games WHERE hash = ?", (game.hash,)).fetchone()[0] == 1
+
+
+def test_failed_flush_sets_done_back_to_pending(db, monkeypatch):
+    frontier = Frontier(db, backoff_base=30)
+    frontier.add([10, 20])
+    frontier.claim(2)
+    frontier.record(10, ReturnInfo.SCRAPED_SCUCCESFULLY)
+
+    monkeypatch.setattr(db, "flush", lambda: False)
+    assert not frontier.checkpoint()
+    row = _row(db, 10)
+    assert row["state"] == FrontierState.PENDING.value and row["last_error"] == "db flush failed"
+    assert row["next_eligible"] > time.time() + 20
+
+    # Still written by the next good checkpoint, never as done
+    monkeypatch.undo()
+    assert frontier.checkpoint()
+    assert _row(db, 10)["state"] == FrontierState.PENDING.value
+    assert not frontier._pending_results
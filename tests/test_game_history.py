@@ -0,0 +1,74 @@
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+
+from funday_bundle.data_structures import GameCache
+from funday_bundle.db_manager import DatabaseManager
+from funday_bundle.utils import HistoryMetric
+
+DB_PATH = "scraped_data/history.db"
+T1, T2, T3 = datetime(2024, 1, 1), datetime(2024, 2, 1), datetime(2024, 3, 1)
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager(DB_PATH)
+    yield db
+    db.close_connection()
+
+
+def _game(steam_id: int, price: float, scraped: datetime, count: int = 100) -> GameCache:
+    return GameCache(f"g{steam_id}", steam_id, f"game {steam_id}", price, 0.8, count, ["indie"], datetime(2020, 1, 1), scraped)
+
+
+def test_only_changes_are_stored(db):
+    db.add_games([_game(1, 10.0, T1)])
+    db.add_games([_game(1, 10.0, T2, count=150)])
+    db.add_games([_game(1, 12.0, T3, count=150)])
+    
+    assert db.get_history("g1", HistoryMetric.PRICE) == [(T1, 10.0), (T3, 12.0)]
+    assert db.get_history("g1", HistoryMetric.OVERALL_COUNT) == [(T1, 100), (T2, 150)]
+    assert db.get_history("g1", HistoryMetric.OVERALL_RATING) == [(T1, 0.8)]
+
+
+def test_value_at(db):
+    db.add_games([_game(1, 10.0, T1), _game(2, 5.0, T2)])
+    db.add_games([_game(1, 12.0, T3)])
+    
+    assert db.get_value_at("g1", HistoryMetric.PRICE, datetime(2023, 12, 1)) is None
+    assert db.get_value_at("g1", HistoryMetric.PRICE, T2) == 10.0
+    assert db.get_value_at("g1", HistoryMetric.PRICE, T3) == 12.0
+    # Games without a point by then are left out
+    assert db.get_values_at(["g1", "g2", "g9"], HistoryMetric.PRICE, datetime(2024, 1, 15)) == {"g1": 10.0}
+    assert db.get_values_at(["g1", "g2"], HistoryMetric.PRICE, T3) == {"g1": 12.0, "g2": 5.0}
+
+
+def test_histories_in_a_window(db):
+    db.add_games([_game(1, 10.0, T1), _game(2, 5.0, T1)])
+    db.add_games([_game(1, 12.0, T2), _game(2, 6.0, T3)])
+    start, end = datetime(2024, 1, 15), datetime(2024, 2, 15)
+    
+    # Each starts with the value in effect at start, points after end are left out
+    assert db.get_histories(["g1", "g2", "g9"], HistoryMetric.PRICE, start, end) == {
+        "g1": [(start, 10.0), (T2, 12.0)],
+        "g2": [(start, 5.0)],
+    }
+    assert db.get_history("g2", HistoryMetric.PRICE, end=T2) == [(T1, 5.0)]
+
+
+def test_migration_seeds_history(db):
+    # Databases from before game_history get the stored values as the first point
+    db.add_games([_game(1, 10.0, T1), replace(_game(2, 5.0, T2), price=None)])
+    with db.conn:
+        db.conn.execute("DELETE FROM game_history")
+        db.conn.execute("PRAGMA user_version = 2")
+    db.close_connection()
+    
+    reopened = DatabaseManager(DB_PATH)
+    try:
+        assert reopened.get_history("g1", HistoryMetric.PRICE) == [(T1, 10.0)]
+        assert reopened.get_history("g2", HistoryMetric.PRICE) == []
+        assert reopened.get_history("g2", HistoryMetric.OVERALL_COUNT) == [(T2, 100)]
+    finally:
+        reopened.close_connection()
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+
+import funday_bundle.utils as util
+from funday_bundle.data_structures import GameCache
+from funday_bundle.db_manager import DatabaseManager
+from funday_bundle.utils import UrlType
+
+DB_PATH = "scraped_data/game_tags.db"
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager(DB_PATH)
+    yield db
+    db.close_connection()
+
+
+def _hash(steam_id: int) -> str:
+    return util.get_hash_by_id(steam_id, UrlType.GAME_PAGE)
+
+
+def _game(steam_id: int, tags: list[str]) -> GameCache:
+    return GameCache(_hash(steam_id), steam_id, f"game {steam_id}", 10.0, 0.8, 100, tags, datetime(2020, 1, 1), datetime(2024, 1, 1))
+
+
+def _fill(db: DatabaseManager) -> None:
+    db.add_games([_game(1, ["indie", "rpg", "puzzle"]), _game(2, ["indie", "rpg"]), _game(3, ["indie"]), _game(4, ["action"])])
+
+
+def test_games_by_tag(db):
+    _fill(db)
+    assert sorted(db.get_games_by_tag("indie")) == sorted(_hash(i) for i in (1, 2, 3))
+    assert db.get_games_by_tag(" RPG ") == db.get_games_by_tag("rpg") # Looked up as the parsers store them
+    assert db.get_games_by_tag("unknown") == []
+
+
+def test_tag_counts(db):
+    _fill(db)
+    counts = db.get_tag_counts()
+    assert counts[:2] == [("indie", 3), ("rpg", 2)] # Ties after that come in any order
+    assert dict(counts) == {"indie": 3, "rpg": 2, "puzzle": 1, "action": 1}
+    assert db.get_tag_counts(limit=1) == [("indie", 3)]
+
+
+def test_games_sharing_tags(db):
+    _fill(db)
+    assert db.get_games_sharing_tags(_hash(1)) == [(_hash(2), 2), (_hash(3), 1)]
+    assert db.get_games_sharing_tags(_hash(1), min_shared=2) == [(_hash(2), 2)]
+    assert db.get_games_sharing_tags(_hash(4)) == []
+
+
+def test_replaced_game_moves_tags(db):
+    _fill(db)
+    db.add_games([_game(3, ["action"])])
+    assert _hash(3) not in db.get_games_by_tag("indie")
+    assert sorted(db.get_games_by_tag("action")) == sorted([_hash(3), _hash(4)])
+    assert db.count_tagged_games() == 4
+
+
+def test_migration_fills_junction(db):
+    # Databases from before game_tags only have the json column
+    _fill(db)
+    with db.conn:
+        db.conn.execute("DELETE FROM game_tags")
+        db.conn.execute("PRAGMA user_version = 0")
+    db.close_connection()
+    
+    reopened = DatabaseManager(DB_PATH)
+    try:
+        assert reopened.count_tagged_games() == 4
+        assert sorted(reopened.get_games_by_tag("rpg")) == sorted([_hash(1), _hash(2)])
+        assert reopened.get_tag_counts(limit=1) == [("indie", 3)]
+    finally:
+        reopened.close_connection()
@@ -0,0 +1,52 @@
+import tracemalloc
+
+import numpy as np
+
+from funday_bundle.id_index import SteamIdBitmap
+
+
+def test_add_contains_discard():
+    bitmap = SteamIdBitmap([10, 20, 20])
+    bitmap.add("30")
+    bitmap.add(-1)
+
+    assert len(bitmap) == 3
+    assert 10 in bitmap and "20" in bitmap and 30 in bitmap
+    assert 11 not in bitmap and -1 not in bitmap and 10**9 not in bitmap
+
+    bitmap.discard(20)
+    bitmap.discard(21)
+    assert len(bitmap) == 2 and 20 not in bitmap
+
+
+def test_add_many_counts_only_new_ids():
+    bitmap = SteamIdBitmap(range(0, 1000, 2))
+    bitmap.add_many([1, 2, 3, 3, -5, 4_000_000])
+
+    assert len(bitmap) == 500 + 3
+    assert bitmap.to_array().tolist() == sorted(set(range(0, 1000, 2)) | {1, 3, 4_000_000})
+    assert bitmap.contains_many([0, 1, 5, -1, 4_000_000, 10**9]).tolist() == [True, True, False, False, True, False]
+
+
+def test_add_many_matches_python_set():
+    rng = np.random.default_rng(1)
+    ids = rng.integers(0, 3_000_000, size=20_000)
+    bitmap = SteamIdBitmap()
+    for chunk in np.array_split(ids, 7):
+        bitmap.add_many(chunk.tolist())
+
+    assert len(bitmap) == len(set(ids.tolist()))
+    assert np.array_equal(bitmap.to_array(), np.unique(ids))
+
+
+def test_add_many_does_not_allocate_by_max_id():
+    bitmap = SteamIdBitmap([5_000_000]) # About 600 KB of bits
+    tracemalloc.start()
+    try:
+        bitmap.add_many(range(4_000_000, 4_000_100))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(bitmap) == 101
+    assert peak < 64 * 1024
@@ -0,0 +1,35 @@
+from benchmarks.corpus import Corpus
+from funday_bundle.page_archive import PageArchive, replay
+
+
+def _archive(corpus: Corpus) -> PageArchive:
+    archive = PageArchive()
+    for app_id in corpus.game_ids:
+        archive.put(f"{corpus.base_url}/app/{app_id}/", corpus.game_page(app_id))
+    for bundle_id in corpus.bundle_ids:
+        archive.put(f"{corpus.base_url}/bundle/{bundle_id}/", corpus.bundle_page(bundle_id))
+    archive.flush()
+    return archive
+
+
+def test_replay_writes_archived_pages(collection):
+    corpus = Corpus(n_games=6, n_bundles=2)
+    archive = _archive(corpus)
+    counts = replay(archive, collection, workers=1)
+    archive.close()
+
+    assert counts == {"pages": 8, "games": 6, "bundles": 2, "failed": 0, "unwritten": 0, "skipped": 0}
+    assert all(app_id in collection.known_game_ids for app_id in corpus.game_ids)
+
+
+def test_replay_reports_rejected_writes(collection, monkeypatch):
+    # Rows the db refused are not counted as replayed
+    corpus = Corpus(n_games=6, n_bundles=2)
+    archive = _archive(corpus)
+    monkeypatch.setattr(collection.db_manager, "add_games", lambda games: False)
+    counts = replay(archive, collection, workers=1)
+    archive.close()
+
+    assert counts["games"] == 0 and counts["unwritten"] == 6
+    assert counts["bundles"] == 2
+    assert not any(app_id in collection.known_game_ids for app_id in corpus.game_ids)
@@ -0,0 +1,114 @@
+import os, signal, threading, time
+
+import pytest
+
+from benchmarks.server import StandInServer
+from funday_bundle.pipeline import Pipeline
+from funday_bundle.utils import ReturnInfo, UrlType
+
+
+def _pipeline(collection, base_url: str, **kwargs) -> tuple[Pipeline, list]:
+    results = []
+    pipeline = Pipeline(collection, fetchers=2, parsers=1, queue_size=4, write_batch=8, page_delay=(0, 0),
+                        base_url=base_url, on_result=lambda *result: results.append(result), **kwargs)
+    return pipeline, results
+
+
+def _stopped(pipeline: Pipeline) -> bool:
+    return pipeline._writer is None and pipeline._executor is None and not any(thread.is_alive() for thread in pipeline._threads)
+
+
+def test_close_drains_everything(server, collection):
+    pipeline, results = _pipeline(collection, server.base_url)
+    app_ids = server.corpus.game_ids[:30]
+    bundle_ids = server.corpus.bundle_ids[:5]
+
+    pipeline.start()
+    pipeline.submit(app_ids + app_ids[:5] + [3])
+    pipeline.submit(bundle_ids, UrlType.BUNDLE_PAGE)
+    pipeline.close()
+
+    outcomes = [return_info for _, return_info, _ in results]
+    assert len(results) == 41
+    assert outcomes.count(ReturnInfo.SCRAPED_SCUCCESFULLY) == 35
+    assert outcomes.count(ReturnInfo.FOUND_IN_CACHE) == 5
+    assert outcomes.count(ReturnInfo.FAILED) == 1 # The unknown app
+    assert all(collection.is_known_game(app_id) for app_id in app_ids)
+    assert all(collection.is_known_bundle(bundle_id) for bundle_id in bundle_ids)
+    assert not collection.in_flight_ids
+    assert _stopped(pipeline)
+
+
+def test_close_without_drain_drops_unfetched(collection):
+    with StandInServer(latency=0.05) as slow:
+        pipeline, results = _pipeline(collection, slow.base_url)
+        app_ids = slow.corpus.game_ids[:40]
+
+        pipeline.start()
+        submitter = threading.Thread(target=pipeline.submit, args=(app_ids,))
+        submitter.start()
+        time.sleep(0.2)
+        pipeline.close(drain=False)
+        submitter.join(timeout=10)
+
+    # Only attempted items are reported, everything reported as scraped is stored
+    scraped = [steam_id for steam_id, return_info, _ in results if return_info == ReturnInfo.SCRAPED_SCUCCESFULLY]
+    assert 0 < len(results) < len(app_ids)
+    assert all(collection.is_known_game(steam_id) for steam_id in scraped)
+    assert not collection.in_flight_ids
+    assert _stopped(pipeline)
+
+
+def test_parser_crash_gets_a_new_pool(server, collection):
+    pipeline, results = _pipeline(collection, server.base_url)
+    pipeline.start()
+    pipeline.submit(server.corpus.game_ids[:5])
+    pipeline.join()
+
+    for process in list(pipeline._executor._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+    time.sleep(0.5) # Lets the pool notice
+
+    pipeline.submit(server.corpus.game_ids[5:15])
+    pipeline.close()
+
+    # Pages fetched before the new pool may fail, none are lost and the rest are written
+    assert len(results) == 15
+    assert sum(1 for _, return_info, _ in results if return_info == ReturnInfo.SCRAPED_SCUCCESFULLY) >= 10
+    assert not collection.in_flight_ids
+    assert _stopped(pipeline)
+
+
+def test_failed_write_releases_claims(server, collection, monkeypatch):
+    def broken_add_games(self, games):
+        raise RuntimeError("db gone")
+    monkeypatch.setattr(type(collection), "add_games", broken_add_games)
+
+    pipeline, results = _pipeline(collection, server.base_url)
+    pipeline.start()
+    pipeline.submit(server.corpus.game_ids[:10])
+    pipeline.close()
+
+    assert [return_info for _, return_info, _ in results] == [ReturnInfo.FAILED] * 10
+    assert pipeline.stats()["write_failed"] == 10
+    assert not collection.in_flight_ids
+
+
+def test_dead_writer_does_not_hang(server, collection, monkeypatch):
+    monkeypatch.setattr(Pipeline, "_writer_loop", lambda self: time.sleep(0.5)) # Dies with work queued
+    pipeline, results = _pipeline(collection, server.base_url)
+    pipeline.start()
+
+    # More than both queues hold, submit is still blocked when the writer dies
+    with pytest.raises(RuntimeError):
+        pipeline.submit(server.corpus.game_ids[:20])
+
+    closer = threading.Thread(target=pipeline.close)
+    closer.start()
+    closer.join(timeout=15)
+    assert not closer.is_alive()
+
+    # Fetched pages fail, the rest was never claimed and is not reported
+    assert all(return_info == ReturnInfo.FAILED for _, return_info, _ in results)
+    assert not collection.in_flight_ids
+    assert _stopped(pipeline)
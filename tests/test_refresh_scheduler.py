@@ -0,0 +1,51 @@
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+import funday_bundle.static_scraping as static
+import funday_bundle.utils as util
+from benchmarks.corpus import synthetic_games
+from funday_bundle.funday_bundle import FundayBundle
+from funday_bundle.refresh_scheduler import RefreshScheduler
+from funday_bundle.utils import UrlType
+
+MAX_AGE = 30 * 24 * 3600
+
+
+def _aged(games, days: float, overall_count: int = 0):
+    moment = datetime.now() - timedelta(seconds=MAX_AGE, days=days)
+    return [replace(game, last_time_scraped=moment, overall_count=overall_count) for game in games]
+
+
+def test_ranks_every_stale_game(collection):
+    old = _aged(synthetic_games(50, start=1000), days=10)
+    popular = _aged(synthetic_games(1, start=2000), days=2, overall_count=1_000_000)
+    fresh = synthetic_games(5, start=3000) # Scraped now, never due
+    collection.add_games(old + popular + fresh)
+
+    # The popular game is younger than every old one, far outside a window of the oldest rows
+    batch = RefreshScheduler(collection, budget=5, max_age=MAX_AGE).select_batch()
+    assert batch[0] == 2000
+    assert len(batch) == 5 and set(batch[1:]) <= {game.steam_id for game in old}
+
+
+def test_older_games_rank_first_at_equal_reviews(collection):
+    collection.add_games(_aged(synthetic_games(1, start=10), days=1, overall_count=50)
+                         + _aged(synthetic_games(1, start=20), days=9, overall_count=50))
+    assert RefreshScheduler(collection, budget=5, max_age=MAX_AGE).select_batch() == [20, 10]
+
+
+def test_refresh_runs_on_the_pipeline(server):
+    app = FundayBundle(workers=2, archive_pages=False, use_pipeline=True, base_url=server.base_url)
+    try:
+        app_ids = server.corpus.game_ids[:6]
+        games = [static.parse_game_page(server.corpus.game_page(app_id), app_id, util.get_hash_by_id(app_id, UrlType.GAME_PAGE))
+                 for app_id in app_ids]
+        app.cache_collection.add_games(_aged(games, days=5))
+
+        refreshed = app.refresh_stale_games(budget=4)
+        assert len(refreshed) == 4
+        stored = app.cache_collection.db_manager.get_games(util.get_hash_by_id(app_id, UrlType.GAME_PAGE) for app_id in refreshed)
+        assert all(game.last_time_scraped > datetime.now() - timedelta(minutes=1) for game in stored.values())
+        assert len(RefreshScheduler(app.cache_collection, max_age=MAX_AGE).select_batch()) == 2
+    finally:
+        app.end_program()
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+import funday_bundle.constants as const
+import funday_bundle.utils as util
+from funday_bundle.scraper_pool import ScraperPool
+from funday_bundle.steam_scraping import SteamScraper
+from funday_bundle.utils import ReturnInfo, UrlType
+
+
+class _FakeDriver:
+    # Pages come through the static path, the driver is only started and quit
+    started = 0
+    quits = 0
+    
+    def __init__(self):
+        type(self).started += 1
+    
+    def quit(self):
+        type(self).quits += 1
+
+
+@pytest.fixture
+def pool(collection, server, monkeypatch):
+    monkeypatch.setattr(const, "PAGE_DELAY", (0, 0))
+    monkeypatch.setattr(_FakeDriver, "started", 0)
+    monkeypatch.setattr(_FakeDriver, "quits", 0)
+    pool = ScraperPool(collection, pool_size=3, driver_factory=_FakeDriver, base_url=server.base_url)
+    yield pool
+    pool.close()
+
+
+def test_pool_scrapes_and_writes(pool, collection, server):
+    app_ids = server.corpus.game_ids[:9]
+    results = []
+    counts = pool.scrape_game_pages(app_ids, on_result=lambda steam_id, info, error: results.append(steam_id))
+    
+    assert counts[ReturnInfo.SCRAPED_SCUCCESFULLY] == 9
+    assert sorted(results) == app_ids
+    stored = collection.get_games(util.get_hash_by_id(app_id, UrlType.GAME_PAGE) for app_id in app_ids)
+    assert len(stored) == 9
+    
+    # Workers and drivers stay up for the next call, known games come from the cache
+    counts = pool.scrape_game_pages(app_ids[:3])
+    assert counts[ReturnInfo.FOUND_IN_CACHE] == 3
+    assert _FakeDriver.started == 3
+    
+    pool.close()
+    assert _FakeDriver.quits == 3
+
+
+def test_pool_retries_driver_crashes(pool, server, monkeypatch):
+    # The first id crashes once and is retried on a fresh driver, the second crashes every time
+    crashed, always, scrape_game = set(), server.corpus.game_ids[1], SteamScraper.scrape_game
+    lock = threading.Lock()
+    
+    def crashing_scrape(self, steam_id, force=False):
+        with lock:
+            first = steam_id not in crashed
+            crashed.add(steam_id)
+        if steam_id == always or first:
+            raise WebDriverException("chrome gone")
+        return scrape_game(self, steam_id, force)
+    
+    monkeypatch.setattr(SteamScraper, "scrape_game", crashing_scrape)
+    errors = {}
+    counts = pool.scrape_game_pages(server.corpus.game_ids[:2], on_result=lambda steam_id, info, error: errors.update({steam_id: error}))
+    
+    assert counts[ReturnInfo.SCRAPED_SCUCCESFULLY] == 1 and counts[ReturnInfo.FAILED] == 1
+    assert errors[server.corpus.game_ids[0]] is None and "chrome gone" in errors[always]
+    assert _FakeDriver.started == 2 + 1 + const.POOL_MAX_ATTEMPTS # Two workers, one restart per crash
+
+
+def test_pool_without_workers_fails_the_work(collection, monkeypatch):
+    def broken_driver():
+        raise WebDriverException("no chrome")
+    
+    pool = ScraperPool(collection, pool_size=2, driver_factory=broken_driver)
+    counts = pool.scrape_game_pages([10, 20, 30])
+    pool.close()
+    assert counts[ReturnInfo.FAILED] == 3
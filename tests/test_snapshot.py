@@ -0,0 +1,99 @@
+import os
+from dataclasses import replace
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import funday_bundle.constants as const
+import funday_bundle.utils as util
+from funday_bundle.data_structures import CachedCollection, GameCache
+from funday_bundle.db_manager import DatabaseManager
+from funday_bundle.snapshot import Snapshot, export_snapshot, is_snapshot_stale, refresh_snapshot
+from funday_bundle.utils import UrlType
+
+PATH = "scraped_data/snapshot"
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager("scraped_data/snapshot.db")
+    yield db
+    db.close_connection()
+
+
+def _game(steam_id: int, tags: list[str], price: float = 10.0) -> GameCache:
+    return GameCache(util.get_hash_by_id(steam_id, UrlType.GAME_PAGE), steam_id, f"game {steam_id}", price, 0.8, 100,
+                     tags, datetime(2020, 1, 1), datetime(2024, 1, 1))
+
+
+def _tags_by_id(snapshot: Snapshot) -> dict[int, list[str]]:
+    frame = snapshot.games_frame()
+    offsets, ids = snapshot.game_tags()
+    return {int(steam_id): sorted(snapshot.tag_names[tag] for tag in ids[offsets[i]:offsets[i + 1]])
+            for i, steam_id in enumerate(frame["steam_id"])}
+
+
+def test_export_reads_through_mmap(db):
+    db.add_games([_game(1, ["indie", "rpg"], price=4.0), _game(2, ["action"])])
+    export_snapshot(db, PATH)
+    
+    snapshot = Snapshot(PATH)
+    assert isinstance(snapshot._segments[0]["price"], np.memmap)
+    frame = snapshot.games_frame()
+    assert sorted(zip(frame["steam_id"], frame["price"], frame["title"])) == [(1, 4.0, "game 1"), (2, 10.0, "game 2")]
+    assert _tags_by_id(snapshot) == {1: ["indie", "rpg"], 2: ["action"]}
+    assert not is_snapshot_stale(db, PATH)
+
+
+def test_refresh_appends_newer_rows(db):
+    db.add_games([_game(1, ["indie"], price=4.0), _game(2, ["action"])])
+    export_snapshot(db, PATH)
+    
+    # One replaced, one new: a second segment, later rows win
+    db.add_games([_game(1, ["rpg", "puzzle"], price=6.0), _game(3, ["indie"])])
+    assert is_snapshot_stale(db, PATH)
+    meta = refresh_snapshot(db, PATH)
+    assert meta["segments"] == ["games_000", "games_001"] and meta["game_rows"] == 3
+    
+    snapshot = Snapshot(PATH)
+    frame = snapshot.games_frame()
+    assert dict(zip(frame["steam_id"], frame["price"])) == {1: 6.0, 2: 10.0, 3: 10.0}
+    assert _tags_by_id(snapshot) == {1: ["puzzle", "rpg"], 2: ["action"], 3: ["indie"]}
+    
+    # Nothing written since, nothing appended
+    assert refresh_snapshot(db, PATH)["segments"] == ["games_000", "games_001"]
+
+
+def test_deleted_rows_rewrite(db):
+    db.add_games([_game(1, ["indie"]), _game(2, ["action"])])
+    export_snapshot(db, PATH)
+    db.add_games([_game(3, ["indie"])])
+    with db.conn:
+        db.conn.execute("DELETE FROM games WHERE steam_id = 2")
+    
+    meta = refresh_snapshot(db, PATH)
+    assert meta["segments"] == ["games_000"]
+    assert sorted(Snapshot(PATH).games_frame()["steam_id"]) == [1, 3]
+
+
+def test_too_many_segments_rewrite(db, monkeypatch):
+    monkeypatch.setattr(const, "SNAPSHOT_MAX_SEGMENTS", 2)
+    db.add_games([_game(1, ["indie"])])
+    export_snapshot(db, PATH)
+    db.add_games([_game(2, ["indie"])])
+    assert len(refresh_snapshot(db, PATH)["segments"]) == 2
+    db.add_games([_game(3, ["indie"])])
+    
+    meta = refresh_snapshot(db, PATH)
+    assert meta["segments"] == ["games_000"] and meta["game_rows"] == 3
+    assert not os.path.exists(os.path.join(PATH, "games_001"))
+
+
+def test_collection_refreshes_on_close():
+    collection = CachedCollection(use_tag_index=False, use_bundle_graph=False, snapshot_path=PATH)
+    collection.add_games([_game(1, ["indie"]), replace(_game(2, ["rpg"]), title="second")])
+    collection.close_connections()
+    
+    frame = Snapshot(PATH).games_frame()
+    assert sorted(frame["title"]) == ["game 1", "second"]
@@ -0,0 +1,89 @@
+import re
+
+import pytest
+
+import funday_bundle.static_scraping as static
+import funday_bundle.utils as util
+from benchmarks.corpus import Corpus
+from funday_bundle.utils import UrlType
+
+CORPUS = Corpus(n_games=40, n_bundles=20)
+
+# What Steam serves instead of the game when the age cookies are not accepted
+AGE_GATE_PAGE = """<html><body class="v6 agegate_page">
+<div class="agegate_birthday_desc">Please enter your birth date to continue:</div>
+<div class="agegate_text_container btns"><a class="btnv6_blue_hoverfade btn_medium" id="view_product_page_btn"><span>View Page</span></a></div>
+</body></html>"""
+
+
+def _parse_game(html: str, app_id: int):
+    return static.parse_game_page(html, app_id, util.get_hash_by_id(app_id, UrlType.GAME_PAGE))
+
+
+@pytest.mark.parametrize("app_id", CORPUS.game_ids)
+def test_parse_game_page_corpus(app_id):
+    fields = Corpus._game_fields(app_id)
+    game = _parse_game(CORPUS.game_page(app_id), app_id)
+
+    assert game is not None
+    assert game.title == f"game {app_id}"
+    assert game.price == pytest.approx(fields["price"])
+    assert game.overall_count == fields["review_count"]
+    assert game.overall_rating == pytest.approx(fields["rating"] / 100)
+    assert game.tags == fields["tags"] # Full list from the tag modal script, in order
+    assert game.release_date.strftime("%d %b, %Y").lstrip("0") == fields["release_date"]
+
+
+def test_parse_game_page_glance_tags_fallback():
+    app_id = CORPUS.game_ids[0]
+    html = re.sub(r"<script type=\"text/javascript\">.*?</script>", "", CORPUS.game_page(app_id), flags=re.DOTALL)
+    game = _parse_game(html, app_id)
+
+    assert game is not None
+    assert game.tags == Corpus._game_fields(app_id)["tags"][:5] # Only the shown tags, without the "+" button
+
+
+def test_parse_game_page_missing_tags():
+    app_id = CORPUS.game_ids[1]
+    html = re.sub(r"<script type=\"text/javascript\">.*?</script>", "", CORPUS.game_page(app_id), flags=re.DOTALL)
+    html = re.sub(r'<a class="app_tag">[^<]*</a>', "", html)
+    assert _parse_game(html, app_id) is None
+
+
+def test_parse_game_page_without_price():
+    app_id = CORPUS.game_ids[2]
+    html = re.sub(r'<div class="game_purchase_price price"[^>]*>[^<]*</div>', "", CORPUS.game_page(app_id))
+    assert _parse_game(html, app_id) is None
+
+
+def test_parse_game_page_age_gate():
+    assert _parse_game(AGE_GATE_PAGE, 10) is None
+
+
+@pytest.mark.parametrize("bundle_id", CORPUS.bundle_ids)
+def test_parse_bundle_page_with_games_corpus(bundle_id):
+    bundle_hash = util.get_hash_by_id(bundle_id, UrlType.BUNDLE_PAGE)
+    bundle, game_ids = static.parse_bundle_page_with_games(CORPUS.bundle_page(bundle_id), str(bundle_id), bundle_hash)
+
+    expected = CORPUS.bundle_games[bundle_id]
+    assert bundle is not None
+    assert bundle.title == f"bundle {bundle_id}"
+    assert game_ids == [str(app_id) for app_id in expected]
+    assert bundle.games_in_bundle == [util.get_hash_by_id(app_id, UrlType.GAME_PAGE) for app_id in expected]
+    assert 0.1 <= bundle.discount <= 0.3 and bundle.total_price > 0
+    assert bundle.tags == [] # Derived from the games in the db instead
+
+
+def test_parse_bundle_page_without_games():
+    bundle_id = CORPUS.bundle_ids[0]
+    html = re.sub(r'<div class="bundle_package_item">.*?</body>', "</body>", CORPUS.bundle_page(bundle_id), flags=re.DOTALL)
+    assert static.parse_bundle_page_with_games(html, str(bundle_id), "0" * 16) == (None, [])
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("96% of the 123,456 user reviews for this game are positive.", (123456, 0.96)),
+    ("72% af de 1.234 brugeranmeldelser for dette spil er positive.", (1234, 0.72)),
+    ("no reviews yet", None),
+])
+def test_parse_ratings(raw, expected):
+    assert util.parse_ratings(raw) == expected
@@ -0,0 +1,100 @@
+import funday_bundle.constants as const
+import funday_bundle.static_scraping as static
+import funday_bundle.utils as util
+from funday_bundle.funday_bundle import FundayBundle
+from funday_bundle.main import parse_args
+from funday_bundle.steam_api import SteamStoreApi
+from funday_bundle.steam_scraping import SteamScraper
+from funday_bundle.utils import UrlType
+
+
+def test_fetch_game_matches_html(server):
+    api = SteamStoreApi(base_url=server.base_url)
+    app_id = server.corpus.game_ids[0]
+    game = api.fetch_game(app_id)
+    page = static.parse_game_page(server.corpus.game_page(app_id), app_id, util.get_hash_by_id(app_id, UrlType.GAME_PAGE))
+
+    assert game is not None and page is not None
+    assert game.hash == page.hash
+    assert (game.title, game.price, game.overall_count, game.release_date) == (page.title, page.price, page.overall_count, page.release_date)
+    assert abs(game.overall_rating - page.overall_rating) < 0.01
+    assert game.tags == page.tags
+
+
+def test_fetch_game_with_known_tags_skips_html(server):
+    api = SteamStoreApi(base_url=server.base_url)
+    before = server.requests
+    game = api.fetch_game(server.corpus.game_ids[1], tags=["indie"])
+
+    assert game is not None and game.tags == ["indie"]
+    assert server.requests - before == 2 # appdetails and appreviews only
+
+
+def test_fetch_game_rejects_missing_data(server):
+    api = SteamStoreApi(base_url=server.base_url, tag_source=lambda steam_id: [])
+    assert api.fetch_game(server.corpus.game_ids[2]) is None # No tags
+    assert SteamStoreApi(base_url=server.base_url).fetch_game(3) is None # Unknown app
+
+
+def test_get_prices_batches(server):
+    api = SteamStoreApi(base_url=server.base_url)
+    app_ids = server.corpus.game_ids[:5] + [3]
+    before = server.requests
+    prices = api.get_prices(app_ids)
+
+    assert server.requests - before == 1
+    assert set(prices) == set(server.corpus.game_ids[:5])
+    assert prices[app_ids[0]] == api.fetch_game(app_ids[0], tags=["indie"]).price
+
+
+def test_scraper_reuses_stored_tags(server, collection):
+    scraper = SteamScraper(None, collection, api=SteamStoreApi(base_url=server.base_url), base_url=server.base_url)
+    app_id = server.corpus.game_ids[3]
+    game_hash = util.get_hash_by_id(app_id, UrlType.GAME_PAGE)
+    url = util.get_url_by_id(app_id, UrlType.GAME_PAGE)
+
+    first = scraper._extract_game(url, game_hash, app_id)
+    assert first is not None and collection.add_game(first)
+
+    before = server.requests
+    again = scraper._extract_game(url, game_hash, app_id)
+    assert again is not None and again.tags == first.tags
+    assert server.requests - before == 2
+
+
+def test_free_games_are_rejected_like_html(server, monkeypatch):
+    api = SteamStoreApi(base_url=server.base_url)
+    app_id = server.corpus.game_ids[4]
+    details = api.get_app_details(app_id)
+    free = {key: value for key, value in details.items() if key != "price_overview"} | {"is_free": True}
+    monkeypatch.setattr(api, "get_app_details", lambda steam_id: free)
+    assert api.fetch_game(app_id, tags=["indie"]) is None
+
+    page = server.corpus.game_page(app_id).replace('data-price-final', 'data-free').replace(
+        f'{details["price_overview"]["initial_formatted"]}', "Free To Play")
+    assert static.parse_game_page(page, app_id, util.get_hash_by_id(app_id, UrlType.GAME_PAGE)) is None
+
+
+class _IdleDriver:
+    # Never used while the api has everything
+    def quit(self):
+        pass
+
+
+def test_app_scrapes_through_the_api(server, monkeypatch):
+    monkeypatch.setattr(const, "PAGE_DELAY", (0, 0))
+    assert parse_args(["--api", "--workers", "2"]).api
+
+    app = FundayBundle(workers=2, archive_pages=False, use_api=True, base_url=server.base_url)
+    try:
+        pool = app._get_pool()
+        assert pool.api is app.api
+        pool.driver_factory = _IdleDriver
+
+        app_ids = server.corpus.game_ids[20:26]
+        app.scrape_ids(app_ids)
+        stored = app.cache_collection.get_games(util.get_hash_by_id(app_id, UrlType.GAME_PAGE) for app_id in app_ids)
+        assert len(stored) == 6
+        assert all(game.price == app.api.fetch_game(game.steam_id, tags=game.tags).price for game in stored.values())
+    finally:
+        app.end_program()
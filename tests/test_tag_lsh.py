@@ -0,0 +1,35 @@
+import os
+from datetime import datetime
+
+from funday_bundle.data_structures import CachedCollection, GameCache
+from funday_bundle.tag_lsh import TagLSHIndex, index_path
+
+
+def _game(steam_id: int, tags: list[str]) -> GameCache:
+    return GameCache(f"g{steam_id}", steam_id, f"game {steam_id}", 10.0, 0.8, 100, tags, datetime(2020, 1, 1), datetime(2024, 1, 1))
+
+
+def test_index_path_follows_db():
+    assert index_path("scraped_data/a.db") == "scraped_data/a_tag_lsh_index.npz"
+    assert index_path("other/b.sqlite") == "other/b_tag_lsh_index.npz"
+
+
+def test_collections_keep_their_own_index():
+    # Each collection saves next to its own db, neither overwrites the other
+    games = {"scraped_data/a.db": [_game(1, ["indie", "rpg"]), _game(2, ["indie", "rpg"])],
+             "scraped_data/b.db": [_game(3, ["action", "shooter"])]}
+    for db_path, game_objs in games.items():
+        collection = CachedCollection(db_path=db_path, use_bundle_graph=False)
+        collection.add_games(game_objs)
+        collection.get_tag_index()
+        collection.close_connections()
+
+    for db_path, game_objs in games.items():
+        assert os.path.exists(index_path(db_path))
+        index = TagLSHIndex.load(index_path(db_path))
+        assert sorted(index._hashes.tolist()) == [game.hash for game in game_objs]
+
+    # Reopened, the index matches its db with nothing to sync
+    collection = CachedCollection(db_path="scraped_data/a.db", use_bundle_graph=False)
+    assert [h for h, _ in collection.similar_games("g1")] == ["g2"]
+    collection.close_connections()
@@ -0,0 +1,94 @@
+import sqlite3
+import time
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+
+from funday_bundle.data_structures import CachedCollection, GameCache
+from funday_bundle.db_manager import DatabaseManager
+
+DB_PATH = "scraped_data/write_behind.db"
+
+
+@pytest.fixture
+def db():
+    db = DatabaseManager(DB_PATH, batch_size=3, flush_interval=60)
+    yield db
+    db.close_connection()
+
+
+def _game(steam_id: int) -> GameCache:
+    return GameCache(f"g{steam_id}", steam_id, f"game {steam_id}", 10.0, 0.8, 100, ["indie"], datetime(2020, 1, 1), datetime(2024, 1, 1))
+
+
+def _stored() -> int:
+    # Read on a second connection, so buffered rows are not flushed by the read
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+
+def test_flushes_at_batch_size(db):
+    assert db.add_game(_game(1)) and db.add_game(_game(2))
+    assert _stored() == 0
+    assert db.add_game(_game(3))
+    assert _stored() == 3
+
+
+def test_reads_see_buffered_rows(db):
+    db.add_game(_game(1))
+    assert db.get_game("g1").steam_id == 1
+    assert _stored() == 1
+
+
+def test_timer_flushes_a_quiet_buffer():
+    db = DatabaseManager(DB_PATH, batch_size=100, flush_interval=0.1)
+    try:
+        db.add_game(_game(1))
+        deadline = time.monotonic() + 5
+        while _stored() == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert _stored() == 1
+    finally:
+        db.close_connection()
+
+
+def test_locked_db_keeps_rows(db):
+    db.conn.execute("PRAGMA busy_timeout=0")
+    blocker = sqlite3.connect(DB_PATH)
+    blocker.execute("BEGIN IMMEDIATE")
+    db.add_game(_game(1))
+    db.add_game(_game(2))
+    assert not db.flush()
+    assert len(db._pending_games) == 2
+    
+    blocker.rollback()
+    blocker.close()
+    assert db.flush()
+    assert _stored() == 2
+
+
+def test_rejected_rows_are_dropped(db):
+    # One unbindable row fails the batch, the rest is written row by row
+    dropped = []
+    db.on_rows_dropped = lambda games, bundles: dropped.extend(games)
+    db.add_game(_game(1))
+    db.add_game(replace(_game(2), title=object()))
+    db.add_game(_game(3))
+    
+    assert _stored() == 2
+    assert [game.hash for game in dropped] == ["g2"]
+    assert not db._pending_games
+
+
+def test_collection_forgets_dropped_rows():
+    collection = CachedCollection(write_batch_size=2, use_tag_index=False, use_bundle_graph=False)
+    try:
+        collection.add_games([_game(1)])
+        collection.add_game(_game(5))
+        collection.add_game(replace(_game(6), title=object()))
+        # The rejected row set off the flush itself, it must not count as known afterwards
+        assert 5 in collection.known_game_ids and 6 not in collection.known_game_ids
+        assert collection.game_cache.get("g6") is None
+    finally:
+        collection.close_connections()